@@ -0,0 +1,159 @@
+# Incremental build entry point for the generated spec artifacts
+#
+# Every artifact is serialized from one source dict and may read from other
+# source dicts (delivery_summary counts the files of zip_contents). Each
+# source is hashed canonically, the hashes of an artifact's inputs are folded
+# into a single key, and the artifact is only rewritten when that key or the
+# file on disk no longer matches the manifest.
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+from kortex import spec
+
+MANIFEST = ".build-manifest.json"
+
+# Source dicts, by the name they are defined under in specdata.py
+sources = {
+    "package_structure": spec.get_package_structure(),
+    "timeline": spec.get_timeline(),
+    "package_json": spec.get_package_json(),
+    "backend_api": spec.get_backend_api(),
+    "backend_package": spec.get_backend_package(),
+    "server_config": spec.get_server_config(),
+    "database_schema": spec.get_schema(),
+    "zip_contents": spec.get_zip_contents(),
+    "delivery_summary": spec.get_delivery_summary(),
+}
+
+# Dependency graph: artifact -> source dicts it is built from. The first
+# entry is the dict that gets serialized, the rest are upstream inputs.
+graph = {
+    "timeline.json": ["timeline"],
+    "package.json": ["package_json"],
+    "backend-api.json": ["backend_api"],
+    "backend-package.json": ["backend_package"],
+    "server-config.json": ["server_config"],
+    "database-schema.json": ["database_schema"],
+    "delivery-summary.json": ["delivery_summary", "zip_contents"],
+}
+
+
+def hash_source(obj):
+    """Hash a source dict independently of key order and formatting."""
+    canonical = json.dumps(obj, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def serialize(obj):
+    # Same bytes as the generators' json.dump(obj, f, indent=2)
+    return json.dumps(obj, indent=2).encode("utf-8")
+
+
+def input_key(artifact, source_hashes):
+    h = hashlib.sha256()
+    for name in graph[artifact]:
+        h.update(name.encode("utf-8"))
+        h.update(b"\0")
+        h.update(source_hashes[name].encode("ascii"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"sources": {}, "artifacts": {}}
+    manifest.setdefault("sources", {})
+    manifest.setdefault("artifacts", {})
+    return manifest
+
+
+def save_manifest(path, manifest):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def file_hash(path):
+    try:
+        with open(path, "rb") as f:
+            return hash_bytes(f.read())
+    except OSError:
+        return None
+
+
+def build(out_dir=".", force=False, dry_run=False, only=None):
+    """Write every stale artifact and return {artifact: "built" | "skipped"}."""
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    manifest = load_manifest(manifest_path)
+    source_hashes = {name: hash_source(obj) for name, obj in sources.items()}
+
+    results = {}
+    for artifact, inputs in graph.items():
+        if only and artifact not in only:
+            continue
+        path = os.path.join(out_dir, artifact)
+        key = input_key(artifact, source_hashes)
+        entry = manifest["artifacts"].get(artifact, {})
+        on_disk = file_hash(path)
+
+        if not force and entry.get("inputs") == key and on_disk == entry.get("output"):
+            results[artifact] = "skipped"
+            continue
+
+        data = serialize(sources[inputs[0]])
+        output = hash_bytes(data)
+        # A matching file on disk (e.g. first run with a fresh manifest) is
+        # recorded without touching it, so mtimes stay stable for CI caches
+        if on_disk != output and not dry_run:
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        results[artifact] = "built" if on_disk != output else "skipped"
+        manifest["artifacts"][artifact] = {"inputs": key, "output": output, "sources": list(inputs)}
+
+    if not dry_run:
+        manifest["sources"] = source_hashes
+        save_manifest(manifest_path, manifest)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regenerate stale spec artifacts")
+    parser.add_argument("artifacts", nargs="*", help="limit the build to these artifacts")
+    parser.add_argument("--out-dir", default=os.path.dirname(os.path.abspath(__file__)))
+    parser.add_argument("--force", action="store_true", help="rebuild even if inputs are unchanged")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be rebuilt")
+    parser.add_argument("--graph", action="store_true", help="print the dependency graph and exit")
+    args = parser.parse_args(argv)
+
+    if args.graph:
+        for artifact, inputs in graph.items():
+            print(f"{artifact} <- {', '.join(inputs)}")
+        return 0
+
+    unknown = set(args.artifacts) - set(graph)
+    if unknown:
+        parser.error(f"unknown artifacts: {', '.join(sorted(unknown))}")
+
+    results = build(args.out_dir, force=args.force, dry_run=args.dry_run, only=set(args.artifacts))
+    for artifact, status in results.items():
+        print(f"{'✅' if status == 'built' else '⏭️ '} {artifact}: {status}")
+    built = sum(1 for s in results.values() if s == "built")
+    print(f"📦 {built} rebuilt, {len(results) - built} up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
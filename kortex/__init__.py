@@ -0,0 +1,5 @@
+# Python reference backend for the Kortex Writing Hub
+#
+# A local stand-in for the Node backend described by specdata.py: routes,
+# request validation and settings are all driven by backend_api and
+# server_config, so the two stay in step as the spec evolves.
@@ -0,0 +1,83 @@
+# Model catalogue and a local stand-in for the AI providers
+import asyncio
+import hashlib
+
+
+def count_tokens(text):
+    # Rough provider-agnostic estimate: ~4 characters per token
+    return max(1, (len(text) + 3) // 4) if text else 0
+
+
+def models(settings):
+    """The models configured under server_config[env]["ai"]."""
+    return [
+        {"id": cfg["model"], "provider": provider, "maxTokens": cfg["maxTokens"]}
+        for provider, cfg in settings.get("ai", {}).items()
+    ]
+
+
+def render_context(context):
+    parts = []
+    for item in context or ():
+        if isinstance(item, dict):
+            parts.append(str(item.get("content") or item.get("text") or ""))
+        else:
+            parts.append(str(item))
+    return "\n".join(p for p in parts if p)
+
+
+def build_prompt(prompt, context=None):
+    """What the provider is sent, and charged for: context, then the prompt."""
+    return "\n\n".join(p for p in (render_context(context), prompt) if p)
+
+
+class StubProvider:
+    """Deterministic offline provider; same input, same completion."""
+
+    def __init__(self, catalogue, delay=0.0, token_delay=0.0):
+        self.catalogue = {m["id"]: m for m in catalogue}
+        self.default_model = catalogue[0]["id"] if catalogue else "stub"
+        # Simulated provider latency (before the first token, then between
+        # streamed tokens), for load tests
+        self.delay = delay
+        self.token_delay = token_delay
+
+    def resolve_model(self, model):
+        return model if model in self.catalogue else self.default_model
+
+    def _completion(self, prompt, model):
+        digest = hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()[:12]
+        words = prompt.split()
+        topic = " ".join(words[:12]) + ("..." if len(words) > 12 else "")
+        return f"[{model}:{digest}] Here is a draft response about: {topic}"
+
+    async def complete(self, prompt, context=None, model=None):
+        model = self.resolve_model(model)
+        full_prompt = build_prompt(prompt, context)
+        text = self._completion(full_prompt, model)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return text, usage_for(model, full_prompt, text)
+
+    async def stream(self, prompt, context=None, model=None):
+        """Yield ("token", text) pieces as they are produced, then ("usage", usage)."""
+        model = self.resolve_model(model)
+        full_prompt = build_prompt(prompt, context)
+        text = self._completion(full_prompt, model)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        for i, word in enumerate(text.split(" ")):
+            if i and self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield "token", word if i == 0 else " " + word
+        yield "usage", usage_for(model, full_prompt, text)
+
+
+def usage_for(model, prompt, completion):
+    usage = {
+        "model": model,
+        "promptTokens": count_tokens(prompt),
+        "completionTokens": count_tokens(completion),
+    }
+    usage["totalTokens"] = usage["promptTokens"] + usage["completionTokens"]
+    return usage
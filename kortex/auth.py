@@ -0,0 +1,271 @@
+# Bearer tokens and password hashing for server_config.auth
+#
+# Access and refresh tokens are HS256 JWTs signed with auth.jwtSecret and
+# expiring after jwtExpiration / refreshTokenExpiration. Every request off
+# the /auth routes verifies one, so verified claims are cached by a hash of
+# the token until they expire (bounded, least-recently-used): a repeat
+# request costs a digest and a dict lookup instead of an HMAC and two JSON
+# decodes. Revoked token ids live in a dict checked on every hit, backed by
+# a small SQLite file so a rotated refresh token stays dead across restarts;
+# rows are dropped once the token would have expired anyway.
+#
+# POST /auth/refresh rotates without touching the main database: the
+# refresh token carries the user id, so the old one is revoked and a new
+# pair is signed. Password hashing is PBKDF2 with 100k rounds (tens of ms), so it
+# runs in a small thread pool; hashlib releases the GIL while it works and
+# other requests keep being served.
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+PBKDF2_ROUNDS = 100_000
+
+# Verified tokens kept in memory; each entry is a few hundred bytes
+TOKEN_CACHE_SIZE = 50_000
+HASH_WORKERS = min(4, os.cpu_count() or 1)
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+_HEADER = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b"=")
+
+
+class TokenError(ValueError):
+    pass
+
+
+def parse_duration(value):
+    """Seconds in a jsonwebtoken-style duration: 3600, "90m", "24h", "7d"."""
+    if isinstance(value, (int, float)):
+        return value
+    value = str(value).strip()
+    if value[-1:] in DURATION_UNITS:
+        return int(value[:-1]) * DURATION_UNITS[value[-1]]
+    return int(value)
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=")
+
+
+def _b64decode(segment):
+    return base64.urlsafe_b64decode(segment + b"=" * (-len(segment) % 4))
+
+
+def encode(claims, secret):
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    signing_input = _HEADER + b"." + payload
+    signature = hmac.new(secret, signing_input, hashlib.sha256).digest()
+    return (signing_input + b"." + _b64encode(signature)).decode("ascii")
+
+
+def decode(token, secret, now):
+    """Claims of a valid, unexpired HS256 token, or TokenError."""
+    try:
+        raw = token.encode("ascii")
+        header, payload, signature = raw.split(b".")
+        if header != _HEADER:
+            raise TokenError("unsupported token header")
+        expected = hmac.new(secret, header + b"." + payload, hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            raise TokenError("bad signature")
+        claims = json.loads(_b64decode(payload))
+    except (UnicodeEncodeError, ValueError) as exc:
+        raise TokenError(str(exc)) from None
+    if not isinstance(claims, dict) or claims.get("exp", 0) <= now:
+        raise TokenError("token expired")
+    return claims
+
+
+def hash_password(password, salt=None):
+    salt = salt or secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, PBKDF2_ROUNDS)
+    return f"pbkdf2_sha256${PBKDF2_ROUNDS}${salt.hex()}${digest.hex()}"
+
+
+def check_password(password, hashed):
+    _, rounds, salt, digest = hashed.split("$")
+    candidate = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), bytes.fromhex(salt), int(rounds))
+    return hmac.compare_digest(candidate.hex(), digest)
+
+
+# Checked against when the email is unknown, so a miss takes as long as a hit
+_DUMMY_HASH = hash_password(secrets.token_hex(8))
+
+
+class TokenCache:
+    """LRU of token digest -> claims, dropping entries as they expire."""
+
+    def __init__(self, max_entries=TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, now):
+        claims = self.entries.get(key)
+        if claims is None:
+            self.misses += 1
+            return None
+        if claims["exp"] <= now:
+            del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return claims
+
+    def put(self, key, claims):
+        self.entries[key] = claims
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class Authenticator:
+    def __init__(self, settings=None, cache_size=TOKEN_CACHE_SIZE, workers=HASH_WORKERS, clock=time.time,
+                 revoked_path=":memory:"):
+        settings = settings or {}
+        # Without a configured secret tokens only last as long as the process
+        secret = settings.get("jwtSecret") or secrets.token_hex(32)
+        self.secret = secret.encode("utf-8")
+        self.access_ttl = parse_duration(settings.get("jwtExpiration") or "24h")
+        self.refresh_ttl = parse_duration(settings.get("refreshTokenExpiration") or "7d")
+        self.clock = clock
+        self.cache = TokenCache(cache_size)
+        # Token id -> expiry; entries are useless once the token would have expired anyway
+        if revoked_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(revoked_path)), exist_ok=True)
+        self.conn = sqlite3.connect(revoked_path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS revoked_tokens (
+            jti TEXT PRIMARY KEY,
+            expires_at INTEGER NOT NULL
+        ) WITHOUT ROWID""")
+        self.conn.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (clock(),))
+        self.revoked = dict(self.conn.execute("SELECT jti, expires_at FROM revoked_tokens"))
+        self._prune_at = max(1024, len(self.revoked) * 2)
+        self.hasher = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kortex-hash")
+
+    def _sign(self, user_id, kind, ttl, now):
+        return encode({"sub": user_id, "typ": kind, "jti": secrets.token_urlsafe(12),
+                       "iat": int(now), "exp": int(now + ttl)}, self.secret)
+
+    def issue(self, user_id):
+        now = self.clock()
+        return {"token": self._sign(user_id, "access", self.access_ttl, now),
+                "refreshToken": self._sign(user_id, "refresh", self.refresh_ttl, now)}
+
+    def verify(self, token, kind="access"):
+        """Claims of a valid token of the given kind, or TokenError."""
+        now = self.clock()
+        key = hashlib.blake2b(token.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        claims = self.cache.get(key, now)
+        if claims is None:
+            claims = decode(token, self.secret, now)
+            self.cache.put(key, claims)
+        if claims.get("typ") != kind:
+            raise TokenError(f"wrong token type, expected {kind}")
+        if claims.get("jti") in self.revoked:
+            raise TokenError("token revoked")
+        return claims
+
+    def revoke(self, claims):
+        self.revoked[claims["jti"]] = claims["exp"]
+        self.conn.execute("INSERT OR IGNORE INTO revoked_tokens VALUES (?, ?)", (claims["jti"], claims["exp"]))
+        if len(self.revoked) >= self._prune_at:
+            now = self.clock()
+            self.revoked = {jti: exp for jti, exp in self.revoked.items() if exp > now}
+            self.conn.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (now,))
+            self._prune_at = max(1024, len(self.revoked) * 2)
+
+    def rotate(self, refresh_token):
+        """Trade a refresh token for a new pair; the old one stops working."""
+        claims = self.verify(refresh_token, "refresh")
+        self.revoke(claims)
+        return self.issue(claims["sub"])
+
+    async def hash_password(self, password):
+        return await asyncio.get_running_loop().run_in_executor(self.hasher, hash_password, password)
+
+    async def check_password(self, password, hashed):
+        hashed = hashed or _DUMMY_HASH
+        matches = await asyncio.get_running_loop().run_in_executor(self.hasher, check_password, password, hashed)
+        return matches and hashed is not _DUMMY_HASH
+
+    def close(self):
+        self.hasher.shutdown(wait=False)
+        self.conn.close()
+
+
+def benchmark(tokens, logins):
+    auth = Authenticator({"jwtSecret": "bench"})
+    issued = [auth.issue(f"user-{n}")["token"] for n in range(tokens)]
+    start = time.perf_counter()
+    for token in issued:
+        decode(token, auth.secret, time.time())
+    uncached = time.perf_counter() - start
+    for token in issued:
+        auth.verify(token)
+    start = time.perf_counter()
+    for token in issued:
+        auth.verify(token)
+    cached = time.perf_counter() - start
+
+    async def concurrent_logins():
+        start = time.perf_counter()
+        await asyncio.gather(*(auth.check_password("correct horse battery staple", hashed) for _ in range(logins)))
+        return time.perf_counter() - start
+
+    hashed = hash_password("correct horse battery staple")
+    start = time.perf_counter()
+    for _ in range(logins):
+        check_password("correct horse battery staple", hashed)
+    serial = time.perf_counter() - start
+    pooled = asyncio.run(concurrent_logins())
+    auth.close()
+    return {"tokens": tokens, "uncached_us": uncached / tokens * 1e6, "cached_us": cached / tokens * 1e6,
+            "logins": logins, "serial_s": serial, "pooled_s": pooled, "workers": HASH_WORKERS}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JWT verification cache and password hashing pool")
+    parser.add_argument("--bench", type=int, metavar="TOKENS", help="verify TOKENS tokens with and without the cache")
+    parser.add_argument("--logins", type=int, default=16)
+    args = parser.parse_args(argv)
+    if not args.bench:
+        parser.print_help()
+        return 0
+    result = benchmark(args.bench, args.logins)
+    print(f"🔐 verify {result['tokens']:,} tokens: {result['uncached_us']:.1f} µs signed, "
+          f"{result['cached_us']:.1f} µs cached")
+    print(f"🧂 {result['logins']} password checks: {result['serial_s']:.2f} s one at a time, "
+          f"{result['pooled_s']:.2f} s across {result['workers']} hashing threads")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,476 @@
+# Write-behind buffer for autosave traffic
+#
+# The editor saves on every input event, so a writing sprint sends a
+# PUT /documents/:id per keystroke. WriteBehind wraps the row store: updates
+# to buffered tables are merged per row in memory and the whole buffer is
+# written every WINDOW seconds (or once it holds MAX_PENDING rows) in one
+# transaction, with rows setting the same columns sharing an executemany.
+# Forty saves of one document inside a window become one UPDATE.
+#
+# Reads stay consistent: get() overlays the pending fields (and those of a
+# flush still being written) on the stored row, and anything that reads a
+# buffered table in bulk (select, scan, query) flushes it first. Other
+# tables and calls pass straight through.
+#
+# flush() is a coroutine: the transaction, and reading back the rows its
+# subscribers need, run on the database threads like every other store
+# call, so the event loop never waits on them. Flushes take turns, so an
+# older batch can never land over a newer one; saves made meanwhile go into
+# the next batch. The blocking form is left for startup, shutdown and the
+# synchronous store methods.
+#
+# Work that should follow a saved row rather than every save (reindexing,
+# revisions) subscribes to the table: after each flush, every subscriber is
+# called once per written row with the row and the fields that changed.
+#
+# Durability comes from a small append-only journal of the pending updates.
+# A save is acknowledged once its journal line is fsynced; concurrent saves
+# share one fsync (group commit) on a worker thread. A flush seals the
+# journal file it covers (renamed to <path>.<n>) and appends go on in a
+# fresh one; the sealed file is deleted once its batch is committed, and
+# whatever files are left are replayed into the store on startup, so a crash
+# loses no acknowledged save.
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+
+from .store import now
+
+WINDOW = 0.5
+MAX_PENDING = 500
+BUFFERED_TABLES = ("documents",)
+
+
+class Journal:
+    """JSON lines of (table, id, fields); a torn last line is ignored."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Files sealed by flushes that never committed, oldest first
+        self.sealed = sorted((name for name in glob.glob(glob.escape(path) + ".*")
+                              if name.rpartition(".")[2].isdigit()), key=lambda name: int(name.rpartition(".")[2]))
+        self.seals = int(self.sealed[-1].rpartition(".")[2]) if self.sealed else 0
+        self.file = open(path, "ab")
+        self.appended = 0
+        self.synced = 0
+        self.syncing = None
+        self.fsyncs = 0
+
+    def entries(self):
+        for path in (*self.sealed, self.path):
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    yield entry["table"], entry["id"], entry["fields"]
+
+    def append(self, table, row_id, fields):
+        line = json.dumps({"table": table, "id": row_id, "fields": fields}, separators=(",", ":"))
+        self.file.write(line.encode("utf-8") + b"\n")
+        self.appended += 1
+        return self.appended
+
+    async def sync(self, upto=None):
+        """Wait until entry upto (default: everything appended) is on disk."""
+        upto = self.appended if upto is None else upto
+        while self.synced < upto:
+            if self.syncing is None:
+                self.syncing = asyncio.ensure_future(self._fsync())
+            await asyncio.shield(self.syncing)
+
+    async def _fsync(self):
+        target = self.appended
+        try:
+            self.file.flush()
+            await asyncio.get_running_loop().run_in_executor(None, os.fsync, self.file.fileno())
+            self.fsyncs += 1
+            self.synced = max(self.synced, target)
+        finally:
+            self.syncing = None
+
+    def seal(self):
+        """Close the current file under a new name and start an empty one;
+        returns the sealed path. Everything appended must be synced first
+        when called on the event loop."""
+        if self.synced < self.appended:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.fsyncs += 1
+            self.synced = self.appended
+        self.file.close()
+        self.seals += 1
+        sealed = f"{self.path}.{self.seals}"
+        os.replace(self.path, sealed)
+        self.file = open(self.path, "ab")
+        return sealed
+
+    def release(self, paths):
+        """The entries in paths are in the database now."""
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        self.file.close()
+
+
+class WriteBehind:
+    """A row store whose updates to tables are buffered and written in
+    batches; see the module comment."""
+
+    def __init__(self, store, journal_path=None, window=WINDOW, max_pending=MAX_PENDING, tables=BUFFERED_TABLES):
+        self.store = store
+        self.window = window
+        self.max_pending = max_pending
+        self.tables = set(tables)
+        self.pending = {table: {} for table in self.tables}
+        # Last known full row of everything pending, so saves and ownership
+        # checks on a hot document do not read the database either
+        self.rows = {table: {} for table in self.tables}
+        # (batch, rows) of the flush being written, read through until it lands
+        self.flushing = None
+        self.turn = asyncio.Lock()
+        self.journal = Journal(journal_path) if journal_path else None
+        # Sealed journal files whose updates are back in pending
+        self.sealed = []
+        self.subscribers = {}
+        self.updates = 0
+        self.writes = 0
+        self.flushes = 0
+        if self.journal is not None:
+            self.replayed = self._replay()
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    def subscribe(self, table, callback):
+        """Call callback(row, fields) for each row of table a flush writes."""
+        self.subscribers.setdefault(table, []).append(callback)
+
+    def _replay(self):
+        count = 0
+        for table, row_id, fields in self.journal.entries():
+            self.pending.setdefault(table, {}).setdefault(row_id, {}).update(fields)
+            self.rows.setdefault(table, {})
+            count += 1
+        self.sealed = list(self.journal.sealed)
+        self._flush_now()
+        return count
+
+    def _cached(self, table, row_id):
+        row = self.rows.get(table, {}).get(row_id)
+        if row is None and self.flushing is not None:
+            row = self.flushing[1].get(table, {}).get(row_id)
+        return row
+
+    def _overlay(self, table, row_id, stored):
+        row = self._cached(table, row_id)
+        if row is not None:
+            return dict(row)
+        row = stored.get(row_id)
+        if row is None:
+            return None
+        if self.flushing is not None:
+            row = {**row, **self.flushing[0].get(table, {}).get(row_id, {})}
+        return {**row, **self.pending.get(table, {}).get(row_id, {})}
+
+    def get(self, table, row_id):
+        row = self._cached(table, row_id)
+        if row is not None:
+            return dict(row)
+        return self._overlay(table, row_id, {row_id: self.store.get(table, row_id)})
+
+    def get_many(self, table, row_ids):
+        row_ids = list(row_ids)
+        stored = {row["id"]: row for row in self.store.get_many(
+            table, [i for i in row_ids if self._cached(table, i) is None])}
+        return [row for row in (self._overlay(table, row_id, stored) for row_id in row_ids) if row is not None]
+
+    async def call(self, method, *args, **kwargs):
+        """The store's async interface (see store.py): the wrapped store does
+        its database work off the loop, the buffer is only touched on it."""
+        if method == "get":
+            table, row_id = args
+            row = self._cached(table, row_id)
+            if row is not None:
+                return dict(row)
+            row = await self.store.call("get", table, row_id)
+            # Saves may have landed while the read was in flight
+            return self._overlay(table, row_id, {row_id: row})
+        if method == "get_many":
+            table, row_ids = args
+            row_ids = list(row_ids)
+            stored = await self.store.call("get_many", table,
+                                           [i for i in row_ids if self._cached(table, i) is None])
+            stored = {row["id"]: row for row in stored}
+            return [row for row in (self._overlay(table, i, stored) for i in row_ids) if row is not None]
+        if method == "update" and args[0] in self.tables:
+            table, row_id, fields = args
+            row = await self.call("get", table, row_id)
+            if row is None:
+                return None
+            row = self._buffer(table, row_id, row, fields)
+            if self._full():
+                await self.flush()
+            return row
+        if method == "delete":
+            self._forget(args[0], args[1])
+        elif method in ("select", "query"):
+            await self.flush(args[0] if method == "select" else None)
+        return await self.store.call(method, *args, **kwargs)
+
+    def update(self, table, row_id, fields):
+        if table not in self.tables:
+            return self.store.update(table, row_id, fields)
+        row = self.get(table, row_id)
+        if row is None:
+            return None
+        row = self._buffer(table, row_id, row, fields)
+        if self._full():
+            self._flush_now()
+        return row
+
+    def _buffer(self, table, row_id, row, fields):
+        fields = dict(fields)
+        if "updated_at" in self.store.schema[table]:
+            fields["updated_at"] = now()
+        if self.journal is not None:
+            self.journal.append(table, row_id, fields)
+        self.pending[table].setdefault(row_id, {}).update(fields)
+        row.update(fields)
+        self.rows[table][row_id] = row
+        self.updates += 1
+        return dict(row)
+
+    def _full(self):
+        return sum(len(rows) for rows in self.pending.values()) >= self.max_pending
+
+    def _forget(self, table, row_id):
+        self.pending.get(table, {}).pop(row_id, None)
+        self.rows.get(table, {}).pop(row_id, None)
+        if self.flushing is not None:
+            self.flushing[1].get(table, {}).pop(row_id, None)
+
+    def delete(self, table, row_id):
+        self._forget(table, row_id)
+        return self.store.delete(table, row_id)
+
+    def select(self, table, **equals):
+        self._flush_now(table)
+        return self.store.select(table, **equals)
+
+    def scan(self, table, *args, **equals):
+        self._flush_now(table)
+        return self.store.scan(table, *args, **equals)
+
+    def query(self, endpoint, user_id, filters):
+        self._flush_now()
+        return self.store.query(endpoint, user_id, filters)
+
+    async def sync(self):
+        """Wait until every update so far would survive a crash."""
+        if self.journal is not None:
+            await self.journal.sync()
+
+    async def flush(self, table=None):
+        """Write the pending rows (of table, or all) in one transaction on the
+        database threads; returns how many rows were written."""
+        async with self.turn:
+            if self.journal is not None:
+                # Sealing needs every line on disk; saves may land during the fsync
+                while self.journal.synced < self.journal.appended:
+                    await self.journal.sync()
+            taken = self._take(table)
+            if taken is None:
+                return 0
+            batch, cached, sealed = taken
+            self.flushing = batch, cached
+            write = asyncio.ensure_future(self._offload(self._write, batch, cached))
+            try:
+                await asyncio.shield(write)
+            except asyncio.CancelledError:
+                # The transaction is already on a database thread; let it end
+                # before settling the batch, so no later flush can overtake it
+                await asyncio.wait([write])
+                raise
+            finally:
+                self.flushing = None
+                if write.cancelled() or write.exception() is not None:
+                    self._restore(batch, cached, sealed)
+                else:
+                    written = self._done(batch, cached, write.result(), sealed)
+            return written
+
+    async def _offload(self, func, *args):
+        # As store.call does: on the database threads when there is a database
+        db = getattr(self.store, "db", None)
+        return func(*args) if db is None else await db.offload(func, *args)
+
+    def _flush_now(self, table=None):
+        """flush() blocking the caller: for startup, shutdown and the
+        synchronous reads, never on the event loop's hot path."""
+        taken = self._take(table)
+        if taken is None:
+            return 0
+        batch, cached, sealed = taken
+        try:
+            stored = self._write(batch, cached)
+        except BaseException:
+            self._restore(batch, cached, sealed)
+            raise
+        return self._done(batch, cached, stored, sealed)
+
+    def _take(self, table):
+        if table is not None and not self.pending.get(table):
+            return None
+        batch = {name: rows for name, rows in self.pending.items() if rows}
+        if not batch:
+            return None
+        cached = self.rows
+        self.pending = {name: {} for name in self.pending}
+        self.rows = {name: {} for name in self.rows}
+        sealed = self.journal.seal() if self.journal is not None else None
+        return batch, cached, sealed
+
+    def _write(self, batch, cached):
+        """The transaction, then the rows subscribers need that are not cached."""
+        with self.store.bulk() as bulk:
+            for name, rows in batch.items():
+                bulk.update_many(name, rows.items())
+        stored = {}
+        for name, rows in batch.items():
+            if self.subscribers.get(name):
+                missing = [row_id for row_id in rows if row_id not in cached[name]]
+                stored[name] = {row["id"]: row for row in self.store.get_many(name, missing)} if missing else {}
+        return stored
+
+    def _restore(self, batch, cached, sealed):
+        # Put the batch back under anything saved since and keep its journal
+        for name, rows in batch.items():
+            for row_id, fields in rows.items():
+                self.pending[name][row_id] = {**fields, **self.pending[name].get(row_id, {})}
+                if row_id in cached[name] and row_id not in self.rows[name]:
+                    self.rows[name][row_id] = cached[name][row_id]
+        if sealed is not None:
+            self.sealed.append(sealed)
+
+    def _done(self, batch, cached, stored, sealed):
+        written = sum(len(rows) for rows in batch.values())
+        self.writes += written
+        self.flushes += 1
+        if self.journal is not None:
+            self.journal.release([*self.sealed, sealed])
+            self.sealed = []
+        self._notify(batch, cached, stored)
+        return written
+
+    def _notify(self, batch, cached, stored):
+        for name, rows in batch.items():
+            for callback in self.subscribers.get(name, ()):
+                for row_id, fields in rows.items():
+                    row = cached[name].get(row_id) or stored[name].get(row_id)
+                    if row is None:
+                        continue
+                    try:
+                        callback(dict(row), fields)
+                    except Exception as exc:
+                        # The rows are committed; one failing subscriber must not undo that
+                        print(f"⚠️ write-behind subscriber failed for {name} {row_id}: {exc}", file=sys.stderr)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.window)
+            try:
+                await self.flush()
+            except Exception as exc:
+                print(f"⚠️ write-behind flush failed, retrying: {exc}", file=sys.stderr)
+
+    def stats(self):
+        return {"pending": sum(len(rows) for rows in self.pending.values()), "updates": self.updates,
+                "writes": self.writes, "flushes": self.flushes,
+                "fsyncs": self.journal.fsyncs if self.journal is not None else 0}
+
+    def close(self):
+        self._flush_now()
+        if self.journal is not None:
+            self.journal.close()
+
+
+def benchmark(documents, saves, window=WINDOW):
+    """An autosave storm against SQLite: saves keystroke saves spread over
+    documents, written directly vs. through WriteBehind."""
+    from .db import Database
+    from .store import SQLStore
+
+    root = tempfile.mkdtemp(prefix="kortex-autosave-")
+    results = {}
+    for mode in ("direct", "write-behind"):
+        db = Database("development", connection=os.path.join(root, f"{mode}.db"))
+        db.migrate()
+        inner = SQLStore(db)
+        user = inner.insert("users", {"email": "bench@example.com", "password": "", "name": "Bench",
+                                      "preferences": {}})
+        ids = [inner.insert("documents", {"user_id": user["id"], "title": f"Sprint {i}", "content": "",
+                                          "type": "markdown", "folder_path": "/", "tags": [],
+                                          "metadata": {}})["id"] for i in range(documents)]
+        store = inner if mode == "direct" else WriteBehind(inner, os.path.join(root, "autosave.journal"), window)
+
+        async def editor(doc_id, count):
+            # One writer per document, each waiting for its save to be durable
+            text = ""
+            for _ in range(count):
+                text += "word "
+                if store is inner:
+                    store.update("documents", doc_id, {"content": text})
+                else:
+                    await store.call("update", "documents", doc_id, {"content": text})
+                    await store.sync()
+                await asyncio.sleep(0)
+
+        async def storm():
+            flusher = asyncio.create_task(store.run()) if store is not inner else None
+            await asyncio.gather(*(editor(doc_id, saves // documents) for doc_id in ids))
+            if flusher is not None:
+                flusher.cancel()
+
+        start = time.perf_counter()
+        asyncio.run(storm())
+        if store is not inner:
+            store.close()
+        elapsed = time.perf_counter() - start
+        results[mode] = {"seconds": elapsed, "writes": store.writes if store is not inner else saves // documents * documents,
+                         "fsyncs": store.journal.fsyncs if store is not inner else 0}
+        db.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write-behind buffer for autosaves")
+    parser.add_argument("--bench", type=int, metavar="SAVES", help="replay SAVES autosaves against SQLite")
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--window", type=float, default=WINDOW)
+    args = parser.parse_args(argv)
+    if not args.bench:
+        parser.print_help()
+        return 0
+    results = benchmark(args.documents, args.bench, args.window)
+    direct, buffered = results["direct"], results["write-behind"]
+    print(f"💾 {args.bench:,} saves over {args.documents} documents")
+    print(f"🐢 direct: {direct['seconds']:.2f} s, {direct['writes']:,} row writes")
+    print(f"🚀 write-behind: {buffered['seconds']:.2f} s, {buffered['writes']:,} row writes, "
+          f"{buffered['fsyncs']:,} journal fsyncs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
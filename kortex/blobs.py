@@ -0,0 +1,282 @@
+# Content-addressed asset storage and resumable chunked uploads
+#
+# Files live under upload_dir/blobs/ named by their SHA-256, so the same
+# bytes uploaded twice are stored once and every asset row simply refers to
+# the blob. Chunked uploads stream into upload_dir/partial/<id>.part with a
+# small JSON sidecar; the offset to resume from is the size of the part
+# file, so a session survives a restart. File I/O and hashing run on a
+# thread pool and never on the event loop.
+#
+# Each blob counts the asset rows that refer to it. Storing a blob and
+# releasing one adjust the count under a per-digest lock, so the last
+# release cannot delete bytes that a concurrent upload has just reused.
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from .store import new_id
+
+# Suggested chunk size; each chunk is one request body, so this also bounds
+# what the server holds in memory per upload
+CHUNK_SIZE = 8 * 1024 * 1024
+MAX_UPLOAD_SIZE = 5 * 1024 * 1024 * 1024
+
+# Unfinished uploads older than this are purged
+UPLOAD_TTL = 24 * 3600
+
+IO_WORKERS = 4
+READ_SIZE = 1024 * 1024
+
+
+class UploadMissing(KeyError):
+    pass
+
+
+class OffsetMismatch(ValueError):
+    def __init__(self, expected):
+        super().__init__(f"chunk must start at offset {expected}")
+        self.expected = expected
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(READ_SIZE)
+            if not block:
+                return digest.hexdigest()
+            digest.update(block)
+
+
+class BlobStore:
+    def __init__(self, root, workers=IO_WORKERS):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="blobs")
+        # Running hashes of in-progress uploads; rebuilt from the part file
+        # if the process restarted mid-upload
+        self.hashers = {}
+        # Keyed locks for uploads and digests: [lock, users], dropped with
+        # their last user
+        self.locks = {}
+        self.guard = threading.Lock()
+        # digest -> asset rows referring to the blob
+        self.refs = {}
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    @staticmethod
+    def filename(digest):
+        """Blob path relative to the upload directory."""
+        return f"blobs/{digest[:2]}/{digest}"
+
+    @staticmethod
+    def thumbnail(digest):
+        return f"thumbs/{digest[:2]}/{digest}.png"
+
+    def path(self, filename):
+        return os.path.abspath(os.path.join(self.root, filename))
+
+    def _partial(self, upload_id, suffix):
+        if not upload_id.isalnum():
+            raise UploadMissing(upload_id)
+        return os.path.join(self.root, "partial", upload_id + suffix)
+
+    @contextmanager
+    def _lock(self, key):
+        with self.guard:
+            entry = self.locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self.guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self.locks[key]
+
+    def track(self, digests):
+        """Count references from existing asset rows, once at startup."""
+        for digest in digests:
+            self.refs[digest] = self.refs.get(digest, 0) + 1
+
+    def _store(self, source, digest):
+        """Move a finished file into place, or drop it if the blob exists,
+        and count the reference the caller is about to record."""
+        target = os.path.join(self.root, self.filename(digest))
+        with self._lock("blob:" + digest):
+            self.refs[digest] = self.refs.get(digest, 0) + 1
+            if os.path.exists(target):
+                os.remove(source)
+                return False
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(source, target)
+            return True
+
+    # Whole files (multipart uploads)
+
+    def _put(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        # Reuse an existing blob without writing a copy first
+        with self._lock("blob:" + digest):
+            if os.path.exists(os.path.join(self.root, self.filename(digest))):
+                self.refs[digest] = self.refs.get(digest, 0) + 1
+                return digest, False
+        os.makedirs(os.path.join(self.root, "partial"), exist_ok=True)
+        temp = self._partial(new_id(), ".tmp")
+        with open(temp, "wb") as f:
+            f.write(data)
+        return digest, self._store(temp, digest)
+
+    async def put(self, data):
+        """Store bytes and count a reference to them; returns (sha256,
+        whether a new blob was written)."""
+        return await self._run(self._put, data)
+
+    def ingest(self, chunks, digest=None):
+        """Store an iterable of byte chunks on the calling thread; returns
+        (sha256, whether a new blob was written). With digest given the
+        content must hash to it or nothing is stored."""
+        os.makedirs(os.path.join(self.root, "partial"), exist_ok=True)
+        temp = self._partial(new_id(), ".tmp")
+        hasher = hashlib.sha256()
+        try:
+            with open(temp, "wb") as f:
+                for chunk in chunks:
+                    hasher.update(chunk)
+                    f.write(chunk)
+            actual = hasher.hexdigest()
+            if digest is not None and actual != digest:
+                raise ValueError(f"blob content does not match {digest}")
+            return actual, self._store(temp, actual)
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+
+    # Chunked uploads
+
+    def _create(self, user_id, filename, size, mime_type):
+        upload_id = new_id()
+        meta = {"id": upload_id, "user_id": user_id, "filename": filename, "size": size,
+                "mime_type": mime_type, "created_at": time.time()}
+        os.makedirs(os.path.join(self.root, "partial"), exist_ok=True)
+        open(self._partial(upload_id, ".part"), "wb").close()
+        with open(self._partial(upload_id, ".json"), "w") as f:
+            json.dump(meta, f)
+        self.hashers[upload_id] = (0, hashlib.sha256())
+        return dict(meta, offset=0)
+
+    async def create(self, user_id, filename, size, mime_type):
+        return await self._run(self._create, user_id, filename, size, mime_type)
+
+    def _session(self, upload_id):
+        try:
+            with open(self._partial(upload_id, ".json")) as f:
+                meta = json.load(f)
+            return dict(meta, offset=os.path.getsize(self._partial(upload_id, ".part")))
+        except (FileNotFoundError, ValueError):
+            raise UploadMissing(upload_id)
+
+    async def session(self, upload_id):
+        return await self._run(self._session, upload_id)
+
+    def _append(self, upload_id, offset, data):
+        with self._lock(upload_id):
+            session = self._session(upload_id)
+            if offset != session["offset"]:
+                raise OffsetMismatch(session["offset"])
+            if offset + len(data) > session["size"]:
+                raise ValueError("chunk runs past the declared upload size")
+            with open(self._partial(upload_id, ".part"), "ab") as f:
+                f.write(data)
+            hashed, hasher = self.hashers.get(upload_id, (None, None))
+            if hashed == offset:
+                hasher.update(data)
+                self.hashers[upload_id] = (offset + len(data), hasher)
+            return dict(session, offset=offset + len(data))
+
+    async def append(self, upload_id, offset, data):
+        """Write one chunk at offset; returns the updated session."""
+        return await self._run(self._append, upload_id, offset, data)
+
+    def _complete(self, upload_id):
+        with self._lock(upload_id):
+            session = self._session(upload_id)
+            if session["offset"] != session["size"]:
+                raise OffsetMismatch(session["offset"])
+            part = self._partial(upload_id, ".part")
+            hashed, hasher = self.hashers.pop(upload_id, (None, None))
+            digest = hasher.hexdigest() if hashed == session["size"] else hash_file(part)
+            created = self._store(part, digest)
+            os.remove(self._partial(upload_id, ".json"))
+        return session, digest, created
+
+    async def complete(self, upload_id):
+        """Finish an upload; returns (session, sha256, whether a new blob was written)."""
+        return await self._run(self._complete, upload_id)
+
+    def _abort(self, upload_id):
+        with self._lock(upload_id):
+            self.hashers.pop(upload_id, None)
+            for suffix in (".part", ".json"):
+                try:
+                    os.remove(self._partial(upload_id, suffix))
+                except FileNotFoundError:
+                    pass
+
+    async def abort(self, upload_id):
+        await self._run(self._abort, upload_id)
+
+    def _purge(self, max_age):
+        directory = os.path.join(self.root, "partial")
+        cutoff = time.time() - max_age
+        removed = 0
+        for name in os.listdir(directory) if os.path.isdir(directory) else ():
+            upload_id, suffix = os.path.splitext(name)
+            path = os.path.join(directory, name)
+            if suffix == ".json":
+                # The part file is touched by every chunk; the sidecar is not
+                part = os.path.join(directory, upload_id + ".part")
+                stamp = os.path.getmtime(part) if os.path.exists(part) else os.path.getmtime(path)
+                if stamp < cutoff:
+                    self._abort(upload_id)
+                    removed += 1
+            elif suffix == ".tmp" and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        return removed
+
+    async def purge_every(self, interval=3600.0, max_age=UPLOAD_TTL):
+        """Background task: remove uploads abandoned for max_age seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            await self._run(self._purge, max_age)
+
+    def discard(self, digest):
+        """Remove a blob and its thumbnail on the calling thread."""
+        for filename in (self.filename(digest), self.thumbnail(digest)):
+            try:
+                os.remove(os.path.join(self.root, filename))
+            except FileNotFoundError:
+                pass
+
+    def _unref(self, digest):
+        with self._lock("blob:" + digest):
+            count = self.refs.get(digest, 0) - 1
+            if count > 0:
+                self.refs[digest] = count
+                return False
+            self.refs.pop(digest, None)
+            self.discard(digest)
+            return True
+
+    async def release(self, digest):
+        """Drop one reference; the blob is deleted with its last one.
+        Returns whether it was."""
+        return await self._run(self._unref, digest)
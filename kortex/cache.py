@@ -0,0 +1,136 @@
+# Response cache for the AI endpoints
+#
+# Keys are a canonical hash of the request fields that determine a
+# completion, so repeated generations (template expansions, retries) are
+# served from memory without calling the provider or spending tokens.
+# Entries are evicted least-recently-used once the cache is full, and expire
+# after a TTL either way. An optional SQLite file adds a second, larger tier
+# that survives restarts; purge_every() sweeps expired rows out of it.
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+
+
+def canonical_key(fields):
+    """Stable hash of a JSON-compatible dict, independent of key order."""
+    encoded = json.dumps(fields, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class DiskTier:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS response_cache (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            expires_at REAL
+        ) WITHOUT ROWID""")
+
+    def get(self, key, now):
+        row = self.conn.execute("SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= now:
+            self.conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+            return None
+        return json.loads(value), expires_at
+
+    def put(self, key, value, expires_at):
+        self.conn.execute("INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?)",
+                          (key, json.dumps(value), expires_at))
+
+    def purge(self, now):
+        return self.conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,)).rowcount
+
+
+class ResponseCache:
+    def __init__(self, max_entries=10_000, ttl=3600.0, disk_path=None, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.disk = DiskTier(disk_path) if disk_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        now = self.clock()
+        entry = self.entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at is None or expires_at > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self.entries[key]
+            self.expirations += 1
+        if self.disk is not None:
+            found = self.disk.get(key, now)
+            if found is not None:
+                value, expires_at = found
+                self._store(key, value, expires_at)
+                self.disk_hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key, value, ttl=None, persist=True):
+        """Cache value; ttl=None uses the default, 0 means never expire.
+        persist=False keeps it out of the disk tier."""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = self.clock() + ttl if ttl else None
+        self._store(key, value, expires_at)
+        if self.disk is not None and persist:
+            self.disk.put(key, value, expires_at)
+
+    def _store(self, key, value, expires_at):
+        self.entries[key] = (expires_at, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def purge(self):
+        """Drop expired entries from both tiers; returns how many went."""
+        now = self.clock()
+        expired = [key for key, (expires_at, _) in self.entries.items()
+                   if expires_at is not None and expires_at <= now]
+        for key in expired:
+            del self.entries[key]
+        self.expirations += len(expired)
+        removed = self.disk.purge(now) if self.disk is not None else 0
+        return len(expired) + removed
+
+    async def purge_every(self, interval=600.0):
+        """Background task: expired entries are otherwise only dropped when
+        looked up again."""
+        while True:
+            await asyncio.sleep(interval)
+            self.purge()
+
+    def invalidate(self, key):
+        self.entries.pop(key, None)
+        if self.disk is not None:
+            self.disk.conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
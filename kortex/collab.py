@@ -0,0 +1,292 @@
+# Real-time collaboration rooms behind WebSocket /collaboration/rooms/:id
+#
+# Each open room holds the document content as a sequence CRDT (see crdt.py).
+# Members keep their own replica and send operations; the server integrates
+# them and relays them to everyone else. Every outgoing message is encoded
+# once and the same frame written to each member, so a broadcast is O(members)
+# socket writes with no per-member serialization. Cursor moves are coalesced
+# per member and flushed as one batch every CURSOR_INTERVAL, and the text is
+# written back to documents.content (and the revision history) every
+# SNAPSHOT_INTERVAL while it changes and once more when the last member
+# leaves.
+#
+# Messages from a member:
+#   {"type": "document-change", "ops": [op, ...]}
+#   {"type": "cursor-move", "position": any}
+# Messages from the server:
+#   {"type": "sync", "site": n, "state": runs, "members": [...]}   on join
+#   {"type": "user-join", "site": n, "user": {...}}
+#   {"type": "document-change", "site": n, "ops": [op, ...]}
+#   {"type": "cursor-move", "cursors": [{"site": n, "position": any}, ...]}
+#   {"type": "user-leave", "site": n}
+#   {"type": "error", "error": "..."}
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+from .crdt import BASE_SITE, Sequence, checked
+from .metrics import ROOM_FANOUT
+from .websocket import message
+
+CURSOR_INTERVAL = 0.05
+SNAPSHOT_INTERVAL = 5.0
+
+
+class Member:
+    __slots__ = ("site", "user", "ws")
+
+    def __init__(self, site, user, ws):
+        self.site = site
+        self.user = user
+        self.ws = ws
+
+
+class Room:
+    def __init__(self, room_id, document, store):
+        self.id = room_id
+        self.document_id = document["id"]
+        self.store = store
+        self.sequence = Sequence(document.get("content") or "")
+        self.members = {}
+        self.next_site = BASE_SITE + 1
+        self.cursors = {}
+        self.cursor_flush = None
+        self.dirty = False
+        self.snapshots = 0
+        self.snapshotter = asyncio.get_running_loop().create_task(self._snapshot_every())
+
+    def broadcast(self, frame, exclude=None):
+        ROOM_FANOUT.observe(len(self.members) - (exclude in self.members))
+        for site, member in list(self.members.items()):
+            if site != exclude and not member.ws.send(frame):
+                # Too far behind to catch up; its session ends and it rejoins
+                member.ws.abort()
+
+    def join(self, user, ws):
+        site = self.next_site
+        self.next_site += 1
+        members = [{"site": m.site, "user": m.user} for m in self.members.values()]
+        self.members[site] = Member(site, user, ws)
+        ws.send(message({"type": "sync", "site": site, "state": self.sequence.state(), "members": members}))
+        self.broadcast(message({"type": "user-join", "site": site, "user": user}), exclude=site)
+        return site
+
+    def leave(self, site):
+        if self.members.pop(site, None) is not None:
+            self.cursors.pop(site, None)
+            self.broadcast(message({"type": "user-leave", "site": site}))
+
+    def change(self, site, ops):
+        applied = []
+        try:
+            for op in ops:
+                op = checked(op, site)
+                self.sequence.apply(op)
+                applied.append(op)
+        except (KeyError, TypeError, ValueError, IndexError):
+            self.members[site].ws.send(message({"type": "error", "error": "invalid or out-of-order operation"}))
+        if applied:
+            self.dirty = True
+            self.broadcast(message({"type": "document-change", "site": site, "ops": applied}), exclude=site)
+
+    def move_cursor(self, site, position):
+        # Only the latest position per member survives until the next flush
+        self.cursors[site] = position
+        if self.cursor_flush is None:
+            self.cursor_flush = asyncio.get_running_loop().call_later(CURSOR_INTERVAL, self._flush_cursors)
+
+    def _flush_cursors(self):
+        self.cursor_flush = None
+        if self.cursors:
+            cursors = [{"site": site, "position": position} for site, position in self.cursors.items()]
+            self.cursors = {}
+            self.broadcast(message({"type": "cursor-move", "cursors": cursors}))
+
+    def snapshot(self):
+        """Write the live text (tombstones and ids dropped) to documents.content;
+        search, revisions and the rest follow from the store's flush."""
+        if not self.dirty:
+            return False
+        self.store.update("documents", self.document_id, {"content": self.sequence.text()})
+        self.dirty = False
+        self.snapshots += 1
+        return True
+
+    async def _snapshot_every(self):
+        while True:
+            await asyncio.sleep(SNAPSHOT_INTERVAL)
+            self.snapshot()
+
+    def close(self):
+        self.snapshotter.cancel()
+        if self.cursor_flush is not None:
+            self.cursor_flush.cancel()
+        self.snapshot()
+
+    async def session(self, ws, user):
+        site = self.join(user, ws)
+        try:
+            while True:
+                raw = await ws.receive()
+                if raw is None:
+                    break
+                try:
+                    msg = json.loads(raw)
+                    kind = msg["type"]
+                except (ValueError, TypeError, KeyError):
+                    ws.send(message({"type": "error", "error": "expected a JSON message with a type"}))
+                    continue
+                if kind == "document-change" and isinstance(msg.get("ops"), list):
+                    self.change(site, msg["ops"])
+                elif kind == "cursor-move":
+                    self.move_cursor(site, msg.get("position"))
+                else:
+                    ws.send(message({"type": "error", "error": f"unsupported message {kind!r}"}))
+        finally:
+            self.leave(site)
+
+
+class RoomManager:
+    """Open rooms by id; a room lives while it has members."""
+
+    def __init__(self, store):
+        self.store = store
+        self.rooms = {}
+
+    async def session(self, room, document, user, ws):
+        live = self.rooms.get(room["id"])
+        if live is None:
+            live = self.rooms[room["id"]] = Room(room["id"], document, self.store)
+        try:
+            await live.session(ws, user)
+        finally:
+            # Compaction: an empty room is dropped and reopens from the
+            # snapshot, so tombstones never outlive the editing session
+            if not live.members and self.rooms.get(room["id"]) is live:
+                del self.rooms[room["id"]]
+                live.close()
+
+    def close(self):
+        for room in self.rooms.values():
+            room.close()
+        self.rooms.clear()
+
+
+# Load test: editors connected over real sockets, each with its own replica
+
+async def _editor(ws, stats, edits, interval, rng):
+    sequence = None
+    pending = edits
+
+    async def write():
+        nonlocal pending
+        while sequence is None:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(rng.random() * interval)
+        while pending:
+            if rng.random() < 0.8 or not len(sequence):
+                op = sequence.insert(rng.randint(0, len(sequence)), rng.choice("abcdefgh "))
+                key = tuple(op["id"])
+            else:
+                op = sequence.delete(rng.randrange(len(sequence)))
+                key = tuple(op["delete"][0][:2]) + ("-",)
+            stats["sent"][key] = time.perf_counter()
+            stats["edits"] += 1
+            ws.send(message({"type": "document-change", "ops": [op]}, mask=True))
+            if rng.random() < 0.5:
+                ws.send(message({"type": "cursor-move", "position": len(sequence)}, mask=True))
+            pending -= 1
+            await asyncio.sleep(interval * (0.5 + rng.random()))
+
+    writer = asyncio.create_task(write())
+    try:
+        while True:
+            raw = await ws.receive()
+            if raw is None:
+                break
+            msg = json.loads(raw)
+            if msg["type"] == "sync":
+                sequence = Sequence.from_state(msg["state"], msg["site"])
+            elif msg["type"] == "document-change":
+                now = time.perf_counter()
+                for op in msg["ops"]:
+                    sequence.apply(op)
+                    key = tuple(op["id"]) if "insert" in op else tuple(op["delete"][0][:2]) + ("-",)
+                    stats["seen"][key] = now
+            elif msg["type"] == "cursor-move":
+                stats["cursor_batches"] += 1
+    finally:
+        writer.cancel()
+    return sequence
+
+
+async def _bench(editors, edits, interval):
+    from .http import start_server
+    from .server import App
+
+    app = App(upload_dir="/tmp/kortex-bench-uploads")
+    owner = app.store.insert("users", {"email": "bench@example.com", "password": "", "name": "Bench", "preferences": {}})
+    doc = app.store.insert("documents", {"user_id": owner["id"], "title": "Bench", "content": "Shared notes\n",
+                                         "type": "markdown", "folder_path": "/", "tags": [], "metadata": {}})
+    room = app.store.insert("collaboration_rooms", {"document_id": doc["id"], "owner_id": owner["id"],
+                                                    "name": "bench", "members": [], "settings": {}})
+    token = app.issue_token(owner)
+    server = await start_server(app.dispatch, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    from .websocket import connect
+    path = f"{app.router.prefix}/collaboration/rooms/{room['id']}?token={token}"
+    sockets = [await connect("127.0.0.1", port, path) for _ in range(editors)]
+    stats = {"sent": {}, "seen": {}, "edits": 0, "cursor_batches": 0}
+    rng = random.Random(7)
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(_editor(ws, stats, edits, interval, random.Random(rng.random()))) for ws in sockets]
+
+    # Let the last edits propagate, then hang up and compare replicas
+    total = editors * edits
+    while stats["edits"] < total:
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(0.5)
+    elapsed = time.perf_counter() - start
+    live = app.rooms.rooms[room["id"]]
+    expected = live.sequence.text()
+    for ws in sockets:
+        await ws.close()
+    replicas = await asyncio.gather(*tasks)
+    await asyncio.sleep(0.1)
+    server.close()
+    await server.wait_closed()
+
+    # Latency until the last member has an edit, per edit
+    latencies = sorted((stats["seen"][key] - sent) * 1000 for key, sent in stats["sent"].items() if key in stats["seen"])
+    return {
+        "editors": editors,
+        "edits": total,
+        "seconds": elapsed,
+        "converged": all(r is not None and r.text() == expected for r in replicas),
+        "snapshot_matches": app.store.get("documents", doc["id"])["content"] == expected,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1],
+        "cursor_batches": stats["cursor_batches"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Collaboration room load test")
+    parser.add_argument("--editors", type=int, default=100)
+    parser.add_argument("--edits", type=int, default=20, help="edits per editor")
+    parser.add_argument("--interval", type=float, default=1.0, help="mean seconds between an editor's edits")
+    args = parser.parse_args(argv)
+    result = asyncio.run(_bench(args.editors, args.edits, args.interval))
+    print(f"✍️ {result['editors']} editors, {result['edits']} edits in {result['seconds']:.1f}s")
+    print(f"⏱️ convergence p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms")
+    print(f"🔁 replicas converged: {result['converged']}, snapshot matches: {result['snapshot_matches']}")
+    print(f"🖱️ cursor batches received: {result['cursor_batches']}")
+    return 0 if result["converged"] and result["snapshot_matches"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+# Environment settings resolved from server_config
+import os
+
+from .spec import get_server_config
+
+ENV_PREFIX = "process.env."
+
+
+def current_env():
+    return os.environ.get("KORTEX_ENV") or os.environ.get("NODE_ENV") or "development"
+
+
+def resolve(value):
+    """Resolve "process.env.NAME" and "process.env.NAME || default" strings."""
+    if not isinstance(value, str) or not value.startswith(ENV_PREFIX):
+        return value
+    name, _, default = (part.strip() for part in value.partition("||"))
+    resolved = os.environ.get(name[len(ENV_PREFIX):])
+    if resolved is not None:
+        return resolved
+    if not default:
+        return None
+    return int(default) if default.isdigit() else default
+
+
+def _resolve_tree(node):
+    if isinstance(node, dict):
+        return {key: _resolve_tree(value) for key, value in node.items()}
+    return resolve(node)
+
+
+def settings(env=None):
+    env = env or current_env()
+    if env not in get_server_config():
+        raise KeyError(f"no server_config for environment {env!r}")
+    return _resolve_tree(get_server_config()[env])
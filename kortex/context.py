@@ -0,0 +1,455 @@
+# Context assembly for the AI endpoints: chunk, embed, retrieve, pack
+#
+# Each user's documents are split into chunks along Markdown blocks (blank
+# lines), with long blocks cut into windows and short ones (headings, one
+# liners) carried into the block after them. A chunk's boundaries depend
+# only on its own blocks, so editing a paragraph changes that chunk and no
+# other. Chunks are embedded by a deterministic local stand-in for an
+# embedding model: hashed bag-of-words, signed and L2-normalised. Vectors
+# are cached by a hash of the chunk text, so re-indexing an edited document
+# only embeds the chunks whose text changed.
+#
+# The index is brute force by default: one matrix product against every
+# chunk the user has. With index "ivf" (and more than IVF_MIN_ROWS chunks)
+# rows are clustered with k-means and a query only scores the clusters
+# nearest to it, trading a little recall for a lot fewer dot products.
+# Retrieved chunks are packed best-first into what is left of the model's
+# maxTokens after the prompt, the caller's own context and room for the
+# reply. Without NumPy the flat index runs in pure Python.
+#
+# A user's index is built on first use from rows read through store.call,
+# with the embedding done on a worker thread so the event loop keeps
+# serving; edits that land mid-build are applied to it afterwards. Up to
+# MAX_USERS indexes stay loaded, least recently used first out.
+import argparse
+import asyncio
+import hashlib
+import heapq
+import math
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import lru_cache
+
+from .ai import count_tokens, render_context
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DIMENSIONS = 256
+CHUNK_TOKENS = 200
+# Blocks shorter than this are joined to the block after them
+MIN_CHUNK_TOKENS = 40
+TOP_K = 8
+# Hits scoring below this share too few words with the query to help
+MIN_SCORE = 0.05
+# Share of maxTokens kept free for the completion
+RESPONSE_RESERVE = 0.25
+DEFAULT_MAX_TOKENS = 4000
+EMBEDDING_CACHE_SIZE = 200_000
+# Users whose index stays loaded
+MAX_USERS = 256
+
+IVF_MIN_ROWS = 4096
+IVF_PROBES = 8
+IVF_ITERATIONS = 8
+
+BLOCK_BREAK = re.compile(r"\n[ \t]*\n")
+WORD = re.compile(r"\w+")
+STOPWORDS = frozenset("""a an and are as at be but by for from has have he her his i in is it its of on or
+she that the their them they this to was we were will with you your""".split())
+
+
+def split_chunks(text, max_tokens=CHUNK_TOKENS, min_tokens=MIN_CHUNK_TOKENS):
+    pieces = []
+    pending = ""
+    for block in BLOCK_BREAK.split(text or ""):
+        block = block.strip()
+        if not block:
+            continue
+        if pending:
+            block = pending + "\n\n" + block
+        if count_tokens(block) < min_tokens:
+            pending = block
+            continue
+        pending = ""
+        pieces.extend(_windows(block, max_tokens * 4))
+    if pending:
+        pieces.append(pending)
+    return pieces
+
+
+def _windows(block, size):
+    while len(block) > size:
+        cut = block.rfind(" ", size // 2, size)
+        if cut < 0:
+            cut = size
+        yield block[:cut].strip()
+        block = block[cut:].strip()
+    if block:
+        yield block
+
+
+def chunk_key(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+@lru_cache(maxsize=100_000)
+def _feature(word, dims):
+    value = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+    return value % dims, 1.0 if value >> 63 else -1.0
+
+
+def embed(text, dims=DIMENSIONS):
+    """Unit vector for text; texts sharing words point the same way."""
+    vector = [0.0] * dims
+    counts = Counter(w for w in WORD.findall(text.lower()) if w not in STOPWORDS)
+    for word, count in counts.items():
+        index, sign = _feature(word, dims)
+        vector[index] += sign * (1.0 + math.log(count))
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    vector = [v / norm for v in vector]
+    return np.asarray(vector, dtype=np.float32) if np is not None else vector
+
+
+class EmbeddingCache:
+    """LRU of chunk hash -> vector; shared by the loop and index builds."""
+
+    def __init__(self, dims=DIMENSIONS, max_entries=EMBEDDING_CACHE_SIZE):
+        self.dims = dims
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def vector(self, key, text):
+        with self.lock:
+            vector = self.entries.get(key)
+            if vector is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return vector
+            self.misses += 1
+        vector = embed(text, self.dims)
+        with self.lock:
+            self.entries[key] = vector
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return vector
+
+
+class Chunk:
+    __slots__ = ("document_id", "title", "text", "tokens")
+
+    def __init__(self, document_id, title, text):
+        self.document_id = document_id
+        self.title = title
+        self.text = text
+        self.tokens = count_tokens(text)
+
+
+class VectorIndex:
+    """Unit vectors in rows, labelled with their Chunk. Removing a
+    document moves the last rows into its slots, so rows stay dense."""
+
+    def __init__(self, dims=DIMENSIONS, mode="flat"):
+        self.dims = dims
+        self.mode = mode if np is not None else "flat"
+        self.size = 0
+        self.vectors = np.zeros((64, dims), dtype=np.float32) if np is not None else []
+        self.chunks = []
+        self.rows = {}
+        # IVF state: centroids, the cluster of each row, and the size trained at
+        self.centroids = None
+        self.clusters = None
+        self.trained = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, document_id, entries):
+        """entries: (Chunk, vector) pairs for one document."""
+        rows = self.rows.setdefault(document_id, [])
+        for chunk, vector in entries:
+            if np is not None:
+                if self.size == len(self.vectors):
+                    self.vectors = np.concatenate([self.vectors, np.zeros_like(self.vectors)])
+                    if self.clusters is not None:
+                        self.clusters = np.concatenate([self.clusters, np.zeros_like(self.clusters)])
+                self.vectors[self.size] = vector
+                if self.clusters is not None:
+                    self.clusters[self.size] = int(np.argmax(self.centroids @ vector))
+            else:
+                self.vectors.append(vector)
+            self.chunks.append(chunk)
+            rows.append(self.size)
+            self.size += 1
+
+    def remove(self, document_id):
+        for row in sorted(self.rows.pop(document_id, ()), reverse=True):
+            last = self.size - 1
+            if row != last:
+                moved = self.chunks[last]
+                self.chunks[row] = moved
+                self.vectors[row] = self.vectors[last]
+                if self.clusters is not None:
+                    self.clusters[row] = self.clusters[last]
+                owner = self.rows[moved.document_id]
+                owner[owner.index(last)] = row
+            self.chunks.pop()
+            if np is None:
+                self.vectors.pop()
+            self.size = last
+
+    def _train(self):
+        rng = np.random.default_rng(0)
+        vectors = self.vectors[:self.size]
+        lists = max(2, int(math.sqrt(self.size)))
+        sample = vectors[rng.choice(self.size, min(self.size, lists * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), lists, replace=False)].copy()
+        for _ in range(IVF_ITERATIONS):
+            assigned = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(lists):
+                members = sample[assigned == c]
+                if len(members):
+                    mean = members.sum(axis=0)
+                    centroids[c] = mean / (np.linalg.norm(mean) or 1.0)
+        self.centroids = centroids
+        self.clusters = np.zeros(len(self.vectors), dtype=np.int32)
+        self.clusters[:self.size] = np.argmax(vectors @ centroids.T, axis=1)
+        self.trained = self.size
+
+    def search(self, query, k):
+        """Up to k (score, Chunk) pairs, best first."""
+        if not self.size:
+            return []
+        if np is None:
+            scored = ((sum(a * b for a, b in zip(query, vector)), row) for row, vector in enumerate(self.vectors))
+            return [(score, self.chunks[row]) for score, row in heapq.nlargest(k, scored)]
+        rows = None
+        if self.mode == "ivf" and self.size >= IVF_MIN_ROWS:
+            # Retrain once the index has doubled or halved since the last time
+            if not self.trained or not self.trained // 2 <= self.size <= self.trained * 2:
+                self._train()
+            probes = np.argsort(self.centroids @ query)[-IVF_PROBES:]
+            rows = np.flatnonzero(np.isin(self.clusters[:self.size], probes))
+            scores = self.vectors[rows] @ query
+        else:
+            scores = self.vectors[:self.size] @ query
+        k = min(k, len(scores))
+        if not k:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        if rows is not None:
+            return [(float(scores[i]), self.chunks[rows[i]]) for i in best]
+        return [(float(scores[i]), self.chunks[i]) for i in best]
+
+
+def pack(hits, budget):
+    """Best-first hits that fit in budget tokens, skipping any that do not."""
+    chosen = []
+    used = 0
+    for score, chunk in hits:
+        if score < MIN_SCORE:
+            break
+        if used + chunk.tokens <= budget:
+            chosen.append((score, chunk))
+            used += chunk.tokens
+    return chosen, used
+
+
+class ContextEngine:
+    """One index per user, built from their documents on first use and then
+    kept current by the document handlers, for up to max_users users."""
+
+    def __init__(self, store, settings=None, max_users=MAX_USERS):
+        settings = settings or {}
+        self.store = store
+        self.dims = int(settings.get("dimensions") or DIMENSIONS)
+        self.mode = settings.get("index") or "flat"
+        self.top_k = int(settings.get("topK") or TOP_K)
+        self.chunk_tokens = int(settings.get("chunkTokens") or CHUNK_TOKENS)
+        self.max_users = max_users
+        self.embeddings = EmbeddingCache(self.dims)
+        self.indexes = OrderedDict()
+        # user id -> the build in flight, and the documents changed during it
+        # (doc id -> row, or None once deleted)
+        self.loading = {}
+        self.changed = {}
+
+    def _entries(self, doc):
+        title = doc.get("title") or ""
+        entries = []
+        for text in split_chunks(doc.get("content") or "", self.chunk_tokens):
+            entries.append((Chunk(doc["id"], title, text), self.embeddings.vector(chunk_key(text), text)))
+        return entries
+
+    def _build(self, docs):
+        index = VectorIndex(self.dims, self.mode)
+        for doc in docs:
+            index.add(doc["id"], self._entries(doc))
+        return index
+
+    async def for_user(self, user_id):
+        index = self.indexes.get(user_id)
+        if index is not None:
+            self.indexes.move_to_end(user_id)
+            return index
+        loading = self.loading.get(user_id)
+        if loading is None:
+            self.changed[user_id] = {}
+            loading = self.loading[user_id] = asyncio.ensure_future(self._load(user_id))
+        return await asyncio.shield(loading)
+
+    async def _load(self, user_id):
+        try:
+            docs = await self.store.call("select", "documents", user_id=user_id)
+            index = await asyncio.get_running_loop().run_in_executor(None, self._build, docs)
+            # Edits made while the index was being built replace what it read
+            for doc_id, doc in self.changed[user_id].items():
+                index.remove(doc_id)
+                if doc is not None:
+                    index.add(doc_id, self._entries(doc))
+            self.indexes[user_id] = index
+            while len(self.indexes) > self.max_users:
+                self.indexes.popitem(last=False)
+            return index
+        finally:
+            del self.changed[user_id]
+            del self.loading[user_id]
+
+    def document_changed(self, doc):
+        changed = self.changed.get(doc["user_id"])
+        if changed is not None:
+            changed[doc["id"]] = doc
+        index = self.indexes.get(doc["user_id"])
+        if index is not None:
+            index.remove(doc["id"])
+            index.add(doc["id"], self._entries(doc))
+
+    def document_removed(self, user_id, doc_id):
+        changed = self.changed.get(user_id)
+        if changed is not None:
+            changed[doc_id] = None
+        index = self.indexes.get(user_id)
+        if index is not None:
+            index.remove(doc_id)
+
+    async def retrieve(self, user_id, query, budget):
+        """Context items for the chunks most like query, within budget tokens."""
+        if budget <= 0 or not query.strip():
+            return [], 0
+        hits = (await self.for_user(user_id)).search(embed(query, self.dims), self.top_k)
+        chosen, used = pack(hits, budget)
+        items = [{"documentId": chunk.document_id, "title": chunk.title, "content": chunk.text,
+                  "score": round(score, 4)} for score, chunk in chosen]
+        return items, used
+
+    def budget(self, prompt, context, max_tokens):
+        max_tokens = max_tokens or DEFAULT_MAX_TOKENS
+        reserve = int(max_tokens * RESPONSE_RESERVE)
+        return max_tokens - reserve - count_tokens(prompt) - count_tokens(render_context(context))
+
+    async def assemble(self, user_id, prompt, context, max_tokens):
+        """The caller's context followed by retrieved chunks that fit."""
+        items, _ = await self.retrieve(user_id, prompt, self.budget(prompt, context, max_tokens))
+        return list(context or ()) + items
+
+
+WORDS = ("orbit ember quill harbor lantern drift signal marrow cinder tide meadow glass thunder saffron "
+         "compass violet anchor ridge mirror falcon copper willow atlas ferment prism hollow").split()
+
+
+def _synthetic_docs(count, paragraphs=8, seed=3):
+    rng = random.Random(seed)
+    docs = []
+    for i in range(count):
+        topic = rng.sample(WORDS, 4)
+        body = "\n\n".join(" ".join(rng.choice(topic if rng.random() < 0.4 else WORDS) for _ in range(rng.randint(60, 160)))
+                           for _ in range(paragraphs))
+        docs.append({"id": f"{i:032x}", "user_id": "bench", "title": f"Note {i}", "content": body})
+    return docs
+
+
+class _DocsStore:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def select(self, table, user_id=None):
+        return self.docs
+
+    async def call(self, method, *args, **kwargs):
+        return getattr(self, method)(*args, **kwargs)
+
+
+def benchmark(count, mode="flat", queries=200):
+    docs = _synthetic_docs(count)
+    engine = ContextEngine(_DocsStore(docs), {"index": mode})
+    start = time.perf_counter()
+    index = asyncio.run(engine.for_user("bench"))
+    built = time.perf_counter() - start
+
+    # Edit one paragraph in each of 100 documents: only those chunks are re-embedded
+    misses = engine.embeddings.misses
+    start = time.perf_counter()
+    for doc in docs[:100]:
+        blocks = doc["content"].split("\n\n")
+        blocks[3] += " revised"
+        doc["content"] = "\n\n".join(blocks)
+        engine.document_changed(doc)
+    edited = (time.perf_counter() - start) / 100
+    reembedded = engine.embeddings.misses - misses
+
+    rng = random.Random(9)
+    probes = [" ".join(rng.sample(WORDS, 3)) for _ in range(queries)]
+
+    async def run_queries():
+        # The first query trains the IVF clusters; time the steady state
+        await engine.retrieve("bench", probes[0], 3000)
+        start = time.perf_counter()
+        for query in probes:
+            await engine.retrieve("bench", query, 3000)
+        return (time.perf_counter() - start) / queries
+    search = asyncio.run(run_queries())
+    recall = None
+    if index.mode == "ivf":
+        exact = VectorIndex(index.dims)
+        for document_id, rows in index.rows.items():
+            exact.add(document_id, [(index.chunks[r], index.vectors[r]) for r in rows])
+        found = 0
+        for query in probes:
+            vector = embed(query, index.dims)
+            truth = {id(c) for _, c in exact.search(vector, TOP_K)}
+            found += len(truth & {id(c) for _, c in index.search(vector, TOP_K)})
+        recall = found / (queries * TOP_K)
+    return {"documents": count, "chunks": len(index), "build_seconds": built, "edit_ms": edited * 1000,
+            "reembedded": reembedded, "search_ms": search * 1000, "mode": index.mode, "recall": recall}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chunk retrieval for AI context")
+    parser.add_argument("--bench", type=int, metavar="DOCS", help="index DOCS synthetic documents and query them")
+    parser.add_argument("--index", choices=("flat", "ivf"), default="flat")
+    args = parser.parse_args(argv)
+    if not args.bench:
+        parser.print_help()
+        return 0
+    result = benchmark(args.bench, args.index)
+    print(f"🧩 {result['documents']:,} documents -> {result['chunks']:,} chunks, "
+          f"indexed in {result['build_seconds']:.1f} s")
+    print(f"✏️ one-paragraph edit: {result['edit_ms']:.2f} ms, {result['reembedded']} chunks re-embedded for 100 edits")
+    print(f"🔎 {result['mode']} search + packing: {result['search_ms']:.2f} ms per query")
+    if result["recall"] is not None:
+        print(f"🎯 recall@{TOP_K} against brute force: {result['recall']:.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+# Sequence CRDT for collaborative document content
+#
+# RGA (replicated growable array): every character gets an immutable id
+# (clock, site) and is inserted after the id of its left neighbour at the
+# time of the edit. Concurrent inserts after the same neighbour are ordered
+# by id, highest first, so replicas that have applied the same operations
+# hold the same text whatever order they arrived in. Deleted characters stay
+# behind as tombstones because later operations may still refer to them.
+#
+# Operations are plain JSON:
+#   {"insert": "abc", "id": [clock, site], "after": [clock, site] or null}
+#     inserts the run (clock, site), (clock + 1, site), ... in order
+#   {"delete": [[clock, site, length], ...]}
+#     tombstones each span of consecutive ids from one site
+#
+# Operations from the network go through checked() first, which rebuilds
+# them from validated fields and stamps inserts with the sender's site, so
+# a member can only ever create ids of its own.
+
+# Site 0 owns the base text a sequence is created from
+BASE_SITE = 0
+
+# Longest run one insert may carry
+MAX_INSERT = 1 << 20
+
+
+class InvalidOperation(ValueError):
+    pass
+
+
+def _int(value):
+    if type(value) is not int:
+        raise InvalidOperation(f"expected an integer, got {value!r}")
+    return value
+
+
+def _ident(value):
+    if not isinstance(value, list) or len(value) != 2:
+        raise InvalidOperation(f"expected an id [clock, site], got {value!r}")
+    clock, site = _int(value[0]), _int(value[1])
+    if clock < 1 or site < 0:
+        raise InvalidOperation(f"invalid id {value!r}")
+    return [clock, site]
+
+
+def checked(op, site):
+    """A clean copy of a client operation, with inserts owned by site;
+    InvalidOperation if it is malformed."""
+    if not isinstance(op, dict):
+        raise InvalidOperation("an operation must be an object")
+    if "insert" in op:
+        text = op["insert"]
+        if not isinstance(text, str) or not 0 < len(text) <= MAX_INSERT:
+            raise InvalidOperation(f"insert must be a non-empty string of at most {MAX_INSERT} characters")
+        clock = _ident(op.get("id"))[0]
+        after = _ident(op["after"]) if op.get("after") is not None else None
+        return {"insert": text, "id": [clock, site], "after": after}
+    spans = op.get("delete")
+    if not isinstance(spans, list):
+        raise InvalidOperation("expected an insert or a delete")
+    out = []
+    for span in spans:
+        if not isinstance(span, list) or len(span) != 3:
+            raise InvalidOperation(f"expected a span [clock, site, length], got {span!r}")
+        clock, origin = _ident(span[:2])
+        length = _int(span[2])
+        if length < 1:
+            raise InvalidOperation(f"invalid span length {length}")
+        out.append([clock, origin, length])
+    return {"delete": out}
+
+
+class Sequence:
+    def __init__(self, text="", site=BASE_SITE):
+        self.ids = []
+        self.chars = {}
+        self.deleted = set()
+        self.clock = 0
+        self.site = site
+        if text:
+            self.apply({"insert": text, "id": [1, BASE_SITE], "after": None})
+
+    def __len__(self):
+        return len(self.ids) - len(self.deleted)
+
+    def text(self):
+        deleted = self.deleted
+        return "".join(self.chars[i] for i in self.ids if i not in deleted)
+
+    def apply(self, op):
+        """Integrate one operation. Applying it twice is a no-op; an
+        operation that refers to ids this replica has not seen raises KeyError;
+        one whose ids collide with existing ones raises InvalidOperation."""
+        if "insert" in op:
+            text = op["insert"]
+            first = (int(op["id"][0]), int(op["id"][1]))
+            if first in self.chars or not text:
+                return
+            after = tuple(op["after"]) if op.get("after") else None
+            if after is not None and after not in self.chars:
+                raise KeyError(after)
+            clock, site = first
+            chars = self.chars
+            if any((clock + i, site) in chars for i in range(1, len(text))):
+                raise InvalidOperation(f"insert {list(first)} overlaps existing ids")
+            ids = self.ids
+            # list.index runs in C; the skip below only walks concurrent
+            # inserts at the same spot
+            pos = ids.index(after) + 1 if after is not None else 0
+            while pos < len(ids) and ids[pos] > first:
+                pos += 1
+            run = [(clock + i, site) for i in range(len(text))]
+            ids[pos:pos] = run
+            self.chars.update(zip(run, text))
+            self.clock = max(self.clock, clock + len(text) - 1)
+        else:
+            # No span can be longer than the sequence; checking first keeps a
+            # bogus length from being expanded into millions of ids
+            if sum(length for _, _, length in op["delete"]) > len(self.ids):
+                raise InvalidOperation("delete spans more characters than the sequence holds")
+            targets = [(clock + i, site) for clock, site, length in op["delete"] for i in range(length)]
+            for target in targets:
+                if target not in self.chars:
+                    raise KeyError(target)
+            self.deleted.update(targets)
+
+    # Local edits by visible position, returning the operation to send
+
+    def _visible(self):
+        deleted = self.deleted
+        return [i for i in self.ids if i not in deleted]
+
+    def insert(self, index, text):
+        visible = self._visible()
+        after = visible[index - 1] if index > 0 else None
+        op = {"insert": text, "id": [self.clock + 1, self.site], "after": list(after) if after else None}
+        self.apply(op)
+        return op
+
+    def delete(self, index, count=1):
+        op = {"delete": spans(self._visible()[index:index + count])}
+        self.apply(op)
+        return op
+
+    # Compact state for syncing a new replica: runs of consecutive ids from
+    # one site that are all live or all deleted, as [clock, site, text, deleted]
+
+    def state(self):
+        runs = []
+        deleted = self.deleted
+        for ident in self.ids:
+            gone = ident in deleted
+            if runs:
+                last = runs[-1]
+                if last[1] == ident[1] and last[0] + len(last[2]) == ident[0] and last[3] == gone:
+                    last[2] += self.chars[ident]
+                    continue
+            runs.append([ident[0], ident[1], self.chars[ident], gone])
+        return runs
+
+    @classmethod
+    def from_state(cls, runs, site):
+        seq = cls(site=site)
+        for clock, origin, text, gone in runs:
+            run = [(clock + i, origin) for i in range(len(text))]
+            seq.ids.extend(run)
+            seq.chars.update(zip(run, text))
+            if gone:
+                seq.deleted.update(run)
+            seq.clock = max(seq.clock, clock + len(text) - 1)
+        return seq
+
+
+def spans(ids):
+    """Collapse ids into [clock, site, length] spans of consecutive clocks."""
+    out = []
+    for clock, site in ids:
+        if out and out[-1][1] == site and out[-1][0] + out[-1][2] == clock:
+            out[-1][2] += 1
+        else:
+            out.append([clock, site, 1])
+    return out
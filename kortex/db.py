@@ -0,0 +1,289 @@
+# Pooled database access configured from server_config
+#
+# Connections are opened once and handed out from a bounded pool sized by
+# server_config[env]["database"]["pool"], rather than per request, and
+# prepared statements stay in the per-connection cache of the sqlite3 module.
+# Database.run and Database.offload do the work on a thread pool as big as
+# the connection pool, so the event loop never waits on the database.
+#
+# The reference backend runs on SQLite only: the schema compiler emits SQLite
+# DDL, so an environment configured for another client (production's
+# PostgreSQL belongs to the Node backend) is refused up front.
+import asyncio
+import functools
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from . import config, schema
+
+# Used when an environment does not declare a pool (development)
+DEFAULT_POOL = {"min": 1, "max": 5}
+
+# Prepared statements kept per connection
+STATEMENT_CACHE_SIZE = 256
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class PoolMetrics:
+    """Wait-time and saturation counters, cheap enough to keep always on."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.acquired = 0
+        self.waited = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.opened = 0
+        self.statements = 0
+        self.statement_cache_misses = 0
+
+    def snapshot(self, idle):
+        return {
+            "size": self.in_use + idle,
+            "in_use": self.in_use,
+            "idle": idle,
+            "max": self.max_size,
+            "saturation": self.in_use / self.max_size,
+            "peak_in_use": self.peak_in_use,
+            "opened": self.opened,
+            "acquired": self.acquired,
+            "waited": self.waited,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": self.wait_seconds,
+            "wait_seconds_max": self.max_wait_seconds,
+            "statements": self.statements,
+            "statement_cache_misses": self.statement_cache_misses,
+        }
+
+
+class Connection:
+    """A pooled connection that remembers which statements it has prepared."""
+
+    def __init__(self, raw, dialect, metrics):
+        self.raw = raw
+        self.dialect = dialect
+        self.prepared = set()
+        self._metrics = metrics
+
+    def execute(self, sql, params=()):
+        self._metrics.statements += 1
+        if sql not in self.prepared:
+            self._metrics.statement_cache_misses += 1
+            if len(self.prepared) >= STATEMENT_CACHE_SIZE:
+                self.prepared.clear()
+            self.prepared.add(sql)
+        return self.raw.execute(sql, params)
+
+    def executemany(self, sql, rows):
+        return self.raw.executemany(sql, rows)
+
+    @contextmanager
+    def transaction(self):
+        self.raw.execute("BEGIN IMMEDIATE")
+        try:
+            yield self
+        except BaseException:
+            self.raw.execute("ROLLBACK")
+            raise
+        self.raw.execute("COMMIT")
+
+
+def _connect_sqlite(path):
+    uri = path.startswith("file:")
+    if not uri:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    raw = sqlite3.connect(path, isolation_level=None, check_same_thread=False,
+                          cached_statements=STATEMENT_CACHE_SIZE, uri=uri)
+    return schema.configure(raw)
+
+
+CONNECTORS = {
+    "sqlite3": ("sqlite", _connect_sqlite),
+}
+
+
+class ConnectionPool:
+    def __init__(self, connect, dialect, min_size=1, max_size=5, timeout=10.0):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError(f"invalid pool bounds min={min_size} max={max_size}")
+        self._connect = connect
+        self.dialect = dialect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.metrics = PoolMetrics(max_size)
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        for _ in range(min_size):
+            self._size += 1
+            self._idle.append(self._open())
+
+    def _open(self):
+        """Connect for a slot already counted in _size; called without the
+        lock held, so a slow connect does not stall other borrowers."""
+        try:
+            conn = Connection(self._connect(), self.dialect, self.metrics)
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.metrics.opened += 1
+        return conn
+
+    def acquire(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        conn = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout("pool is closed")
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # Reserve the slot now and connect once the lock is released
+                    self._size += 1
+                    break
+                remaining = timeout - (time.perf_counter() - start)
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    if not self._idle and self._size >= self.max_size:
+                        self.metrics.timeouts += 1
+                        raise PoolTimeout(f"no connection available within {timeout}s")
+        if conn is None:
+            conn = self._open()
+        with self._cond:
+            waited = time.perf_counter() - start
+            metrics = self.metrics
+            metrics.acquired += 1
+            metrics.in_use += 1
+            metrics.peak_in_use = max(metrics.peak_in_use, metrics.in_use)
+            if waited > 0.001:
+                metrics.waited += 1
+            metrics.wait_seconds += waited
+            metrics.max_wait_seconds = max(metrics.max_wait_seconds, waited)
+            return conn
+
+    def release(self, conn, broken=False):
+        with self._cond:
+            self.metrics.in_use -= 1
+            if broken or self._closed:
+                self._size -= 1
+                _close(conn)
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.acquire(timeout)
+        broken = False
+        try:
+            yield conn
+        except (sqlite3.DatabaseError, ConnectionError):
+            broken = _is_broken(conn)
+            raise
+        finally:
+            self.release(conn, broken)
+
+    def stats(self):
+        with self._cond:
+            return self.metrics.snapshot(len(self._idle))
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._size -= 1
+                _close(self._idle.pop())
+            self._cond.notify_all()
+
+
+def _close(conn):
+    try:
+        conn.raw.close()
+    except Exception:
+        pass
+
+
+def _is_broken(conn):
+    try:
+        conn.raw.execute("SELECT 1")
+        return False
+    except Exception:
+        return True
+
+
+class Database:
+    """The pool for one server_config environment plus helpers to use it."""
+
+    def __init__(self, env=None, settings=None, connection=None):
+        settings = settings or config.settings(env)
+        db = settings["database"]
+        client = db["client"]
+        if client not in CONNECTORS:
+            raise ValueError(f"unsupported database client {client!r}: the reference backend runs on SQLite "
+                             f"(use --memory or a development-style sqlite3 connection)")
+        self.dialect, connect = CONNECTORS[client]
+        self.target = connection or db["connection"]
+        if not self.target:
+            raise ValueError(f"no database connection configured for {client}")
+        if self.dialect == "sqlite" and self.target == ":memory:":
+            # Every pooled connection must see the same in-memory database
+            self.target = f"file:kortex-{id(self)}?mode=memory&cache=shared"
+        bounds = db.get("pool", DEFAULT_POOL)
+        self.pool = ConnectionPool(lambda: connect(self.target), self.dialect, bounds["min"], bounds["max"])
+        self._executor = ThreadPoolExecutor(max_workers=bounds["max"], thread_name_prefix="kortex-db")
+
+    def migrate(self):
+        with self.pool.connection() as conn:
+            return schema.migrate(conn.raw)
+
+    def execute(self, sql, params=()):
+        with self.pool.connection() as conn:
+            return conn.execute(sql, params).rowcount
+
+    def query(self, sql, params=()):
+        with self.pool.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        with self.pool.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    @contextmanager
+    def transaction(self):
+        with self.pool.connection() as conn:
+            with conn.transaction():
+                yield conn
+
+    async def offload(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs), which borrows its own connections, on
+        the database threads."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs))
+
+    async def run(self, func, *args):
+        """Run func(conn, *args) on a pooled connection off the event loop."""
+        def call():
+            with self.pool.connection() as conn:
+                return func(conn, *args)
+        return await self.offload(call)
+
+    def close(self):
+        self.pool.close()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,310 @@
+# Focus-timer session log and time-bucketed rollups
+#
+# The focus timer posts each session when it ends; rows go to the
+# focus_sessions table. Per user, sessions are also held in columns
+# (array-backed start times, durations and category codes) and added into
+# day, week and month rollups as they arrive, so a dashboard over years of
+# sessions reads one row per bucket in the requested range instead of
+# scanning sessions. Rollups are columnar too: sorted bucket keys plus one
+# seconds column and one sessions column per category.
+#
+# Buckets are UTC: days since the epoch, ISO weeks starting on Monday and
+# calendar months. A session that runs past a bucket boundary has its time
+# split across the buckets it covers; it counts as one session in the
+# bucket where it started.
+#
+# A user's sessions are loaded off the event loop through store.call. A
+# session logged while that load is in flight is added once it finishes, and
+# a session that is already loaded is never counted twice.
+import argparse
+import asyncio
+import calendar
+import heapq
+import random
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+DAY = 86400
+PERIODS = ("day", "week", "month")
+# Buckets a stats query covers when no range is given
+DEFAULT_SPAN = {"day": 30, "week": 12, "month": 12}
+MAX_SESSION = DAY
+SESSION_LOG_LIMIT = 50
+# Users whose sessions stay loaded; the least recently used reload from
+# focus_sessions when they come back
+MAX_USERS = 1024
+
+# The categories the focus timer ships with
+CATEGORIES = ("Writing", "Training", "Meditation", "Breath Work", "Free Flow")
+
+
+def parse_time(value):
+    """Epoch seconds for an ISO-8601 timestamp; naive times are UTC."""
+    stamp = datetime.fromisoformat(value)
+    if stamp.tzinfo is None:
+        stamp = stamp.replace(tzinfo=timezone.utc)
+    return int(stamp.timestamp())
+
+
+def format_time(seconds):
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(seconds))
+
+
+def bucket_of(period, seconds):
+    day = seconds // DAY
+    if period == "day":
+        return day
+    if period == "week":
+        # Day 0 (1970-01-01) was a Thursday
+        return (day + 3) // 7
+    year, month = time.gmtime(seconds)[:2]
+    return year * 12 + month - 1
+
+
+def bucket_start(period, key):
+    if period == "day":
+        return key * DAY
+    if period == "week":
+        return (key * 7 - 3) * DAY
+    return calendar.timegm((key // 12, key % 12 + 1, 1, 0, 0, 0))
+
+
+def split(period, start, duration):
+    """(bucket, seconds) for each bucket the session [start, start+duration) covers."""
+    end = start + duration
+    while start < end:
+        key = bucket_of(period, start)
+        stop = min(end, bucket_start(period, key + 1))
+        yield key, stop - start
+        start = stop
+
+
+class Rollup:
+    """Totals per (bucket, category) for one user and period."""
+
+    def __init__(self):
+        self.keys = array("l")
+        self.seconds = []
+        self.sessions = []
+
+    def _column(self, code):
+        while len(self.seconds) <= code:
+            self.seconds.append(array("q", [0]) * len(self.keys))
+            self.sessions.append(array("l", [0]) * len(self.keys))
+
+    def _row(self, key):
+        keys = self.keys
+        # Sessions mostly arrive in time order, so the last bucket is the usual hit
+        if keys and keys[-1] == key:
+            return len(keys) - 1
+        index = len(keys) if not keys or key > keys[-1] else bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            return index
+        keys.insert(index, key)
+        for column in self.seconds:
+            column.insert(index, 0)
+        for column in self.sessions:
+            column.insert(index, 0)
+        return index
+
+    def add(self, key, code, seconds, sessions=0):
+        self._column(code)
+        row = self._row(key)
+        self.seconds[code][row] += seconds
+        self.sessions[code][row] += sessions
+
+    def range(self, first, last):
+        """(key, seconds by code, sessions by code) for buckets first..last."""
+        i = bisect_left(self.keys, first)
+        j = bisect_right(self.keys, last)
+        seconds = [column[i:j] for column in self.seconds]
+        sessions = [column[i:j] for column in self.sessions]
+        for row, key in enumerate(self.keys[i:j]):
+            yield key, [column[row] for column in seconds], [column[row] for column in sessions]
+
+
+class UserSessions:
+    """One user's sessions as parallel columns, plus their rollups."""
+
+    def __init__(self):
+        self.ids = []
+        self.known = set()
+        self.started = array("q")
+        self.durations = array("l")
+        self.codes = array("H")
+        self.categories = []
+        self.category_codes = {}
+        self.rollups = {period: Rollup() for period in PERIODS}
+
+    def code(self, category):
+        code = self.category_codes.get(category)
+        if code is None:
+            code = self.category_codes[category] = len(self.categories)
+            self.categories.append(category)
+        return code
+
+    def add(self, session_id, category, started, duration):
+        if session_id in self.known:
+            return
+        self.known.add(session_id)
+        code = self.code(category)
+        self.ids.append(session_id)
+        self.started.append(started)
+        self.durations.append(duration)
+        self.codes.append(code)
+        for period, rollup in self.rollups.items():
+            first = True
+            for key, seconds in split(period, started, duration):
+                rollup.add(key, code, seconds, 1 if first else 0)
+                first = False
+
+    def recent(self, limit):
+        rows = heapq.nlargest(limit, range(len(self.ids)), key=self.started.__getitem__)
+        return [{"id": self.ids[i], "category": self.categories[self.codes[i]],
+                 "startedAt": format_time(self.started[i]), "duration": self.durations[i]} for i in rows]
+
+    def stats(self, period, first, last):
+        buckets = []
+        seconds_total = [0] * len(self.categories)
+        sessions_total = 0
+        for key, seconds, sessions in self.rollups[period].range(first, last):
+            for code, value in enumerate(seconds):
+                seconds_total[code] += value
+            count = sum(sessions)
+            sessions_total += count
+            buckets.append({
+                "start": format_time(bucket_start(period, key))[:10],
+                "seconds": sum(seconds),
+                "sessions": count,
+                "categories": {self.categories[code]: value for code, value in enumerate(seconds) if value},
+            })
+        return {
+            "period": period,
+            "from": format_time(bucket_start(period, first))[:10],
+            "to": format_time(bucket_start(period, last + 1) - 1)[:10],
+            "buckets": buckets,
+            "totals": {
+                "seconds": sum(seconds_total),
+                "sessions": sessions_total,
+                "categories": {self.categories[code]: value for code, value in enumerate(seconds_total) if value},
+            },
+        }
+
+
+class FocusAnalytics:
+    """Sessions per user, loaded from focus_sessions on first use and then
+    kept current by the session handler, for up to max_users users."""
+
+    def __init__(self, store, max_users=MAX_USERS):
+        self.store = store
+        self.max_users = max_users
+        self.users = OrderedDict()
+        # user id -> the load in flight, and the sessions logged during it
+        self.loading = {}
+        self.arrived = {}
+
+    async def for_user(self, user_id):
+        sessions = self.users.get(user_id)
+        if sessions is not None:
+            self.users.move_to_end(user_id)
+            return sessions
+        loading = self.loading.get(user_id)
+        if loading is None:
+            self.arrived[user_id] = []
+            loading = self.loading[user_id] = asyncio.ensure_future(self._load(user_id))
+        return await asyncio.shield(loading)
+
+    async def _load(self, user_id):
+        try:
+            rows = await self.store.call("select", "focus_sessions", user_id=user_id)
+            sessions = UserSessions()
+            for row in sorted(rows + self.arrived[user_id], key=lambda row: row["started_at"]):
+                sessions.add(row["id"], row["category"], parse_time(row["started_at"]), row["duration"])
+            self.users[user_id] = sessions
+            while len(self.users) > self.max_users:
+                self.users.popitem(last=False)
+            return sessions
+        finally:
+            del self.arrived[user_id]
+            del self.loading[user_id]
+
+    def session_added(self, row):
+        arrived = self.arrived.get(row["user_id"])
+        if arrived is not None:
+            arrived.append(row)
+        sessions = self.users.get(row["user_id"])
+        if sessions is not None:
+            sessions.add(row["id"], row["category"], parse_time(row["started_at"]), row["duration"])
+
+    async def stats(self, user_id, period="day", first=None, last=None, now=None):
+        """Rollup buckets between the datetimes first and last (epoch seconds),
+        defaulting to the last DEFAULT_SPAN[period] buckets."""
+        first, last = span(period, first, last, now)
+        return (await self.for_user(user_id)).stats(period, first, last)
+
+
+def span(period, first=None, last=None, now=None):
+    """(first, last) bucket keys for a stats query."""
+    now = time.time() if now is None else now
+    last = bucket_of(period, int(now if last is None else last))
+    first = last - DEFAULT_SPAN[period] + 1 if first is None else bucket_of(period, int(first))
+    return first, last
+
+
+def benchmark(users, years, per_day, seed=5):
+    rng = random.Random(seed)
+    analytics = FocusAnalytics(None)
+    end = int(time.time()) // DAY * DAY
+    start_day = end // DAY - int(years * 365)
+    count = 0
+    start = time.perf_counter()
+    for user in range(users):
+        sessions = analytics.users[user] = UserSessions()
+        for day in range(start_day, end // DAY):
+            for _ in range(rng.randint(0, per_day * 2)):
+                started = day * DAY + rng.randrange(DAY)
+                sessions.add(count, rng.choice(CATEGORIES), started, rng.choice((900, 1500, 1800, 3600)))
+                count += 1
+    ingest = time.perf_counter() - start
+
+    queries = 200
+    start = time.perf_counter()
+    for n in range(queries):
+        analytics.users[n % users].stats("month", *span("month", end - years * 365 * DAY, end, now=end))
+    rollup = (time.perf_counter() - start) / queries
+    # The same dashboard answered by scanning the raw columns
+    start = time.perf_counter()
+    for n in range(queries // 10):
+        sessions = analytics.users[n % users]
+        totals = {}
+        for started, duration, code in zip(sessions.started, sessions.durations, sessions.codes):
+            key = (bucket_of("month", started), code)
+            totals[key] = totals.get(key, 0) + duration
+    scan = (time.perf_counter() - start) / (queries // 10)
+    return {"users": users, "sessions": count, "ingest_seconds": ingest,
+            "rollup_ms": rollup * 1000, "scan_ms": scan * 1000}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Focus-session rollups")
+    parser.add_argument("--bench", type=int, metavar="USERS", help="load synthetic sessions for USERS users")
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--per-day", type=int, default=2, help="average sessions per user per day")
+    args = parser.parse_args(argv)
+    if not args.bench:
+        parser.print_help()
+        return 0
+    result = benchmark(args.bench, args.years, args.per_day)
+    print(f"⏱️ {result['sessions']:,} sessions for {result['users']:,} users in {result['ingest_seconds']:.1f} s "
+          f"({result['sessions'] / result['ingest_seconds']:,.0f}/s with day, week and month rollups)")
+    print(f"📊 {args.years:g}-year monthly dashboard: {result['rollup_ms']:.2f} ms from rollups, "
+          f"{result['scan_ms']:.1f} ms scanning sessions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
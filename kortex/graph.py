@@ -0,0 +1,515 @@
+# Knowledge graph behind the Constellation map
+#
+# Documents and tags are nodes. A document is linked to each of its tags, to
+# documents it mentions as [[Title]] and to documents it links by URL
+# (/documents/<id>). Nodes keep a counted adjacency map, so an edge backed
+# by two references survives losing one of them, and updating a document
+# only touches its own references. Several documents may share a title; the
+# one with the smallest id answers [[Title]], and when it is renamed or
+# removed the next one takes over, whatever order they arrived in. A URL
+# link to a document that does not exist yet becomes an edge once it does.
+#
+# Layout is Fruchterman-Reingold with Barnes-Hut style repulsion: nodes are
+# binned into a quadtree of uniform grids, each node is pushed by the centre
+# of mass of the cells in its interaction list at every level, and only
+# nodes in neighbouring leaf cells interact directly. With NumPy every step
+# is a handful of array operations over all nodes, so ~50k nodes lay out in
+# seconds. Without NumPy small graphs fall back to exact pairwise forces.
+import argparse
+import asyncio
+import math
+import random
+import re
+import sys
+import time
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+WIKI_LINK = re.compile(r"\[\[([^\[\]|]+)(?:\|[^\]]*)?\]\]")
+URL_LINK = re.compile(r"/documents/([0-9a-f]{32})\b")
+
+ITERATIONS = 100
+# Fewer, cooler steps when most nodes keep their previous position
+WARM_ITERATIONS = 30
+# Above this many nodes a cold layout takes proportionally fewer steps
+LARGE_GRAPH = 10_000
+# Final temperature as a fraction of the starting one, whatever the step count
+COOLED = 0.005
+
+# Largest graph laid out with the exact O(n^2) pure-Python fallback
+PURE_PYTHON_LIMIT = 1500
+
+# Average nodes per leaf cell of the quadtree, and how many direct pairs
+# per node the leaves may hold before the tree goes a level deeper
+LEAF_SIZE = 4
+LEAF_PAIRS = 8
+MAX_DEPTH = 12
+GRAVITY = 0.02
+
+
+def doc_node(doc_id):
+    return "doc:" + doc_id
+
+
+def tag_node(tag):
+    return "tag:" + tag.lower()
+
+
+class Graph:
+    def __init__(self):
+        self.nodes = {}
+        self.adjacency = {}
+        self.refs = {}
+        # Title -> the document [[Title]] resolves to, of all the documents
+        # claiming it
+        self.titles = {}
+        self.claims = {}
+        self.title_of = {}
+        self.citing = {}
+        self.positions = {}
+        # Nodes whose position came out of a layout run
+        self.settled = set()
+
+    # Adjacency
+
+    def _add_node(self, node, label, kind):
+        if node not in self.nodes:
+            self.adjacency[node] = Counter()
+        self.nodes[node] = {"id": node, "label": label, "kind": kind}
+
+    def _link(self, a, b):
+        if a != b and a in self.nodes and b in self.nodes:
+            self.adjacency[a][b] += 1
+            self.adjacency[b][a] += 1
+
+    def _unlink(self, a, b):
+        for x, y in ((a, b), (b, a)):
+            neighbours = self.adjacency.get(x)
+            if neighbours and y in neighbours:
+                neighbours[y] -= 1
+                if neighbours[y] <= 0:
+                    del neighbours[y]
+
+    def _drop(self, node):
+        for other in list(self.adjacency.pop(node, ())):
+            self.adjacency[other].pop(node, None)
+        self.nodes.pop(node, None)
+        self.positions.pop(node, None)
+        self.settled.discard(node)
+
+    # Documents
+
+    def _resolve(self, target):
+        """The document node a reference points at, if it exists."""
+        if target.startswith("title:"):
+            return self.titles.get(target[6:])
+        return target if target in self.nodes else None
+
+    def _retarget(self, target, old, new):
+        # Every document citing target moves its edge from old to new
+        for source in self.citing.get(target, ()):
+            if old is not None:
+                self._unlink(source, old)
+            if new is not None:
+                self._link(source, new)
+
+    def _elect(self, title):
+        # Hand the title to its smallest claimant and move citing edges over
+        claimants = self.claims.get(title)
+        owner = min(claimants) if claimants else None
+        previous = self.titles.get(title)
+        if owner == previous:
+            return
+        if owner is None:
+            del self.titles[title]
+        else:
+            self.titles[title] = owner
+        self._retarget("title:" + title, previous, owner)
+
+    def _unclaim(self, node):
+        title = self.title_of.pop(node, None)
+        if title is not None:
+            self.claims[title].discard(node)
+            if not self.claims[title]:
+                del self.claims[title]
+            self._elect(title)
+
+    def _clear(self, node):
+        tags, targets = self.refs.pop(node, ((), ()))
+        for tag in tags:
+            self._unlink(node, tag)
+            if tag in self.adjacency and not self.adjacency[tag]:
+                self._drop(tag)
+        for target in targets:
+            self.citing[target].discard(node)
+            resolved = self._resolve(target)
+            if resolved is not None:
+                self._unlink(node, resolved)
+
+    def upsert(self, doc):
+        node = doc_node(doc["id"])
+        self._clear(node)
+        title = (doc.get("title") or "").strip().lower()
+        is_new = node not in self.nodes
+        self._add_node(node, doc.get("title") or "Untitled", "document")
+        if is_new:
+            # Documents that linked here by URL before this one existed
+            self._retarget(node, None, node)
+        if self.title_of.get(node) != title:
+            self._unclaim(node)
+            if title:
+                self.title_of[node] = title
+                self.claims.setdefault(title, set()).add(node)
+                self._elect(title)
+
+        tags = {tag_node(t): t for t in doc.get("tags") or ()}
+        for tag, label in tags.items():
+            if tag not in self.nodes:
+                self._add_node(tag, "#" + label, "tag")
+            self._link(node, tag)
+        content = doc.get("content") or ""
+        targets = {"title:" + m.strip().lower() for m in WIKI_LINK.findall(content)}
+        targets.update(doc_node(m) for m in URL_LINK.findall(content))
+        targets.discard(node)
+        for target in targets:
+            self.citing.setdefault(target, set()).add(node)
+            resolved = self._resolve(target)
+            if resolved is not None:
+                self._link(node, resolved)
+        self.refs[node] = (tuple(tags), tuple(targets))
+        if node not in self.positions:
+            self._place(node)
+
+    def remove(self, doc_id):
+        node = doc_node(doc_id)
+        if node not in self.nodes:
+            return
+        self._clear(node)
+        self._unclaim(node)
+        self._drop(node)
+
+    def _place(self, node):
+        # Start new nodes next to what they connect to, not at random
+        placed = [self.positions[n] for n in self.adjacency[node] if n in self.positions]
+        spread = max(1.0, math.sqrt(len(self.nodes)))
+        if placed:
+            x = sum(p[0] for p in placed) / len(placed) + random.uniform(-1, 1)
+            y = sum(p[1] for p in placed) / len(placed) + random.uniform(-1, 1)
+        else:
+            angle, radius = random.uniform(0, 2 * math.pi), spread * math.sqrt(random.random())
+            x, y = radius * math.cos(angle), radius * math.sin(angle)
+        self.positions[node] = (x, y)
+        for tag in self.adjacency[node]:
+            if tag not in self.positions:
+                self.positions[tag] = (x + random.uniform(-1, 1), y + random.uniform(-1, 1))
+
+    def edges(self):
+        for a, neighbours in self.adjacency.items():
+            for b in neighbours:
+                if a < b:
+                    yield a, b
+
+    def to_json(self):
+        nodes = []
+        for node, info in self.nodes.items():
+            x, y = self.positions.get(node, (0.0, 0.0))
+            nodes.append(dict(info, degree=len(self.adjacency[node]), x=round(x, 2), y=round(y, 2)))
+        return {"nodes": nodes, "edges": [[a, b] for a, b in self.edges()]}
+
+
+def build(docs):
+    graph = Graph()
+    for doc in docs:
+        graph.upsert(doc)
+    return graph
+
+
+# Layout
+
+def _grid_offsets():
+    # Interaction list at one level: the children of the parent cell's 3x3
+    # neighbourhood that are not themselves adjacent, per child parity
+    table = {}
+    for px in (0, 1):
+        for py in (0, 1):
+            table[px, py] = [(dx, dy) for dx in range(-2 - px, 4 - px) for dy in range(-2 - py, 4 - py)
+                             if max(abs(dx), abs(dy)) > 1]
+    return table
+
+
+def _leaf_depth(unit, n):
+    # Deep enough that direct leaf interactions stay near-linear even when
+    # nodes bunch up, which they do around popular tags
+    depth = max(2, math.ceil(math.log(max(n / LEAF_SIZE, 4), 4)))
+    while depth < MAX_DEPTH:
+        size = 1 << depth
+        cells = np.minimum((unit * size).astype(np.int64), size - 1)
+        counts = np.bincount(cells[:, 0] * size + cells[:, 1])
+        if int((counts * counts).sum()) <= LEAF_PAIRS * n:
+            break
+        depth += 1
+    return depth
+
+
+def _repulsion_numpy(pos, k2):
+    n = len(pos)
+    force = np.zeros_like(pos)
+    low = pos.min(axis=0)
+    extent = max(float((pos.max(axis=0) - low).max()), 1e-9) * (1 + 1e-9)
+    unit = (pos - low) / extent
+    depth = _leaf_depth(unit, n)
+    offsets = {parity: np.array(pairs) for parity, pairs in _grid_offsets().items()}
+
+    # Far field, level by level: each occupied cell is pushed by the centres
+    # of mass of its interaction list, and every node in it feels that push
+    for level in range(2, depth + 1):
+        size = 1 << level
+        cells = np.minimum((unit * size).astype(np.int64), size - 1)
+        flat = cells[:, 0] * size + cells[:, 1]
+        mass = np.bincount(flat, minlength=size * size).astype(float)
+        occupied = np.nonzero(mass)[0]
+        cx = np.zeros(size * size)
+        cy = np.zeros(size * size)
+        cx[occupied] = np.bincount(flat, weights=pos[:, 0], minlength=size * size)[occupied] / mass[occupied]
+        cy[occupied] = np.bincount(flat, weights=pos[:, 1], minlength=size * size)[occupied] / mass[occupied]
+        ox, oy = occupied // size, occupied % size
+        field = np.zeros((size * size, 2))
+        for (px, py), d in offsets.items():
+            group = occupied[((ox & 1) == px) & ((oy & 1) == py)]
+            if not len(group):
+                continue
+            nx = (group // size)[:, None] + d[:, 0]
+            ny = (group % size)[:, None] + d[:, 1]
+            valid = (nx >= 0) & (nx < size) & (ny >= 0) & (ny < size)
+            target = np.where(valid, nx * size + ny, 0)
+            m = np.where(valid, mass[target], 0.0)
+            dx = cx[group][:, None] - cx[target]
+            dy = cy[group][:, None] - cy[target]
+            scale = k2 * m / np.maximum(dx * dx + dy * dy, 1e-6)
+            field[group, 0] = (dx * scale).sum(axis=1)
+            field[group, 1] = (dy * scale).sum(axis=1)
+        force += field[flat]
+
+    # Near field: exact forces between nodes in the same or adjacent leaves
+    size = 1 << depth
+    cells = np.minimum((unit * size).astype(np.int64), size - 1)
+    flat = cells[:, 0] * size + cells[:, 1]
+    order = np.argsort(flat, kind="stable")
+    counts = np.bincount(flat, minlength=size * size)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    index = np.arange(n)
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            nx, ny = cells[:, 0] + dx, cells[:, 1] + dy
+            valid = (nx >= 0) & (nx < size) & (ny >= 0) & (ny < size)
+            src = index[valid]
+            neighbour = nx[valid] * size + ny[valid]
+            count = counts[neighbour]
+            total = int(count.sum())
+            if not total:
+                continue
+            a = np.repeat(src, count)
+            within = np.arange(total) - np.repeat(np.cumsum(count) - count, count)
+            b = order[np.repeat(starts[neighbour], count) + within]
+            keep = a != b
+            a, b = a[keep], b[keep]
+            vx = pos[a, 0] - pos[b, 0]
+            vy = pos[a, 1] - pos[b, 1]
+            scale = k2 / np.maximum(vx * vx + vy * vy, 1e-6)
+            force[:, 0] += np.bincount(a, weights=vx * scale, minlength=n)
+            force[:, 1] += np.bincount(a, weights=vy * scale, minlength=n)
+    return force
+
+
+def _steps_numpy(pos, edges, iterations, temperature, every):
+    pos = np.array(pos, dtype=float)
+    n = len(pos)
+    cooling = COOLED ** (1 / iterations)
+    k = 1.0
+    src = np.array([e[0] for e in edges], dtype=np.int64)
+    dst = np.array([e[1] for e in edges], dtype=np.int64)
+    for step in range(1, iterations + 1):
+        force = _repulsion_numpy(pos, k * k)
+        if len(src):
+            delta = pos[src] - pos[dst]
+            dist = np.maximum(np.sqrt((delta ** 2).sum(axis=1)), 1e-6)
+            pull = delta * (dist / k)[:, None]
+            force[:, 0] -= np.bincount(src, weights=pull[:, 0], minlength=n)
+            force[:, 1] -= np.bincount(src, weights=pull[:, 1], minlength=n)
+            force[:, 0] += np.bincount(dst, weights=pull[:, 0], minlength=n)
+            force[:, 1] += np.bincount(dst, weights=pull[:, 1], minlength=n)
+        force -= GRAVITY * pos
+        length = np.maximum(np.sqrt((force ** 2).sum(axis=1)), 1e-9)
+        pos += force * (np.minimum(length, temperature) / length)[:, None]
+        temperature *= cooling
+        if step % every == 0 or step == iterations:
+            yield step, pos.tolist()
+
+
+def _steps_python(pos, edges, iterations, temperature, every):
+    pos = [list(p) for p in pos]
+    n = len(pos)
+    cooling = COOLED ** (1 / iterations)
+    for step in range(1, iterations + 1):
+        force = [[-GRAVITY * x, -GRAVITY * y] for x, y in pos]
+        for i in range(n):
+            xi, yi = pos[i]
+            for j in range(i + 1, n):
+                dx, dy = xi - pos[j][0], yi - pos[j][1]
+                dist2 = max(dx * dx + dy * dy, 1e-6)
+                fx, fy = dx / dist2, dy / dist2
+                force[i][0] += fx
+                force[i][1] += fy
+                force[j][0] -= fx
+                force[j][1] -= fy
+        for a, b in edges:
+            dx, dy = pos[a][0] - pos[b][0], pos[a][1] - pos[b][1]
+            dist = max(math.hypot(dx, dy), 1e-6)
+            force[a][0] -= dx * dist
+            force[a][1] -= dy * dist
+            force[b][0] += dx * dist
+            force[b][1] += dy * dist
+        for p, (fx, fy) in zip(pos, force):
+            length = max(math.hypot(fx, fy), 1e-9)
+            scale = min(length, temperature) / length
+            p[0] += fx * scale
+            p[1] += fy * scale
+        temperature *= cooling
+        if step % every == 0 or step == iterations:
+            yield step, [tuple(p) for p in pos]
+
+
+def _prepare(graph, iterations=None, every=10):
+    # Snapshot the graph and pick a schedule; the returned steps generator
+    # only touches the snapshot, so it can run off the event loop
+    nodes = list(graph.nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = [(index[a], index[b]) for a, b in graph.edges()]
+    for node in nodes:
+        if node not in graph.positions:
+            graph._place(node)
+    start = [graph.positions[node] for node in nodes]
+    fresh = sum(1 for node in nodes if node not in graph.settled)
+    warm = graph.settled and fresh <= len(nodes) // 10
+    if iterations is None:
+        iterations = WARM_ITERATIONS if warm else ITERATIONS
+        if len(nodes) > LARGE_GRAPH:
+            # Each step costs O(n log n); big maps cool faster instead
+            iterations = max(WARM_ITERATIONS, iterations * LARGE_GRAPH // len(nodes))
+    # Mostly settled graphs only need a nudge; a cold start needs room to move
+    temperature = math.sqrt(len(nodes)) / (40 if warm else 10)
+
+    if not nodes:
+        steps = iter([(iterations, [])])
+    elif np is not None:
+        steps = _steps_numpy(start, edges, iterations, temperature, every)
+    elif len(nodes) <= PURE_PYTHON_LIMIT:
+        steps = _steps_python(start, edges, iterations, temperature, every)
+    else:
+        raise RuntimeError(f"laying out more than {PURE_PYTHON_LIMIT} nodes needs numpy")
+    return nodes, steps, iterations
+
+
+def _positions(graph, nodes, positions, final):
+    if final:
+        # Nodes removed while the layout ran are skipped
+        for node, xy in zip(nodes, positions):
+            if node in graph.nodes:
+                graph.positions[node] = tuple(xy)
+                graph.settled.add(node)
+    return {node: [round(x, 2), round(y, 2)] for node, (x, y) in zip(nodes, positions)}
+
+
+def layout(graph, iterations=None, every=10):
+    """Lay the graph out, yielding (iteration, {node: [x, y]}) every `every`
+    steps so callers can show progress. The final positions are stored back
+    on the graph."""
+    nodes, steps, iterations = _prepare(graph, iterations, every)
+    for step, positions in steps:
+        yield step, _positions(graph, nodes, positions, step == iterations)
+
+
+class GraphService:
+    """One graph per user, built from their documents on first use and then
+    kept current by the document handlers."""
+
+    def __init__(self, store):
+        self.store = store
+        self.graphs = {}
+        self.locks = {}
+
+    def for_user(self, user_id):
+        graph = self.graphs.get(user_id)
+        if graph is None:
+            graph = self.graphs[user_id] = build(self.store.select("documents", user_id=user_id))
+        return graph
+
+    async def layout(self, user_id, iterations=None, every=10):
+        """layout() with the steps run on a worker thread. One layout runs
+        per user at a time; a second request waits and then warm-starts."""
+        lock = self.locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            graph = self.for_user(user_id)
+            nodes, steps, iterations = _prepare(graph, iterations, every)
+            loop = asyncio.get_running_loop()
+            while True:
+                item = await loop.run_in_executor(None, next, steps, None)
+                if item is None:
+                    return
+                step, positions = item
+                yield step, _positions(graph, nodes, positions, step == iterations)
+
+    def document_changed(self, doc):
+        graph = self.graphs.get(doc["user_id"])
+        if graph is not None:
+            graph.upsert(doc)
+
+    def document_removed(self, user_id, doc_id):
+        graph = self.graphs.get(user_id)
+        if graph is not None:
+            graph.remove(doc_id)
+
+
+def _synthetic_docs(count, seed=11):
+    rng = random.Random(seed)
+    tags = [f"tag{i}" for i in range(max(10, count // 50))]
+    docs = []
+    for i in range(count):
+        links = " ".join(f"[[Note {rng.randrange(count)}]]" for _ in range(rng.choice((0, 1, 1, 2, 3))))
+        docs.append({"id": f"{i:032x}", "user_id": "bench", "title": f"Note {i}", "content": links,
+                     "tags": rng.sample(tags, rng.choice((1, 1, 2)))})
+    return docs
+
+
+def benchmark(count, iterations=None):
+    start = time.perf_counter()
+    graph = build(_synthetic_docs(count))
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    for step, _ in layout(graph, iterations, every=1000):
+        pass
+    return {"nodes": len(graph.nodes), "edges": sum(1 for _ in graph.edges()), "build_seconds": built,
+            "layout_seconds": time.perf_counter() - start, "iterations": step}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Constellation graph layout")
+    parser.add_argument("--bench", type=int, metavar="N", help="build and lay out a graph of N synthetic documents")
+    parser.add_argument("--iterations", type=int, help="layout steps (default scales with graph size)")
+    args = parser.parse_args(argv)
+    if not args.bench:
+        parser.print_help()
+        return 0
+    result = benchmark(args.bench, args.iterations)
+    print(f"🌌 {result['nodes']} nodes, {result['edges']} edges built in {result['build_seconds']:.2f}s")
+    print(f"⏱️ {result['iterations']} layout iterations in {result['layout_seconds']:.2f}s"
+          f" ({'numpy' if np is not None else 'pure Python'})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
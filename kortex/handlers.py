@@ -0,0 +1,680 @@
+# Endpoint implementations, registered under their backend_api keys
+import email.parser
+import email.policy
+import hmac
+import time
+
+from .ai import build_prompt, models, usage_for
+from .auth import TokenError
+from .blobs import CHUNK_SIZE, MAX_UPLOAD_SIZE, BlobStore, OffsetMismatch, UploadMissing
+from .cache import canonical_key
+from .focus import MAX_SESSION, PERIODS, SESSION_LOG_LIMIT, format_time, parse_time
+from .http import HTTPError, Response, StreamingResponse, sse_event
+from .markdown import EditError
+from .media import mime_matches
+from . import metrics
+from .ratelimit import RateLimited
+from .versions import RevisionMissing
+from .websocket import upgrade
+
+HANDLERS = {}
+
+# Groups reachable without a bearer token
+PUBLIC_GROUPS = {"authentication", "observability"}
+
+# Most hits GET /documents?search= returns
+SEARCH_LIMIT = 100
+
+
+def handles(key):
+    def register(func):
+        HANDLERS[key] = func
+        return func
+    return register
+
+
+def public_user(user):
+    return {k: v for k, v in user.items() if k != "password"}
+
+
+async def _owned(request, table, row_id, owner="user_id"):
+    row = await request.app.store.call("get", table, row_id)
+    if row is None or row.get(owner) != request.user["id"]:
+        raise HTTPError(404, f"{table[:-1]} not found")
+    return row
+
+
+# Authentication
+
+@handles("POST /auth/register")
+async def register(request, body):
+    app = request.app
+    if await app.store.call("user_by_email", body["email"]):
+        raise HTTPError(409, "email already registered")
+    hashed = await app.auth.hash_password(body["password"])
+    # Re-check: another registration may have finished while we were hashing
+    if await app.store.call("user_by_email", body["email"]):
+        raise HTTPError(409, "email already registered")
+    try:
+        user = await app.store.call("insert", "users", {
+            "email": body["email"],
+            "password": hashed,
+            "name": body["name"],
+            "preferences": {},
+        })
+    except KeyError:
+        # Lost the race to a registration between the check and the insert
+        raise HTTPError(409, "email already registered") from None
+    return Response({**app.auth.issue(user["id"]), "user": public_user(user)}, 201)
+
+
+@handles("POST /auth/login")
+async def login(request, body):
+    app = request.app
+    user = await app.store.call("user_by_email", body["email"])
+    if not await app.auth.check_password(body["password"], user["password"] if user else None):
+        raise HTTPError(401, "invalid email or password")
+    return {**app.auth.issue(user["id"]), "user": public_user(user)}
+
+
+@handles("POST /auth/refresh")
+async def refresh(request, body):
+    try:
+        return request.app.auth.rotate(body["refreshToken"])
+    except TokenError:
+        raise HTTPError(401, "invalid refresh token") from None
+
+
+# Documents
+
+@handles("GET /documents")
+async def list_documents(request, query):
+    store = request.app.store
+    if query.get("search"):
+        await _settled(request)
+        # Ranked by the full-text index, best match first, already narrowed
+        # to the folder and tags asked for
+        hits = request.app.search.search(request.user["id"], query["search"], SEARCH_LIMIT,
+                                         folder=query.get("folder"), tags=query.get("tags") or ())
+        rows = {doc["id"]: doc for doc in await store.call("get_many", "documents", [hit["id"] for hit in hits])}
+        docs = [dict(rows[hit["id"]], snippet=hit["snippet"], score=hit["score"]) for hit in hits if hit["id"] in rows]
+    else:
+        docs = await store.call("query", "GET /documents", request.user["id"], query)
+    return {"documents": docs, "total": len(docs)}
+
+
+@handles("POST /documents")
+async def create_document(request, body):
+    doc = await request.app.store.call("insert", "documents", {
+        "user_id": request.user["id"],
+        "title": body["title"],
+        "content": body["content"],
+        "type": body["type"],
+        "folder_path": "/",
+        "tags": list(body["tags"]),
+        "metadata": {},
+    })
+    request.app.search.index(doc)
+    request.app.versions.commit(doc["id"], doc["content"])
+    request.app.graph.document_changed(doc)
+    request.app.context.document_changed(doc)
+    return Response({"document": doc}, 201)
+
+
+def document_saved(app, doc, fields):
+    """Keep the derived document state in step once a save is written;
+    subscribed to the write-behind buffer, so it runs once per coalesced row."""
+    if fields.keys() & {"title", "content", "tags", "folder_path"}:
+        app.search.index(doc)
+    if fields.keys() & {"title", "content", "tags"}:
+        app.graph.document_changed(doc)
+        app.context.document_changed(doc)
+    if "content" in fields:
+        app.versions.commit(doc["id"], doc["content"])
+
+
+async def _settled(request):
+    # Buffered saves reach search, revisions, the graph and the AI context on
+    # flush; reads of those flush first so a client sees its own writes
+    await request.app.store.flush("documents")
+
+
+@handles("PUT /documents/:id")
+async def update_document(request, body):
+    await _owned(request, "documents", request.params["id"])
+    doc = await request.app.store.call("update", "documents", request.params["id"], body)
+    # The row itself is written behind; answer once the save is journaled
+    await request.app.store.sync()
+    return {"document": doc}
+
+
+@handles("DELETE /documents/:id")
+async def delete_document(request, body):
+    await _owned(request, "documents", request.params["id"])
+    await request.app.store.call("delete", "documents", request.params["id"])
+    request.app.search.remove(request.params["id"])
+    request.app.versions.delete(request.params["id"])
+    request.app.previews.drop(request.params["id"])
+    request.app.graph.document_removed(request.user["id"], request.params["id"])
+    request.app.context.document_removed(request.user["id"], request.params["id"])
+    return {"success": True}
+
+
+@handles("GET /documents/:id/versions")
+async def list_versions(request, query):
+    await _owned(request, "documents", request.params["id"])
+    await _settled(request)
+    return {"versions": request.app.versions.history(request.params["id"])}
+
+
+@handles("GET /documents/:id/versions/:revision")
+async def get_version(request, query):
+    await _owned(request, "documents", request.params["id"])
+    await _settled(request)
+    try:
+        revision = int(request.params["revision"])
+        content = request.app.versions.text(request.params["id"], revision)
+    except ValueError:
+        raise HTTPError(400, "revision must be an integer")
+    except RevisionMissing:
+        raise HTTPError(404, "revision not found")
+    return {"version": {"revision": revision, "content": content}}
+
+
+@handles("PUT /documents/:id/preview")
+async def preview_document(request, body):
+    # The client sends its edits as [start, end, text] against the revision
+    # it last rendered, or the full content to start over
+    doc = await _owned(request, "documents", request.params["id"])
+    previews = request.app.previews
+    preview = previews.get(request.user["id"], doc["id"])
+    current = preview is not None and body.get("revision") == preview.revision
+    if "edits" in body:
+        if "content" in body:
+            raise HTTPError(400, "send either content or edits")
+        if not current:
+            raise HTTPError(409, "preview revision is out of date; send the full content",
+                            {"revision": preview.revision if preview else None})
+        try:
+            patches = preview.edit(body["edits"])
+        except EditError as exc:
+            raise HTTPError(400, str(exc))
+    elif current:
+        patches = preview.update(body.get("content", doc["content"]))
+    else:
+        preview = previews.start(request.user["id"], doc["id"])
+        patches = [{"op": "reset"}] + preview.update(body.get("content", doc["content"]))
+    return {"revision": preview.revision, "patches": patches}
+
+
+# AI
+
+def _admit(request, model):
+    try:
+        request.app.limiter.check(request.user["id"], model)
+    except RateLimited as exc:
+        raise HTTPError(429, str(exc), headers={"retry-after": str(max(1, round(exc.retry_after)))})
+
+
+async def _record(request, prompt, text, usage):
+    request.app.limiter.charge(request.user["id"], usage["model"], usage)
+    metrics.AI_TOKENS.inc(usage["model"], "prompt", amount=usage.get("promptTokens", 0))
+    metrics.AI_TOKENS.inc(usage["model"], "completion", amount=usage.get("completionTokens", 0))
+    await request.app.store.call("insert", "ai_conversations", {
+        "user_id": request.user["id"],
+        "document_id": None,
+        "messages": [{"role": "user", "content": prompt}, {"role": "assistant", "content": text}],
+        "model_used": usage["model"],
+        "tokens_used": usage["totalTokens"],
+    })
+
+
+async def _with_context(request, query, context, model):
+    """context plus the user's document chunks most relevant to query, as
+    many as fit the model's token budget."""
+    await _settled(request)
+    max_tokens = request.app.provider.catalogue.get(model, {}).get("maxTokens")
+    return await request.app.context.assemble(request.user["id"], query, context, max_tokens)
+
+
+async def _converse(request, prompt, context, model):
+    text, usage = await request.app.provider.complete(prompt, context, model)
+    await _record(request, prompt, text, usage)
+    return text, usage
+
+
+async def _chat_events(request, message, context, model):
+    # Tokens are forwarded as the provider yields them; the writer drains
+    # after each event, which is what paces the provider. If the client
+    # disconnects the generator is closed and whatever was produced so far
+    # is still charged and recorded.
+    stream = request.app.provider.stream(message, context, model)
+    parts = []
+    usage = None
+    try:
+        async for kind, value in stream:
+            if kind == "token":
+                parts.append(value)
+                yield sse_event("token", {"text": value})
+            else:
+                usage = value
+        yield sse_event("usage", usage)
+        yield sse_event("done", {})
+    finally:
+        await stream.aclose()
+        text = "".join(parts)
+        if usage is None:
+            # Charged like a finished stream: the provider was sent the context too
+            usage = dict(usage_for(model, build_prompt(message, context), text), cancelled=True)
+        await _record(request, message, text, usage)
+
+
+@handles("POST /ai/chat")
+async def chat(request, body):
+    model = request.app.provider.resolve_model(body["model"])
+    _admit(request, model)
+    context = await _with_context(request, body["message"], body["context"], model)
+    if "text/event-stream" in request.headers.get("accept", ""):
+        return StreamingResponse(_chat_events(request, body["message"], context, model))
+    text, usage = await _converse(request, body["message"], context, model)
+    return {"response": text, "usage": usage}
+
+
+@handles("POST /ai/generate")
+async def generate(request, body):
+    # Identical prompt, type, context and model give an identical draft, so
+    # repeats are answered from the cache without touching the provider.
+    # The key covers the retrieved chunks too, so editing a document that
+    # was drawn on produces a fresh draft.
+    app = request.app
+    model = app.provider.resolve_model(None)
+    context = await _with_context(request, body["prompt"], body["context"], model)
+    key = canonical_key({"prompt": body["prompt"], "type": body["type"], "context": context, "model": model})
+    if "no-cache" not in request.headers.get("cache-control", ""):
+        cached = app.cache.get(key)
+        if cached is not None:
+            return Response(cached, headers={"x-cache": "hit"})
+    prompt = f"Write {body['type']}: {body['prompt']}"
+    _admit(request, model)
+    text, usage = await _converse(request, prompt, context, model)
+    payload = {"content": text, "usage": usage}
+    app.cache.put(key, payload)
+    return Response(payload, headers={"x-cache": "miss"})
+
+
+@handles("POST /ai/context")
+async def preview_context(request, body):
+    model = request.app.provider.resolve_model(body["model"])
+    engine = request.app.context
+    max_tokens = request.app.provider.catalogue.get(model, {}).get("maxTokens")
+    budget = engine.budget(body["query"], (), max_tokens)
+    items, used = engine.retrieve(request.user["id"], body["query"], budget)
+    return {"context": items, "tokens": used, "budget": budget}
+
+
+@handles("GET /ai/models")
+async def list_models(request, query):
+    # Fixed for the lifetime of the process, so kept in memory only: a
+    # disk copy would outlive a configuration change
+    payload = request.app.cache.get("ai:models")
+    if payload is None:
+        payload = {"models": models(request.app.settings)}
+        request.app.cache.put("ai:models", payload, ttl=0, persist=False)
+    return payload
+
+
+# Projects
+
+@handles("GET /projects")
+async def list_projects(request, query):
+    return {"projects": await request.app.store.call("select", "projects", user_id=request.user["id"])}
+
+
+@handles("POST /projects")
+async def create_project(request, body):
+    project = await request.app.store.call("insert", "projects", {
+        "user_id": request.user["id"],
+        "name": body["name"],
+        "description": body["description"],
+        "type": body["type"],
+        "status": "active",
+        "data": {"tasks": []},
+    })
+    return Response({"project": project}, 201)
+
+
+@handles("PUT /projects/:id")
+async def update_project(request, body):
+    project = await _owned(request, "projects", request.params["id"])
+    fields = {k: v for k, v in body.items() if k != "tasks"}
+    if "tasks" in body:
+        fields["data"] = dict(project["data"], tasks=body["tasks"])
+    return {"project": await request.app.store.call("update", "projects", project["id"], fields)}
+
+
+# Assets
+
+def _multipart_files(request):
+    header = f"Content-Type: {request.headers['content-type']}\r\n\r\n".encode("latin-1")
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(header + request.body)
+    for part in message.iter_parts():
+        filename = part.get_filename()
+        if filename:
+            yield filename, part.get_content_type(), part.get_payload(decode=True) or b""
+
+
+@handles("GET /assets")
+async def list_assets(request, query):
+    return {"assets": await request.app.store.call("query", "GET /assets", request.user["id"], query)}
+
+
+INSPECT_JOB = "asset-metadata"
+
+
+def _inspected_metadata(asset, digest, result):
+    metadata = dict(asset["metadata"] or {}, **result)
+    metadata["mimeMatches"] = mime_matches(asset["mime_type"], result["detectedType"])
+    metadata["thumbnail"] = f"/uploads/{BlobStore.thumbnail(digest)}" if result.get("thumbnail") else None
+    return metadata
+
+
+async def record_inspection(app, digest, result):
+    """Job callback: fill in metadata for every asset sharing the blob."""
+    for asset in await app.store.call("select", "assets", filename=BlobStore.filename(digest)):
+        await app.store.call("update", "assets", asset["id"], {"metadata": _inspected_metadata(asset, digest, result)})
+
+
+async def _inspect(app, asset, digest):
+    # Blobs are inspected once; later uploads of the same bytes reuse the result
+    result = app.jobs.result(INSPECT_JOB, digest)
+    if result is not None:
+        return await app.store.call("update", "assets", asset["id"], {"metadata": _inspected_metadata(asset, digest, result)})
+    app.jobs.enqueue(INSPECT_JOB, digest, {
+        "path": app.blobs.path(BlobStore.filename(digest)),
+        "thumbnail": app.blobs.path(BlobStore.thumbnail(digest)),
+    })
+    return asset
+
+
+async def _add_asset(request, original_name, mime_type, size, digest):
+    # Assets point at a content-addressed blob; identical files share one
+    # The blob already counts this row; give the reference back if it
+    # never gets written
+    filename = request.app.blobs.filename(digest)
+    url = f"/uploads/{filename}"
+    try:
+        asset = await request.app.store.call("insert", "assets", {
+            "user_id": request.user["id"],
+            "filename": filename,
+            "original_name": original_name,
+            "mime_type": mime_type,
+            "size": size,
+            "url": url,
+            "folder_path": "/",
+            "metadata": {"sha256": digest},
+        })
+    except BaseException:
+        await request.app.blobs.release(digest)
+        raise
+    asset = await _inspect(request.app, asset, digest)
+    return Response({"asset": asset, "url": url}, 201)
+
+
+@handles("POST /assets/upload")
+async def upload_asset(request, body):
+    files = list(_multipart_files(request))
+    if not files:
+        raise HTTPError(400, "no file part in upload")
+    original_name, mime_type, data = files[0]
+    digest, _ = await request.app.blobs.put(data)
+    return await _add_asset(request, original_name, mime_type, len(data), digest)
+
+
+def _public_upload(session):
+    return {"id": session["id"], "filename": session["filename"], "size": session["size"],
+            "offset": session["offset"], "chunkSize": CHUNK_SIZE}
+
+
+async def _upload_session(request):
+    try:
+        session = await request.app.blobs.session(request.params["id"])
+    except UploadMissing:
+        session = None
+    if session is None or session["user_id"] != request.user["id"]:
+        raise HTTPError(404, "upload not found")
+    return session
+
+
+@handles("POST /assets/uploads")
+async def start_upload(request, body):
+    size = body["size"]
+    # Range first: int() of an infinite or NaN size raises
+    if not 0 <= size <= MAX_UPLOAD_SIZE or size != int(size):
+        raise HTTPError(400, "invalid request body", {"size": f"expected a whole number up to {MAX_UPLOAD_SIZE}"})
+    session = await request.app.blobs.create(request.user["id"], body["filename"], int(size), body["mimeType"])
+    return Response({"upload": _public_upload(session)}, 201)
+
+
+@handles("GET /assets/uploads/:id")
+async def get_upload(request, query):
+    return {"upload": _public_upload(await _upload_session(request))}
+
+
+@handles("PUT /assets/uploads/:id")
+async def upload_chunk(request, body):
+    await _upload_session(request)
+    try:
+        offset = int(request.headers["upload-offset"])
+    except (KeyError, ValueError):
+        raise HTTPError(400, "Upload-Offset header is required")
+    try:
+        session = await request.app.blobs.append(request.params["id"], offset, request.body)
+    except OffsetMismatch as exc:
+        raise HTTPError(409, str(exc), headers={"upload-offset": str(exc.expected)})
+    except ValueError as exc:
+        raise HTTPError(400, str(exc))
+    return {"upload": _public_upload(session)}
+
+
+@handles("POST /assets/uploads/:id/complete")
+async def complete_upload(request, body):
+    await _upload_session(request)
+    try:
+        session, digest, _ = await request.app.blobs.complete(request.params["id"])
+    except OffsetMismatch as exc:
+        raise HTTPError(409, "upload is incomplete", headers={"upload-offset": str(exc.expected)})
+    except UploadMissing:
+        raise HTTPError(404, "upload not found")
+    return await _add_asset(request, session["filename"], session["mime_type"], session["size"], digest)
+
+
+@handles("DELETE /assets/uploads/:id")
+async def abort_upload(request, body):
+    await _upload_session(request)
+    await request.app.blobs.abort(request.params["id"])
+    return {"success": True}
+
+
+@handles("DELETE /assets/:id")
+async def delete_asset(request, body):
+    asset = await _owned(request, "assets", request.params["id"])
+    await request.app.store.call("delete", "assets", asset["id"])
+    # The blob goes with the last asset that refers to it
+    digest = asset["metadata"]["sha256"]
+    if await request.app.blobs.release(digest):
+        request.app.jobs.forget(INSPECT_JOB, digest)
+    return {"success": True}
+
+
+# Collaboration
+
+@handles("GET /collaboration/rooms")
+async def list_rooms(request, query):
+    user_id = request.user["id"]
+    rooms = [
+        room for room in await request.app.store.call("select", "collaboration_rooms")
+        if room["owner_id"] == user_id or user_id in room["members"]
+    ]
+    return {"rooms": rooms}
+
+
+@handles("POST /collaboration/rooms")
+async def create_room(request, body):
+    await _owned(request, "documents", body["documentId"])
+    room = await request.app.store.call("insert", "collaboration_rooms", {
+        "document_id": body["documentId"],
+        "owner_id": request.user["id"],
+        "name": body["name"],
+        "members": list(body["members"]),
+        "settings": {},
+    })
+    return Response({"room": room}, 201)
+
+
+@handles("WebSocket /collaboration/rooms/:id")
+async def room_socket(request, query):
+    store = request.app.store
+    user_id = request.user["id"]
+    room = await store.call("get", "collaboration_rooms", request.params["id"])
+    if room is None or (room["owner_id"] != user_id and user_id not in room["members"]):
+        raise HTTPError(404, "room not found")
+    document = await store.call("get", "documents", room["document_id"])
+    if document is None:
+        raise HTTPError(410, "the room's document was deleted")
+    user = {"id": user_id, "name": request.user["name"]}
+    return upgrade(request, lambda ws: request.app.rooms.session(room, document, user, ws))
+
+
+# Constellation
+
+MAX_LAYOUT_ITERATIONS = 500
+
+
+@handles("GET /constellation")
+async def constellation(request, query):
+    await _settled(request)
+    return request.app.graph.for_user(request.user["id"]).to_json()
+
+
+def _iterations(request):
+    values = request.query.get("iterations")
+    if not values:
+        return None
+    try:
+        iterations = int(values[-1])
+    except ValueError:
+        raise HTTPError(400, "invalid query", {"iterations": "expected integer"})
+    if not 1 <= iterations <= MAX_LAYOUT_ITERATIONS:
+        raise HTTPError(400, "invalid query", {"iterations": f"must be between 1 and {MAX_LAYOUT_ITERATIONS}"})
+    return iterations
+
+
+async def _layout_events(steps):
+    try:
+        async for step, positions in steps:
+            yield sse_event("layout", {"iteration": step, "positions": positions})
+        yield sse_event("done", {})
+    except RuntimeError as exc:
+        yield sse_event("error", {"error": str(exc)})
+    finally:
+        await steps.aclose()
+
+
+@handles("GET /constellation/layout")
+async def constellation_layout(request, query):
+    iterations = _iterations(request)
+    await _settled(request)
+    graph = request.app.graph
+    if "text/event-stream" in request.headers.get("accept", ""):
+        return StreamingResponse(_layout_events(graph.layout(request.user["id"], iterations)))
+    # Only the final positions are wanted, so skip the progress snapshots
+    steps = graph.layout(request.user["id"], iterations, every=MAX_LAYOUT_ITERATIONS + 1)
+    step, positions = 0, {}
+    try:
+        async for step, positions in steps:
+            pass
+    except RuntimeError as exc:
+        raise HTTPError(503, str(exc))
+    return {"positions": positions, "iterations": step}
+
+
+# Focus sessions
+
+MAX_SESSION_LOG = 500
+
+
+@handles("POST /focus/sessions")
+async def log_focus_session(request, body):
+    errors = {}
+    category = body["category"].strip()
+    if not category or len(category) > 64:
+        errors["category"] = "must be 1-64 characters"
+    try:
+        started = parse_time(body["startedAt"])
+    except ValueError:
+        errors["startedAt"] = "expected an ISO-8601 timestamp"
+        started = None
+    duration = body["duration"]
+    # Stored in whole seconds, so the rounded value is the one checked
+    if isinstance(duration, bool) or not 0 < duration <= MAX_SESSION or round(duration) < 1:
+        errors["duration"] = f"must be between 1 and {MAX_SESSION} seconds"
+    else:
+        duration = round(duration)
+        if started is not None and started + duration > time.time() + 300:
+            errors["startedAt"] = "session has not ended yet"
+    if errors:
+        raise HTTPError(400, "invalid request body", errors)
+    session = await request.app.store.call("insert", "focus_sessions", {
+        "user_id": request.user["id"],
+        "category": category,
+        "started_at": format_time(started),
+        "duration": duration,
+    })
+    request.app.focus.session_added(session)
+    return Response({"session": session}, 201)
+
+
+def _query_value(request, name, parse, message):
+    values = request.query.get(name)
+    if not values:
+        return None
+    try:
+        return parse(values[-1])
+    except ValueError:
+        raise HTTPError(400, "invalid query", {name: message}) from None
+
+
+@handles("GET /focus/sessions")
+async def list_focus_sessions(request, query):
+    limit = _query_value(request, "limit", int, "expected integer") or SESSION_LOG_LIMIT
+    if not 1 <= limit <= MAX_SESSION_LOG:
+        raise HTTPError(400, "invalid query", {"limit": f"must be between 1 and {MAX_SESSION_LOG}"})
+    return {"sessions": (await request.app.focus.for_user(request.user["id"])).recent(limit)}
+
+
+@handles("GET /focus/stats")
+async def focus_stats(request, query):
+    period = _query_value(request, "period", str, "") or "day"
+    if period not in PERIODS:
+        raise HTTPError(400, "invalid query", {"period": f"expected one of {', '.join(PERIODS)}"})
+    first = _query_value(request, "from", parse_time, "expected an ISO-8601 date")
+    last = _query_value(request, "to", parse_time, "expected an ISO-8601 date")
+    if first is not None and last is not None and first > last:
+        raise HTTPError(400, "invalid query", {"from": "must not be after 'to'"})
+    return await request.app.focus.stats(request.user["id"], period, first, last)
+
+
+# Observability
+
+@handles("GET /metrics")
+async def metrics_endpoint(request, query):
+    # Public to the API's own auth; guarded by a scrape token when one is set
+    token = request.app.settings.get("observability", {}).get("metricsToken")
+    if token:
+        supplied = request.headers.get("authorization", "").partition(" ")[2]
+        if not hmac.compare_digest(supplied.encode(), str(token).encode()):
+            raise HTTPError(401, "missing or invalid metrics token")
+    if "application/json" in request.headers.get("accept", ""):
+        return request.app.metrics.summary()
+    return Response(body=request.app.metrics.render().encode("utf-8"),
+                    content_type="text/plain; version=0.0.4; charset=utf-8")
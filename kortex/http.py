@@ -0,0 +1,229 @@
+# Minimal HTTP/1.1 layer on top of asyncio streams
+#
+# Just enough protocol for a JSON API: keep-alive connections, Content-Length
+# bodies and JSON responses, plus streamed responses for server-sent events
+# and protocol upgrades for WebSockets. Anything fancier belongs to a real
+# server.
+import asyncio
+import json
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+MAX_HEADER_SIZE = 64 * 1024
+MAX_BODY_SIZE = 32 * 1024 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message=None, details=None, headers=None):
+        super().__init__(message or HTTPStatus(status).phrase)
+        self.status = status
+        self.message = message or HTTPStatus(status).phrase
+        self.details = details
+        self.headers = headers
+
+    def payload(self):
+        payload = {"error": self.message}
+        if self.details:
+            payload["details"] = self.details
+        return payload
+
+
+class Request:
+    __slots__ = ("method", "path", "query", "headers", "body", "params", "user", "app", "_json")
+
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+        self.params = {}
+        self.user = None
+        self.app = None
+        self._json = None
+
+    @property
+    def content_type(self):
+        return self.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    def json(self):
+        if self._json is None:
+            if not self.body:
+                self._json = {}
+            else:
+                try:
+                    self._json = json.loads(self.body)
+                except ValueError:
+                    raise HTTPError(400, "request body is not valid JSON")
+        return self._json
+
+
+class Response:
+    __slots__ = ("status", "body", "headers")
+
+    def __init__(self, payload=None, status=200, headers=None, body=None, content_type="application/json"):
+        self.status = status
+        self.headers = {"content-type": content_type}
+        if headers:
+            self.headers.update(headers)
+        if body is None:
+            body = b"" if payload is None else json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        self.body = body
+
+    def encode(self, keep_alive):
+        reason = HTTPStatus(self.status).phrase
+        lines = [f"HTTP/1.1 {self.status} {reason}"]
+        for name, value in self.headers.items():
+            lines.append(f"{name}: {value}")
+        lines.append(f"content-length: {len(self.body)}")
+        lines.append(f"connection: {'keep-alive' if keep_alive else 'close'}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + self.body
+
+
+class StreamingResponse:
+    """A response whose body is an async iterator of bytes.
+
+    The body is written chunk by chunk with a drain after each one, so a slow
+    client slows the producer down instead of growing a buffer. The
+    connection closes when the body ends, and the iterator is closed early
+    if the client disconnects first.
+    """
+
+    __slots__ = ("status", "chunks", "headers")
+
+    def __init__(self, chunks, status=200, headers=None, content_type="text/event-stream"):
+        self.status = status
+        self.chunks = chunks
+        self.headers = {"content-type": content_type, "cache-control": "no-cache"}
+        if headers:
+            self.headers.update(headers)
+
+    def encode_head(self):
+        lines = [f"HTTP/1.1 {self.status} {HTTPStatus(self.status).phrase}"]
+        lines.extend(f"{name}: {value}" for name, value in self.headers.items())
+        lines.append("connection: close")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+class Upgrade:
+    """Switch protocols: after the 101 head the connection belongs to run(reader, writer)."""
+
+    __slots__ = ("run", "headers")
+
+    def __init__(self, run, headers):
+        self.run = run
+        self.headers = headers
+
+    def encode_head(self):
+        lines = ["HTTP/1.1 101 Switching Protocols"]
+        lines.extend(f"{name}: {value}" for name, value in self.headers.items())
+        lines.append("connection: upgrade")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def sse_event(event, data):
+    """Encode one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode("utf-8")
+
+
+async def write_stream(response, reader, writer):
+    async def pump():
+        try:
+            async for chunk in response.chunks:
+                writer.write(chunk)
+                await writer.drain()
+        finally:
+            await response.chunks.aclose()
+
+    async def watch():
+        # The client sends nothing more on a streaming response, so EOF
+        # here means it went away
+        while await reader.read(1024):
+            pass
+
+    writer.write(response.encode_head())
+    pumping = asyncio.create_task(pump())
+    watching = asyncio.create_task(watch())
+    try:
+        await asyncio.wait({pumping, watching}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in (pumping, watching):
+            task.cancel()
+        await asyncio.gather(pumping, watching, return_exceptions=True)
+
+
+async def read_request(reader):
+    """Read one request off the stream, or None once the peer has closed."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as exc:
+        if exc.partial.strip():
+            raise HTTPError(400, "truncated request")
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(431)
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+    if not version.startswith("HTTP/1."):
+        raise HTTPError(505)
+
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    headers.setdefault("connection", "keep-alive" if version == "HTTP/1.1" else "close")
+
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise HTTPError(501, "chunked request bodies are not supported")
+    length = headers.get("content-length") or "0"
+    if not (length.isascii() and length.isdigit()):
+        raise HTTPError(400, "invalid content-length")
+    length = int(length)
+    if length > MAX_BODY_SIZE:
+        raise HTTPError(413)
+    body = await reader.readexactly(length) if length else b""
+
+    url = urlsplit(target)
+    query = parse_qs(url.query, keep_blank_values=True)
+    return Request(method.upper(), unquote(url.path), query, headers, body)
+
+
+async def serve_connection(reader, writer, dispatch):
+    """Run dispatch(request) -> Response for each request on a connection."""
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except HTTPError as exc:
+                writer.write(Response(exc.payload(), exc.status).encode(False))
+                await writer.drain()
+                break
+            if request is None:
+                break
+            keep_alive = request.headers["connection"].lower() != "close"
+            response = await dispatch(request)
+            if isinstance(response, StreamingResponse):
+                await write_stream(response, reader, writer)
+                break
+            if isinstance(response, Upgrade):
+                writer.write(response.encode_head())
+                await response.run(reader, writer)
+                break
+            writer.write(response.encode(keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(dispatch, host, port):
+    return await asyncio.start_server(
+        lambda r, w: serve_connection(r, w, dispatch), host, port, limit=MAX_HEADER_SIZE)
@@ -0,0 +1,166 @@
+# Local background job queue: SQLite for state, a process pool for the work
+#
+# Jobs are rows keyed by (kind, key). Enqueueing a job that is already
+# pending or running is a no-op, and a finished job's result is kept so the
+# same work is never done twice. Failures are retried with exponential
+# backoff up to MAX_ATTEMPTS. The worker runs at most `concurrency` jobs at
+# once in worker processes, so CPU-heavy tasks never touch the event loop.
+import asyncio
+import inspect
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 5.0
+POLL_INTERVAL = 1.0
+
+
+class JobQueue:
+    def __init__(self, path=":memory:", clock=time.time):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                run_after REAL NOT NULL,
+                result TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                UNIQUE (kind, key)
+            );
+            CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, run_after);
+        """)
+        self.clock = clock
+        self.wake = asyncio.Event()
+
+    def enqueue(self, kind, key, payload):
+        """Queue a job unless one with the same kind and key exists. A failed
+        job is queued again; returns the job's current status."""
+        now = self.clock()
+        self.conn.execute(
+            "INSERT INTO jobs (kind, key, payload, status, run_after, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (kind, key) DO UPDATE SET status = excluded.status, attempts = 0, "
+            "payload = excluded.payload, run_after = excluded.run_after, error = NULL "
+            "WHERE jobs.status = 'failed'",
+            (kind, key, json.dumps(payload), "pending", now, now))
+        self.wake.set()
+        return self.status(kind, key)
+
+    def status(self, kind, key):
+        row = self.conn.execute("SELECT status FROM jobs WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+        return row[0] if row else None
+
+    def result(self, kind, key):
+        """The stored result of a finished job, or None."""
+        row = self.conn.execute("SELECT result FROM jobs WHERE kind = ? AND key = ? AND status = 'done'",
+                                (kind, key)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def claim(self, limit):
+        """Mark up to limit ready jobs as running and return them."""
+        now = self.clock()
+        rows = self.conn.execute(
+            "SELECT id, kind, key, payload, attempts FROM jobs WHERE status = 'pending' AND run_after <= ? "
+            "ORDER BY run_after LIMIT ?", (now, limit)).fetchall()
+        if rows:
+            self.conn.executemany("UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? "
+                                  "WHERE id = ?", [(now, row[0]) for row in rows])
+        return [{"id": r[0], "kind": r[1], "key": r[2], "payload": json.loads(r[3]), "attempt": r[4] + 1}
+                for r in rows]
+
+    def finish(self, job, result):
+        self.conn.execute("UPDATE jobs SET status = 'done', result = ?, error = NULL, updated_at = ? WHERE id = ?",
+                          (json.dumps(result), self.clock(), job["id"]))
+
+    def fail(self, job, error):
+        now = self.clock()
+        if job["attempt"] >= MAX_ATTEMPTS:
+            self.conn.execute("UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                              (error, now, job["id"]))
+        else:
+            retry_at = now + RETRY_DELAY * 2 ** (job["attempt"] - 1)
+            self.conn.execute("UPDATE jobs SET status = 'pending', error = ?, run_after = ?, updated_at = ? "
+                              "WHERE id = ?", (error, retry_at, now, job["id"]))
+
+    def forget(self, kind, key):
+        """Drop a job and its result, so the work is redone if queued again."""
+        self.conn.execute("DELETE FROM jobs WHERE kind = ? AND key = ? AND status != 'running'", (kind, key))
+
+    def recover(self):
+        """Requeue jobs left running by a process that died."""
+        return self.conn.execute("UPDATE jobs SET status = 'pending' WHERE status = 'running'").rowcount
+
+    def next_run(self):
+        row = self.conn.execute("SELECT MIN(run_after) FROM jobs WHERE status = 'pending'").fetchone()
+        return row[0]
+
+    def counts(self):
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+def _run_task(tasks, kind, payload):
+    return tasks[kind](payload)
+
+
+class Worker:
+    """Drain a JobQueue. tasks maps kind -> module-level function(payload)
+    run in a worker process; on_done(job, result) runs on the event loop
+    and may be a coroutine function."""
+
+    def __init__(self, queue, tasks, on_done=None, concurrency=None):
+        self.queue = queue
+        self.tasks = tasks
+        self.on_done = on_done
+        self.concurrency = concurrency or os.cpu_count() or 2
+        self.running = set()
+
+    async def _execute(self, pool, job):
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(pool, _run_task, self.tasks, job["kind"], job["payload"])
+        except Exception as exc:
+            self.queue.fail(job, f"{type(exc).__name__}: {exc}")
+        else:
+            self.queue.finish(job, result)
+            if self.on_done is not None:
+                done = self.on_done(job, result)
+                if inspect.isawaitable(done):
+                    await done
+        finally:
+            self.queue.wake.set()
+
+    async def run(self):
+        self.queue.recover()
+        with ProcessPoolExecutor(max_workers=self.concurrency) as pool:
+            try:
+                while True:
+                    self.queue.wake.clear()
+                    free = self.concurrency - len(self.running)
+                    for job in self.queue.claim(free) if free else ():
+                        task = asyncio.create_task(self._execute(pool, job))
+                        self.running.add(task)
+                        task.add_done_callback(self.running.discard)
+                    next_run = self.queue.next_run()
+                    if next_run is None or len(self.running) >= self.concurrency:
+                        timeout = POLL_INTERVAL
+                    else:
+                        timeout = min(POLL_INTERVAL, max(0.01, next_run - self.queue.clock()))
+                    try:
+                        await asyncio.wait_for(self.queue.wake.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                for task in self.running:
+                    task.cancel()
+                await asyncio.gather(*self.running, return_exceptions=True)
@@ -0,0 +1,458 @@
+# Benchmark suite and load generator driven by backend_api
+#
+# Every documented endpoint gets a request built from its spec: bodies and
+# query strings are filled in from the type hints ("string", "array", ...),
+# path parameters from fixtures created before the run. Each endpoint is
+# then loaded on its own for a few seconds, either closed-loop (N clients
+# sending back to back, which measures throughput at saturation) or
+# open-loop (a fixed arrival rate, with latency timed from when a request
+# was due rather than when it was sent, so a stalling server shows up as
+# latency instead of quietly lowering the load).
+#
+# Every endpoint runs against fixtures of its own (a fresh user and one of
+# each resource), so rows written by earlier phases do not slow later reads
+# and each phase starts with full rate-limit buckets. Answers of 429 are
+# counted apart from errors and kept out of the latency figures: they
+# measure the limiter, not the endpoint.
+#
+# Results are written as JSON; --baseline compares a run against an
+# earlier one and exits non-zero if an endpoint got slower, lost
+# throughput, or started failing.
+#
+#   python -m kortex.loadgen --save bench/baseline.json
+#   python -m kortex.loadgen --baseline bench/baseline.json --rate 200
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from urllib.parse import urlencode, urlsplit
+
+from .spec import get_backend_api
+
+DURATION = 3.0
+CONCURRENCY = 16
+MAX_CONNECTIONS = 256
+
+# A change counts as a regression past this fraction, and only when the
+# latency also moved by more than the noise floor
+THRESHOLD = 0.2
+NOISE_MS = 1.0
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FOCUS_CATEGORIES = ["Writing", "Training", "Meditation", "Breath Work", "Free Flow"]
+WORDS = ["orbit", "ember", "quill", "harbor", "lantern", "drift", "signal", "marrow", "cinder", "tide"]
+
+# Values by field name; everything else is filled in from its type
+FIELDS = {
+    "email": lambda fx, n: f"load-{fx['run']}-{n}@example.com",
+    "password": lambda fx, n: "correct horse battery staple",
+    "name": lambda fx, n: f"Load {n}",
+    "title": lambda fx, n: f"Draft {n}",
+    "content": lambda fx, n: _prose(200, n),
+    "message": lambda fx, n: _prose(20, n),
+    "prompt": lambda fx, n: _prose(20, n),
+    "description": lambda fx, n: _prose(12, n),
+    "type": lambda fx, n: "markdown",
+    "model": lambda fx, n: fx["model"],
+    "documentId": lambda fx, n: fx["documents"],
+    "tags": lambda fx, n: ["draft", WORDS[n % len(WORDS)]],
+    "members": lambda fx, n: [],
+    "context": lambda fx, n: [],
+    "tasks": lambda fx, n: [{"title": "Outline", "done": False}],
+    "filename": lambda fx, n: f"notes-{n}.txt",
+    "mimeType": lambda fx, n: "text/plain",
+    "size": lambda fx, n: 1024,
+    "category": lambda fx, n: FOCUS_CATEGORIES[n % len(FOCUS_CATEGORIES)],
+    "startedAt": lambda fx, n: time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - 3600 - n * 60)),
+    "duration": lambda fx, n: 1500,
+}
+
+QUERY_VALUES = {"folder": "/", "tags": "draft", "search": "dra", "type": "text"}
+
+TYPE_DEFAULTS = {"string": "x", "array": [], "object": {}, "number": 1, "boolean": True}
+
+# Bodies that are narrower than the spec allows
+BODIES = {
+    "POST /auth/login": lambda fx, n: {"email": fx["email"], "password": FIELDS["password"](fx, n)},
+    # Full content every time: the preview restarts rather than patching
+    "PUT /documents/:id/preview": lambda fx, n: {"content": _prose(200, n)},
+}
+
+# Endpoints that cannot be replayed in a loop, with the reason
+SKIP = {
+    "POST /assets/uploads/:id/complete": "needs a finished chunked upload",
+    "POST /auth/refresh": "each refresh token is revoked once it is used",
+}
+
+
+def _prose(words, seed):
+    return " ".join(WORDS[(seed * 7 + i * 3) % len(WORDS)] for i in range(words))
+
+
+def plan(api=None):
+    """(runnable endpoints, {endpoint: reason} for the ones skipped)."""
+    api = api or get_backend_api()
+    runnable, skipped = [], {}
+    for group, endpoints in api["endpoints"].items():
+        for key, spec in endpoints.items():
+            method = key.split(" ", 1)[0]
+            if key in SKIP:
+                skipped[key] = SKIP[key]
+            elif method == "WebSocket":
+                skipped[key] = "needs a WebSocket client"
+            elif isinstance(spec.get("body"), str):
+                skipped[key] = f"raw {spec['body']} body"
+            elif method == "DELETE":
+                skipped[key] = "would delete the fixtures"
+            else:
+                runnable.append((group, key, spec))
+    return runnable, skipped
+
+
+def build_request(group, key, spec, fixtures, n):
+    """(method, path with query, JSON body or None) for the nth request."""
+    method, path = key.split(" ", 1)
+    params = {"id": fixtures.get("uploads" if path.startswith("/assets/uploads") else group), "revision": 1}
+    path = re.sub(r":(\w+)", lambda m: str(params[m.group(1)]), path)
+    if spec.get("query"):
+        path += "?" + urlencode({name: QUERY_VALUES.get(name, "x") for name in spec["query"]})
+    if key in BODIES:
+        return method, path, BODIES[key](fixtures, n)
+    if not spec.get("body"):
+        return method, path, None
+    body = {}
+    for name, typename in spec["body"].items():
+        value = FIELDS[name](fixtures, n) if name in FIELDS else TYPE_DEFAULTS.get(typename)
+        if name in FIELDS or typename in TYPE_DEFAULTS:
+            body[name] = value
+    return method, path, body
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None, token=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        data = json.dumps(body).encode("utf-8") if body is not None else b""
+        head = [f"{method} {path} HTTP/1.1", f"host: {self.host}", f"content-length: {len(data)}"]
+        if body is not None:
+            head.append("content-type: application/json")
+        if token:
+            head.append(f"authorization: Bearer {token}")
+        try:
+            self.writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+            status_line = await self.reader.readline()
+            if not status_line:
+                raise ConnectionError("server closed the connection")
+            status = int(status_line.split()[1])
+            headers = {}
+            while True:
+                line = await self.reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            payload = await self.reader.readexactly(int(headers.get("content-length") or 0))
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            self.close()
+            raise
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, payload
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def setup(host, port, prefix):
+    """Register a user and create one of each resource the paths refer to."""
+    client = Client(host, port)
+    run = uuid.uuid4().hex[:8]
+    fixtures = {"run": run, "email": f"load-{run}@example.com"}
+
+    async def call(method, path, body=None):
+        status, payload = await client.request(method, prefix + path, body, fixtures.get("token"))
+        if status >= 400:
+            raise RuntimeError(f"fixture {method} {path} failed with {status}: {payload[:200]!r}")
+        return json.loads(payload)
+
+    user = await call("POST", "/auth/register", {"email": fixtures["email"], "password": FIELDS["password"](None, 0),
+                                                 "name": "Load"})
+    fixtures["token"] = user["token"]
+    fixtures["model"] = (await call("GET", "/ai/models"))["models"][0]["id"]
+    fixtures["documents"] = (await call("POST", "/documents", {"title": "Fixture", "content": _prose(200, 0),
+                                                               "type": "markdown", "tags": ["draft"]}))["document"]["id"]
+    fixtures["projects"] = (await call("POST", "/projects", {"name": "Fixture", "description": "",
+                                                             "type": "novel"}))["project"]["id"]
+    fixtures["collaboration"] = (await call("POST", "/collaboration/rooms", {
+        "name": "Fixture", "documentId": fixtures["documents"], "members": []}))["room"]["id"]
+    fixtures["uploads"] = (await call("POST", "/assets/uploads", {"filename": "fixture.txt", "size": 1024,
+                                                                  "mimeType": "text/plain"}))["upload"]["id"]
+    client.close()
+    return fixtures
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+        self.limited = 0
+
+    def record(self, latency, status):
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status == 429:
+            self.limited += 1
+            return
+        self.latencies.append(latency)
+        if status == "error" or status >= 400:
+            self.errors += 1
+
+    def summary(self, elapsed):
+        latencies = sorted(self.latencies)
+
+        def pct(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, max(0, int(len(latencies) * p / 100 + 0.5) - 1))]
+                         * 1000, 3)
+
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "rate_limited": self.limited,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items(), key=str)},
+            "throughput": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "p99_ms": pct(99),
+            "max_ms": round(latencies[-1] * 1000, 3) if latencies else None,
+        }
+
+
+async def _send(client, request, prefix, token, recorder, due):
+    method, path, body = request
+    try:
+        status, _ = await client.request(method, prefix + path, body, token)
+    except (OSError, asyncio.IncompleteReadError, ValueError):
+        status = "error"
+    recorder.record(time.perf_counter() - due, status)
+
+
+async def closed_loop(host, port, prefix, make_request, token, concurrency, duration):
+    recorder = Recorder()
+    counter = iter(range(10 ** 12))
+    deadline = time.perf_counter() + duration
+
+    async def client_loop():
+        client = Client(host, port)
+        while time.perf_counter() < deadline:
+            await _send(client, make_request(next(counter)), prefix, token, recorder, time.perf_counter())
+        client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return recorder.summary(time.perf_counter() - start)
+
+
+async def open_loop(host, port, prefix, make_request, token, rate, duration, max_connections=MAX_CONNECTIONS):
+    recorder = Recorder()
+    idle = []
+    slots = asyncio.Semaphore(max_connections)
+
+    async def fire(n, due):
+        # Waiting for a free connection is part of the latency
+        async with slots:
+            client = idle.pop() if idle else Client(host, port)
+            await _send(client, make_request(n), prefix, token, recorder, due)
+            idle.append(client)
+
+    start = time.perf_counter()
+    tasks = []
+    for n in range(int(rate * duration)):
+        due = start + n / rate
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(fire(n, due)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    for client in idle:
+        client.close()
+    return recorder.summary(elapsed)
+
+
+async def run(host, port, prefix, endpoints, rate=None, concurrency=CONCURRENCY, duration=DURATION, progress=None):
+    results = {}
+    for group, key, spec in endpoints:
+        fixtures = await setup(host, port, prefix)
+
+        def make_request(n, group=group, key=key, spec=spec):
+            return build_request(group, key, spec, fixtures, n)
+
+        if rate:
+            result = await open_loop(host, port, prefix, make_request, fixtures["token"], rate, duration)
+        else:
+            result = await closed_loop(host, port, prefix, make_request, fixtures["token"], concurrency, duration)
+        results[key] = result
+        if progress:
+            progress(key, result)
+    return results
+
+
+def _load_shape(report):
+    meta = report.get("meta", {})
+    return meta.get("mode"), meta.get("rate"), meta.get("concurrency"), meta.get("duration")
+
+
+def compare(current, baseline, threshold=THRESHOLD, noise_ms=NOISE_MS):
+    """Regressions of current against baseline, one dict per metric.
+    Throughput is only comparable between closed-loop runs of the same
+    shape; an open-loop run's throughput is just its rate."""
+    regressions = []
+    same_load = _load_shape(current) == _load_shape(baseline) and current["meta"]["mode"] == "closed"
+    for key, now in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(key)
+        if not before or not before["requests"] or not now["requests"]:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            old, new = before[metric], now[metric]
+            if new > old * (1 + threshold) and new - old > noise_ms:
+                regressions.append({"endpoint": key, "metric": metric, "baseline": old, "current": new})
+        if same_load and now["throughput"] < before["throughput"] * (1 - threshold):
+            regressions.append({"endpoint": key, "metric": "throughput", "baseline": before["throughput"],
+                                "current": now["throughput"]})
+        old_rate = before["errors"] / before["requests"]
+        new_rate = now["errors"] / now["requests"]
+        if new_rate > old_rate + 0.01:
+            regressions.append({"endpoint": key, "metric": "error_rate", "baseline": round(old_rate, 4),
+                                "current": round(new_rate, 4)})
+    return regressions
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_backend(port):
+    """Run the reference backend (rows in memory) in a scratch directory."""
+    workdir = tempfile.mkdtemp(prefix="kortex-loadgen-")
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    process = subprocess.Popen([sys.executable, "-m", "kortex.server", "--memory", "--port", str(port)],
+                               cwd=workdir, env=env, stdout=subprocess.DEVNULL)
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("the backend exited during startup")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("the backend did not start listening")
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load every backend_api endpoint and report latency")
+    parser.add_argument("--url", help="base URL of a running backend (default: start one in memory)")
+    parser.add_argument("--rate", type=float, help="open loop: requests per second per endpoint")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="closed loop: concurrent clients")
+    parser.add_argument("--duration", type=float, default=DURATION, help="seconds per endpoint")
+    parser.add_argument("--endpoint", metavar="REGEX", help="only endpoints whose 'METHOD /path' matches")
+    parser.add_argument("--save", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="flag regressions against an earlier --save")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="relative change that counts")
+    args = parser.parse_args(argv)
+
+    endpoints, skipped = plan()
+    if args.endpoint:
+        endpoints = [e for e in endpoints if re.search(args.endpoint, e[1])]
+        skipped = {key: reason for key, reason in skipped.items() if re.search(args.endpoint, key)}
+    process = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port, prefix = url.hostname, url.port or 80, url.path.rstrip("/")
+    else:
+        host, port = "127.0.0.1", _free_port()
+        prefix = urlsplit(get_backend_api()["base_url"]).path.rstrip("/")
+        process = start_backend(port)
+
+    mode = f"open loop at {args.rate:g} req/s" if args.rate else f"closed loop with {args.concurrency} clients"
+    print(f"🏁 {len(endpoints)} endpoints, {mode}, {args.duration:g}s each")
+
+    def ms(value):
+        return f"{value:7.2f}" if value is not None else "    n/a"
+
+    def progress(key, r):
+        mark = "⚠️" if r["errors"] or not r["requests"] else "✅"
+        limited = f"  rate-limited {r['rate_limited']}" if r["rate_limited"] else ""
+        print(f"{mark} {key:42} {r['throughput']:8.1f} req/s  p50 {ms(r['p50_ms'])}  p95 {ms(r['p95_ms'])}  "
+              f"p99 {ms(r['p99_ms'])} ms  errors {r['errors']}{limited}")
+
+    try:
+        results = asyncio.run(run(host, port, prefix, endpoints, args.rate, args.concurrency, args.duration,
+                                  progress))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    for key, reason in skipped.items():
+        print(f"⏭️ {key}: {reason}")
+
+    report = {
+        "meta": {"started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "commit": _commit(),
+                 "python": platform.python_version(), "mode": "open" if args.rate else "closed",
+                 "rate": args.rate, "concurrency": None if args.rate else args.concurrency,
+                 "duration": args.duration},
+        "endpoints": results,
+        "skipped": skipped,
+    }
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 results written to {args.save}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if _load_shape(report) != _load_shape(baseline):
+            print("⚠️ the baseline was recorded under a different load; throughput is not compared")
+        regressions = compare(report, baseline, args.threshold)
+        for r in regressions:
+            print(f"📉 {r['endpoint']} {r['metric']}: {r['baseline']} -> {r['current']}")
+        if regressions:
+            return 1
+        print("✅ no regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
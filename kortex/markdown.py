@@ -0,0 +1,455 @@
+# Incremental Markdown rendering for the editor preview
+#
+# A document is split into blocks (paragraphs, headings, lists, quotes,
+# fenced code, rules) and each block is rendered on its own, so HTML is
+# cached per block under a hash of its source. A Preview remembers the
+# block layout it last sent to a client. An edit re-splits the text from the
+# block before it only until the new blocks line up with the old ones again,
+# then the client gets a short patch list instead of the whole document.
+#
+# The block splitter is context-free at block boundaries: what follows a
+# block start depends only on the text from there on. That is what lets an
+# edit re-split a window and reuse everything after it.
+import argparse
+import bisect
+import hashlib
+import html
+import random
+import re
+import sys
+import time
+from collections import OrderedDict
+
+from .graph import WIKI_LINK
+
+BLOCK_CACHE_SIZE = 50_000
+PREVIEW_SESSIONS = 256
+
+# Quotes nested deeper than this render their remaining text as a paragraph
+MAX_QUOTE_DEPTH = 32
+
+_FENCE = re.compile(r" {0,3}(`{3,}|~{3,})\s*([\w+-]*)")
+_HEADING = re.compile(r" {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$")
+_RULE = re.compile(r" {0,3}([-*_])(?:[ \t]*\1){2,}[ \t]*$")
+_ITEM = re.compile(r"( *)([-*+]|\d{1,9}[.)])[ \t]+")
+
+_CODE_SPAN = re.compile(r"(`+)(.+?)\1", re.S)
+_IMAGE = re.compile(r"!\[([^\]]*)\]\(([^)\s]+)\)")
+_LINK = re.compile(r"\[([^\]]+)\]\(([^)\s]+)\)")
+_STRONG = re.compile(r"\*\*(.+?)\*\*|(?<!\w)__(.+?)__(?!\w)", re.S)
+_EMPHASIS = re.compile(r"\*(.+?)\*|(?<!\w)_(.+?)_(?!\w)", re.S)
+_SAFE_URL = re.compile(r"(https?:|mailto:|[/#.?]|[\w.-]+(?:/|$))", re.I)
+_STASHED = re.compile("\x00(\\d+)\x00")
+
+
+class EditError(ValueError):
+    pass
+
+
+# Block splitting
+
+def _fence(line):
+    if line.lstrip(" ")[:1] in ("`", "~"):
+        return _FENCE.match(line)
+    return None
+
+
+def _standalone(line):
+    # Headings and rules are blocks of their own even without blank lines
+    first = line.lstrip(" ")[:1]
+    if first == "#":
+        return _HEADING.match(line) is not None
+    if first in ("-", "*", "_"):
+        return _RULE.match(line) is not None
+    return False
+
+
+def spans(text, pos=0):
+    """Yield (start, end) of each block from pos, which must be 0 or a block
+    start. end excludes the block's final newline."""
+    n = len(text)
+    start = end = None
+    while pos < n:
+        eol = text.find("\n", pos)
+        if eol == -1:
+            eol = n
+        line = text[pos:eol]
+        fence = _fence(line)
+        if not line.strip():
+            if start is not None:
+                yield start, end
+                start = None
+        elif fence:
+            if start is not None:
+                yield start, end
+                start = None
+            marker = fence.group(1)
+            close = eol
+            while close < n:
+                line_start = close + 1
+                close = text.find("\n", line_start)
+                if close == -1:
+                    close = n
+                line = text[line_start:close].strip()
+                if line.startswith(marker) and not line.strip(marker[0]):
+                    break
+            yield pos, close
+            eol = close
+        elif _standalone(line):
+            if start is not None:
+                yield start, end
+                start = None
+            yield pos, eol
+        else:
+            if start is None:
+                start = pos
+            end = eol
+        pos = eol + 1
+    if start is not None:
+        yield start, end
+
+
+# Rendering
+
+def _url(url):
+    return url if _SAFE_URL.match(url) else None
+
+
+def _emphasis(text):
+    text = _STRONG.sub(lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>", text)
+    return _EMPHASIS.sub(lambda m: f"<em>{m.group(1) or m.group(2)}</em>", text)
+
+
+def inline(text):
+    """Escape text and render code spans, links, images, [[wiki links]],
+    strong and emphasis. Nothing inside a code span or a URL is formatted."""
+    # Each finished element is swapped for a \0n\0 token before the
+    # emphasis pass, so asterisks in its markup or URL are never matched
+    stash = []
+
+    def keep(fragment):
+        stash.append(fragment)
+        return f"\x00{len(stash) - 1}\x00"
+
+    def image(m):
+        src = _url(m.group(2))
+        return keep(f'<img src="{src}" alt="{m.group(1)}">') if src else m.group(0)
+
+    def link(m):
+        href = _url(m.group(2))
+        if not href:
+            return m.group(0)
+        return keep(f'<a href="{href}" target="_blank" rel="noopener">{_emphasis(m.group(1))}</a>')
+
+    def wiki(m):
+        return keep(f'<a class="wiki-link" data-title="{m.group(1).strip()}">'
+                    f'{m.group(0)[2:-2].split("|")[-1]}</a>')
+
+    text = html.escape(text.replace("\x00", "\ufffd"))
+    text = _CODE_SPAN.sub(lambda m: keep(f"<code>{m.group(2).strip()}</code>"), text)
+    text = _IMAGE.sub(image, text)
+    text = _LINK.sub(link, text)
+    text = WIKI_LINK.sub(wiki, text)
+    text = _emphasis(text)
+
+    def restore(m):
+        return _STASHED.sub(restore, stash[int(m.group(1))])
+
+    return _STASHED.sub(restore, text)
+
+
+def _list(lines):
+    ordered = _ITEM.match(lines[0]).group(2)[-1] in ".)"
+    items = []
+    for line in lines:
+        m = _ITEM.match(line)
+        if m or not items:
+            items.append(line[m.end():] if m else line)
+        else:
+            items[-1] += "\n" + line.strip()
+    tag = "ol" if ordered else "ul"
+    body = "".join(f"<li>{inline(item)}</li>" for item in items)
+    return f"<{tag}>{body}</{tag}>"
+
+
+def render_block(block, depth=0):
+    """HTML for one block as produced by spans()."""
+    first = block.split("\n", 1)[0]
+    fence = _fence(first)
+    if fence:
+        lines = block.split("\n")[1:]
+        if lines and lines[-1].strip().startswith(fence.group(1)):
+            lines.pop()
+        lang = f' class="language-{fence.group(2)}"' if fence.group(2) else ""
+        return f"<pre><code{lang}>{html.escape(chr(10).join(lines))}</code></pre>"
+    if _standalone(first):
+        heading = _HEADING.match(first)
+        if heading:
+            level = len(heading.group(1))
+            return f"<h{level}>{inline(heading.group(2) or '')}</h{level}>"
+        return "<hr>"
+    if first.lstrip(" ").startswith(">"):
+        inner = "\n".join(line.lstrip(" ")[1:].removeprefix(" ") if line.lstrip(" ").startswith(">") else line
+                          for line in block.split("\n"))
+        if depth >= MAX_QUOTE_DEPTH:
+            return f"<blockquote><p>{inline(inner)}</p></blockquote>"
+        # Rendered here rather than through the shared cache, whose entries
+        # must not depend on how deeply a block is nested
+        body = "\n".join(render_block(inner[start:end], depth + 1) for start, end in spans(inner))
+        return f"<blockquote>{body}</blockquote>"
+    if _ITEM.match(first):
+        return _list(block.split("\n"))
+    return f"<p>{inline(block)}</p>"
+
+
+def block_key(block):
+    return hashlib.blake2b(block.encode("utf-8"), digest_size=16).digest()
+
+
+class BlockCache:
+    """Rendered HTML by block hash, least recently used first out. Shared by
+    every preview, so identical blocks across documents render once."""
+
+    def __init__(self, size=BLOCK_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def html(self, key, block):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = self.entries[key] = render_block(block)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        return value
+
+
+CACHE = BlockCache()
+
+
+def render(text, cache=None):
+    """The whole document as HTML, one element per block."""
+    cache = cache or CACHE
+    out = []
+    for start, end in spans(text):
+        block = text[start:end]
+        out.append(cache.html(block_key(block), block))
+    return "\n".join(out)
+
+
+# Preview sessions
+
+def _patches(old, new, offset, cache, blocks):
+    """Patch ops turning old keys into new keys, both starting at offset.
+    blocks(i) returns the source of new block i."""
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    removed = len(old) - prefix - suffix
+    added = len(new) - prefix - suffix
+    index = offset + prefix
+    html_of = [cache.html(new[i], blocks(i)) for i in range(prefix, prefix + added)]
+    ops = []
+    shared = min(removed, added)
+    if shared:
+        ops.append({"op": "replace", "index": index, "blocks": html_of[:shared]})
+    if added > shared:
+        ops.append({"op": "insert", "index": index + shared, "blocks": html_of[shared:]})
+    elif removed > shared:
+        ops.append({"op": "remove", "index": index + shared, "count": removed - shared})
+    return ops
+
+
+class Preview:
+    """The block layout a client was last sent for one document."""
+
+    def __init__(self, cache=None):
+        self.cache = cache or CACHE
+        self.text = ""
+        self.starts = []
+        self.ends = []
+        self.keys = []
+        self.revision = 0
+
+    def update(self, text):
+        """Replace the whole text; returns patch ops for the client."""
+        layout = list(spans(text))
+        keys = [block_key(text[s:e]) for s, e in layout]
+        ops = _patches(self.keys, keys, 0, self.cache, lambda i: text[layout[i][0]:layout[i][1]])
+        self.text = text
+        self.starts = [s for s, _ in layout]
+        self.ends = [e for _, e in layout]
+        self.keys = keys
+        self.revision += 1
+        return ops
+
+    def _splice(self, start, end, insert):
+        text = self.text
+        new = text[:start] + insert + text[end:]
+        delta = len(insert) - (end - start)
+        # Re-split from the block before the one holding the edit: deleting a
+        # blank line merges a block into its predecessor
+        i = bisect.bisect_right(self.starts, start) - 2
+        pos = self.starts[i] if i >= 0 else 0
+        i = max(i, 0)
+        tail = len(self.starts)
+        layout = []
+        for s, e in spans(new, pos):
+            if s >= start + len(insert):
+                # Past the edit: once a block matches an old one shifted by
+                # delta, every block after it matches as well
+                j = bisect.bisect_left(self.starts, s - delta)
+                if j < tail and self.starts[j] == s - delta and self.ends[j] == e - delta:
+                    tail = j
+                    break
+            layout.append((s, e))
+        keys = [block_key(new[s:e]) for s, e in layout]
+        ops = _patches(self.keys[i:tail], keys, i, self.cache, lambda k: new[layout[k][0]:layout[k][1]])
+        self.text = new
+        self.starts[i:] = [s for s, _ in layout] + [s + delta for s in self.starts[tail:]]
+        self.ends[i:] = [e for _, e in layout] + [e + delta for e in self.ends[tail:]]
+        self.keys[i:] = keys + self.keys[tail:]
+        return ops
+
+    def edit(self, edits):
+        """Apply [start, end, text] replacements in order (offsets in code
+        points, each against the text left by the previous one); returns
+        patch ops for the client."""
+        # Check the whole batch first so a bad edit leaves nothing half-applied
+        length = len(self.text)
+        for edit in edits:
+            if (not isinstance(edit, list) or len(edit) != 3 or not isinstance(edit[2], str)
+                    or not all(isinstance(x, int) and not isinstance(x, bool) for x in edit[:2])):
+                raise EditError("each edit must be [start, end, text]")
+            start, end, insert = edit
+            if not 0 <= start <= end <= length:
+                raise EditError(f"edit [{start}, {end}) is outside the document")
+            length += len(insert) - (end - start)
+        ops = []
+        for edit in edits:
+            ops.extend(self._splice(*edit))
+        self.revision += 1
+        return ops
+
+
+class Previews:
+    """Preview per (user, document), oldest dropped past PREVIEW_SESSIONS."""
+
+    def __init__(self, size=PREVIEW_SESSIONS, cache=None):
+        self.size = size
+        self.cache = cache or CACHE
+        self.sessions = OrderedDict()
+
+    def get(self, user_id, document_id):
+        key = (user_id, document_id)
+        preview = self.sessions.get(key)
+        if preview is not None:
+            self.sessions.move_to_end(key)
+        return preview
+
+    def start(self, user_id, document_id):
+        preview = self.sessions[user_id, document_id] = Preview(self.cache)
+        while len(self.sessions) > self.size:
+            self.sessions.popitem(last=False)
+        return preview
+
+    def drop(self, document_id):
+        for key in [key for key in self.sessions if key[1] == document_id]:
+            del self.sessions[key]
+
+
+def _manuscript(words, seed=3):
+    rng = random.Random(seed)
+    vocab = ["the", "quiet", "ship", "drifted", "past", "a", "**lantern**", "of", "*stars*", "and", "she",
+             "wrote", "`log`", "[[Harbor]]"]
+    parts = []
+    count = 0
+    chapter = 0
+    while count < words:
+        if count % 5000 < 60:
+            chapter += 1
+            parts.append(f"## Chapter {chapter}")
+        roll = rng.random()
+        if roll < 0.05:
+            parts.append("\n".join(f"- {' '.join(rng.choices(vocab, k=6))}" for _ in range(4)))
+            count += 24
+        elif roll < 0.07:
+            parts.append("```python\nprint('draft')\n\nprint('again')\n```")
+            count += 4
+        else:
+            n = rng.randint(40, 120)
+            parts.append(" ".join(rng.choices(vocab, k=n)) + ".")
+            count += n
+    return "\n\n".join(parts)
+
+
+def benchmark(words, edits=500):
+    text = _manuscript(words)
+    cache = BlockCache()
+    start = time.perf_counter()
+    render(text, cache)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    render(text, cache)
+    warm = time.perf_counter() - start
+
+    preview = Preview(cache)
+    preview.update(text)
+    rng = random.Random(9)
+    timings = []
+    patched = 0
+    for _ in range(edits):
+        at = rng.randrange(len(preview.text))
+        edit = [at, at, rng.choice(["a", " ", "*", "\n", "\n\n"])] if rng.random() < 0.8 else [at, min(at + 3, len(preview.text)), ""]
+        begin = time.perf_counter()
+        ops = preview.edit([edit])
+        timings.append((time.perf_counter() - begin) * 1000)
+        patched += sum(len(op.get("blocks", ())) for op in ops)
+    timings.sort()
+    check = Preview(cache)
+    check.update(preview.text)
+    return {
+        "words": words,
+        "characters": len(text),
+        "blocks": len(preview.keys),
+        "cold_ms": cold * 1000,
+        "warm_ms": warm * 1000,
+        "edits": edits,
+        "p50_ms": timings[len(timings) // 2],
+        "p99_ms": timings[int(len(timings) * 0.99) - 1],
+        "blocks_per_edit": patched / edits,
+        "consistent": check.keys == preview.keys,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incremental Markdown preview")
+    parser.add_argument("--bench", type=int, metavar="WORDS", help="render and edit a synthetic manuscript")
+    parser.add_argument("--edits", type=int, default=500)
+    args = parser.parse_args(argv)
+    if not args.bench:
+        parser.print_help()
+        return 0
+    result = benchmark(args.bench, args.edits)
+    print(f"📄 {result['words']:,} words, {result['characters']:,} characters, {result['blocks']:,} blocks")
+    print(f"🖨️ full render {result['cold_ms']:.1f} ms cold, {result['warm_ms']:.1f} ms from cache")
+    print(f"⏱️ {result['edits']} edits: p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms, "
+          f"{result['blocks_per_edit']:.1f} blocks re-sent per edit")
+    if not result["consistent"]:
+        print("❌ incremental layout diverged from a full re-split")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+# Asset inspection run by the job worker: type sniffing, image dimensions,
+# thumbnails and text previews
+#
+# Everything here runs in a worker process on a file from the blob store.
+# Type detection and dimensions read a few header bytes with the standard
+# library; thumbnails need Pillow and are skipped without it.
+import os
+import re
+import struct
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+THUMBNAIL_SIZE = (256, 256)
+PREVIEW_CHARS = 500
+HEADER_BYTES = 64 * 1024
+
+# PDFs are scanned in chunks this big, each overlapping the last by enough
+# bytes to hold any page marker
+SCAN_BYTES = 1024 * 1024
+_PAGE = re.compile(rb"/Type\s{0,64}/Page(?![a-zA-Z])")
+_PAGE_OVERLAP = 128
+
+TEXT_TYPES = {"text/plain", "text/markdown", "text/csv", "text/html", "application/json", "image/svg+xml"}
+
+
+def sniff(head):
+    """The MIME type implied by a file's first bytes, or None."""
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    if head.startswith(b"PK\x03\x04"):
+        return "application/zip"
+    try:
+        text = head.decode("utf-8")
+    except UnicodeDecodeError:
+        # A multi-byte character may straddle the end of the header
+        try:
+            text = head[:-3].decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+    if "\x00" in text:
+        return None
+    start = text.lstrip()[:256].lower()
+    if start.startswith("<svg") or (start.startswith("<?xml") and "<svg" in text[:1024].lower()):
+        return "image/svg+xml"
+    if start.startswith(("{", "[")):
+        return "application/json"
+    return "text/plain"
+
+
+def _jpeg_size(f):
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+            continue
+        length = struct.unpack(">H", f.read(2))[0]
+        # SOF0-SOF15 except DHT (C4), JPG (C8) and DAC (CC) carry the size
+        if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">xHH", f.read(5))
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def dimensions(path, mime_type):
+    """(width, height) read from the image header, or None."""
+    with open(path, "rb") as f:
+        head = f.read(32)
+        if mime_type == "image/png" and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if mime_type == "image/gif":
+            return struct.unpack("<HH", head[6:10])
+        if mime_type == "image/webp":
+            chunk = head[12:16]
+            if chunk == b"VP8 ":
+                width, height = struct.unpack("<HH", head[26:30])
+                return width & 0x3FFF, height & 0x3FFF
+            if chunk == b"VP8L":
+                bits = int.from_bytes(head[21:25], "little")
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b"VP8X":
+                return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+        if mime_type == "image/jpeg":
+            return _jpeg_size(f)
+    return None
+
+
+def thumbnail(path, target):
+    """Write a PNG thumbnail to target; False without Pillow."""
+    if Image is None:
+        return False
+    with Image.open(path) as image:
+        image.thumbnail(THUMBNAIL_SIZE)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        image.save(target + ".tmp", "PNG", optimize=True)
+    os.replace(target + ".tmp", target)
+    return True
+
+
+def text_preview(path):
+    with open(path, "rb") as f:
+        data = f.read(HEADER_BYTES)
+    text = data.decode("utf-8", errors="ignore")
+    return {"preview": text[:PREVIEW_CHARS], "words": len(text.split()), "lines": text.count("\n") + 1}
+
+
+def _pdf_pages(path):
+    # Counting page objects is approximate for compressed object streams.
+    # A marker is counted once it starts before the overlap kept for the
+    # next chunk, where it would otherwise be seen again.
+    pages = 0
+    buffer = b""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(SCAN_BYTES)
+            buffer += chunk
+            limit = len(buffer) if not chunk else len(buffer) - _PAGE_OVERLAP
+            pages += sum(1 for m in _PAGE.finditer(buffer) if m.start() < limit)
+            if not chunk:
+                return pages
+            buffer = buffer[max(limit, 0):]
+
+
+def inspect(payload):
+    """Job task: payload has the blob path and where its thumbnail goes."""
+    path = payload["path"]
+    with open(path, "rb") as f:
+        head = f.read(HEADER_BYTES)
+    detected = sniff(head)
+    result = {"detectedType": detected, "size": os.path.getsize(path)}
+    if detected and detected.startswith("image/") and detected != "image/svg+xml":
+        size = dimensions(path, detected)
+        if size:
+            result["width"], result["height"] = size
+        result["thumbnail"] = thumbnail(path, payload["thumbnail"])
+    elif detected in TEXT_TYPES:
+        result.update(text_preview(path))
+    elif detected == "application/pdf":
+        result["pages"] = _pdf_pages(path)
+    return result
+
+
+def mime_matches(declared, detected):
+    """Whether the declared type is consistent with the sniffed one."""
+    if detected is None:
+        return None
+    if declared == detected:
+        return True
+    # Plain text sniffing cannot tell markdown, CSV or source code apart
+    return detected == "text/plain" and (declared or "").startswith("text/")
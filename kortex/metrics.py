@@ -0,0 +1,279 @@
+# Counters, latency histograms and a sampling profiler for the backend
+#
+# Recording has to be cheap enough for the hot path: a counter is a dict
+# increment and a histogram observation is a bit_length(), a shift and a
+# list increment. Histograms are HDR-style log-linear buckets, 16 per power
+# of two, so any quantile is within ~6% of the true value at any scale;
+# /metrics folds them into fixed Prometheus "le" buckets at scrape time.
+# Gauges (pool sizes, open rooms) are read from a callback at scrape time
+# rather than kept up to date.
+#
+# The profiler is opt-in: a thread samples the event loop thread's stack
+# every few milliseconds and writes folded stacks ("a;b;c 42" per line),
+# which flamegraph.pl, speedscope and inferno all read.
+import asyncio
+import os
+import sys
+import threading
+from collections import Counter
+
+# Sub-buckets per power of two, as a bit count: 4 -> 16 -> 1/16 precision
+SUB_BITS = 4
+_SUB = 1 << SUB_BITS
+_LINEAR = _SUB * 2
+# Values are clamped here (2^40 microseconds is about 12 days)
+MAX_BITS = 40
+_BUCKETS = _LINEAR + (MAX_BITS - SUB_BITS) * _SUB
+
+# Prometheus bucket bounds for latency histograms, in seconds
+LATENCY_BOUNDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROFILE_INTERVAL = 0.005
+PROFILE_DEPTH = 64
+
+
+def bucket_index(value):
+    if value < _LINEAR:
+        return max(value, 0)
+    shift = value.bit_length() - SUB_BITS - 1
+    if shift + SUB_BITS + 1 > MAX_BITS:
+        return _BUCKETS - 1
+    return _LINEAR + (shift - 1) * _SUB + (value >> shift) - _SUB
+
+
+def bucket_bounds(index):
+    """[low, high) of the values that land in bucket index."""
+    if index < _LINEAR:
+        return index, index + 1
+    shift = (index - _LINEAR) // _SUB + 1
+    top = (index - _LINEAR) % _SUB + _SUB
+    return top << shift, (top + 1) << shift
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class CounterFamily:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self.values.items()):
+            yield self.name, _labels(self.labels, labels), value
+
+
+class GaugeFamily:
+    """Values read from collect() -> {label tuple: value} at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=(), collect=None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.collect = collect
+
+    def samples(self):
+        values = self.collect() if self.collect is not None else {}
+        for labels, value in sorted(values.items()):
+            yield self.name, _labels(self.labels, labels), value
+
+
+class Histogram:
+    """Log-linear buckets over non-negative integers."""
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = max(1, round(q * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                low, high = bucket_bounds(index)
+                return min((low + high - 1) / 2, self.max)
+        return self.max
+
+    def cumulative(self, bounds):
+        """Counts at or below each bound, as Prometheus buckets want. A
+        bucket straddling a bound counts toward the next one up."""
+        out = []
+        seen = 0
+        index = 0
+        for bound in bounds:
+            while index < _BUCKETS and bucket_bounds(index)[1] - 1 <= bound:
+                seen += self.counts[index]
+                index += 1
+            out.append(seen)
+        return out
+
+
+class HistogramFamily:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), bounds=LATENCY_BOUNDS, scale=1e6):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.bounds = bounds
+        # Observations are stored as integers in 1/scale units (microseconds)
+        self.scale = scale
+        self.histograms = {}
+
+    def observe(self, value, *labels):
+        histogram = self.histograms.get(labels)
+        if histogram is None:
+            histogram = self.histograms[labels] = Histogram()
+        histogram.record(int(value * self.scale))
+
+    def samples(self):
+        scaled = [int(b * self.scale) for b in self.bounds]
+        for labels, histogram in sorted(self.histograms.items()):
+            names = self.labels + ("le",)
+            for bound, count in zip(self.bounds, histogram.cumulative(scaled)):
+                yield f"{self.name}_bucket", _labels(names, labels + (f"{bound:g}",)), count
+            yield f"{self.name}_bucket", _labels(names, labels + ("+Inf",)), histogram.count
+            yield f"{self.name}_sum", _labels(self.labels, labels), histogram.total / self.scale
+            yield f"{self.name}_count", _labels(self.labels, labels), histogram.count
+
+    def summary(self, quantiles=(0.5, 0.9, 0.99)):
+        out = {}
+        for labels, h in sorted(self.histograms.items()):
+            entry = {"count": h.count, "mean": h.total / h.count / self.scale if h.count else None,
+                     "max": h.max / self.scale}
+            for q in quantiles:
+                entry[f"p{round(q * 100)}"] = h.quantile(q) / self.scale
+            out["/".join(map(str, labels)) or self.name] = entry
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self.families = {}
+
+    def _add(self, family):
+        existing = self.families.get(family.name)
+        if existing is not None and existing.kind == family.kind and family.kind != "gauge":
+            return existing
+        # Gauges are re-registered by each App with its own callback
+        self.families[family.name] = family
+        return family
+
+    def counter(self, name, help, labels=()):
+        return self._add(CounterFamily(name, help, labels))
+
+    def gauge(self, name, help, labels=(), collect=None):
+        return self._add(GaugeFamily(name, help, labels, collect))
+
+    def histogram(self, name, help, labels=(), bounds=LATENCY_BOUNDS, scale=1e6):
+        return self._add(HistogramFamily(name, help, labels, bounds, scale))
+
+    def render(self):
+        """Prometheus text exposition format 0.0.4."""
+        lines = []
+        for family in self.families.values():
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for name, labels, value in family.samples():
+                lines.append(f"{name}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        return {name: family.summary() for name, family in self.families.items() if family.kind == "histogram"}
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.counter("kortex_http_requests_total", "Requests by backend_api endpoint and status",
+                            ("route", "status"))
+LATENCY = REGISTRY.histogram("kortex_http_request_duration_seconds",
+                             "Time to produce a response (to the head for streams)", ("route",))
+AI_TOKENS = REGISTRY.counter("kortex_ai_tokens_total", "Tokens recorded in ai_conversations.tokens_used",
+                             ("model", "kind"))
+ROOM_FANOUT = REGISTRY.histogram("kortex_room_fanout", "Members each collaboration room broadcast goes to",
+                                 bounds=(1, 2, 5, 10, 25, 50, 100, 250, 500), scale=1)
+
+
+class SamplingProfiler:
+    """Samples one thread's stack every interval seconds into folded-stack
+    counts. Costs nothing until started."""
+
+    def __init__(self, thread_id=None, interval=PROFILE_INTERVAL, output=None):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.output = output
+        self.stacks = Counter()
+        self.samples = 0
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        names = []
+        while frame is not None and len(names) < PROFILE_DEPTH:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        if names:
+            self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+    def _run(self):
+        while not self.stopping.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="kortex-profiler", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+        if self.output:
+            self.dump(self.output)
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def dump(self, path):
+        """Write folded stacks to path (atomically, so it can be re-read live)."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            f.write(self.folded())
+        os.replace(path + ".tmp", path)
+
+    async def dump_every(self, interval=60.0):
+        while True:
+            await asyncio.sleep(interval)
+            self.dump(self.output)
@@ -0,0 +1,270 @@
+# Token-bucket rate limiting and cost accounting for the AI endpoints
+#
+# Every (user, model) pair gets two buckets: one for requests and one for
+# model tokens, with the token budget derived from the model's maxTokens in
+# server_config. Checking and charging are O(1) dict lookups plus a bit of
+# arithmetic; persistence to the database happens in the background and
+# never on the request path.
+#
+# Only the event loop touches accounts. A save snapshots the dirty ones on
+# the loop and hands plain rows to a database thread; usage counters are
+# stored as running totals that each save adds its deltas to. Accounts whose
+# buckets have refilled and that have nothing left to save are dropped, since
+# a fresh account would be identical.
+import asyncio
+import sys
+import time
+
+# Requests a user may burst per model, and their sustained rate per minute
+REQUEST_BURST = 20
+REQUESTS_PER_MINUTE = 30
+
+# Token budget per model, in multiples of its maxTokens: a burst of this
+# many maximum-length completions, refilled at this many per minute
+COMPLETIONS_BURST = 10
+COMPLETIONS_PER_MINUTE = 5
+
+# USD per 1K tokens (prompt, completion), list prices at time of writing
+PRICES = {
+    "gpt-4": (0.03, 0.06),
+    "claude-3-sonnet-20240229": (0.003, 0.015),
+}
+
+
+class RateLimited(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(f"{reason} rate limit exceeded, retry in {retry_after:.1f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    __slots__ = ("capacity", "rate", "tokens", "stamp")
+
+    def __init__(self, capacity, rate, tokens=None, stamp=None):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity if tokens is None else tokens
+        self.stamp = time.monotonic() if stamp is None else stamp
+
+    def _refill(self, now):
+        if now > self.stamp:
+            self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+
+    def take(self, amount, now):
+        """Take amount if available; otherwise return seconds until it is."""
+        self._refill(now)
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def charge(self, amount, now):
+        # Usage is only known after the call, so the bucket may go into debt
+        self._refill(now)
+        self.tokens -= amount
+
+    def wait_for_credit(self, now):
+        self._refill(now)
+        return 0.0 if self.tokens > 0 else (1 - self.tokens) / self.rate
+
+
+class Account:
+    __slots__ = ("requests", "tokens", "dirty", "prompt_tokens", "completion_tokens", "cost", "calls", "unsaved")
+
+    def __init__(self, requests, tokens):
+        self.requests = requests
+        self.tokens = tokens
+        self.dirty = False
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.calls = 0
+        # Usage booked since the last save: prompt, completion, cost, calls
+        self.unsaved = [0, 0, 0.0, 0]
+
+    def idle(self, now):
+        """Nothing to save and both buckets full again."""
+        self.requests._refill(now)
+        self.tokens._refill(now)
+        return not self.dirty and self.requests.tokens >= self.requests.capacity \
+            and self.tokens.tokens >= self.tokens.capacity
+
+
+class RateLimiter:
+    def __init__(self, catalogue, clock=time.monotonic):
+        self.max_tokens = {m["id"]: m["maxTokens"] for m in catalogue}
+        self.accounts = {}
+        self.clock = clock
+
+    def _account(self, user_id, model):
+        key = (user_id, model)
+        account = self.accounts.get(key)
+        if account is None:
+            max_tokens = self.max_tokens.get(model, 1000)
+            now = self.clock()
+            account = Account(
+                TokenBucket(REQUEST_BURST, REQUESTS_PER_MINUTE / 60, stamp=now),
+                TokenBucket(max_tokens * COMPLETIONS_BURST, max_tokens * COMPLETIONS_PER_MINUTE / 60, stamp=now),
+            )
+            self.accounts[key] = account
+        return account
+
+    def check(self, user_id, model):
+        """Admit one request or raise RateLimited with a retry hint."""
+        account = self._account(user_id, model)
+        now = self.clock()
+        wait = account.tokens.wait_for_credit(now)
+        if wait:
+            raise RateLimited("token", wait)
+        wait = account.requests.take(1, now)
+        if wait:
+            raise RateLimited("request", wait)
+        account.dirty = True
+
+    def charge(self, user_id, model, usage):
+        """Debit actual usage after a completion and book its cost."""
+        account = self._account(user_id, model)
+        account.tokens.charge(usage["totalTokens"], self.clock())
+        prompt_price, completion_price = PRICES.get(model, (0.0, 0.0))
+        cost = (usage["promptTokens"] * prompt_price + usage["completionTokens"] * completion_price) / 1000
+        account.prompt_tokens += usage["promptTokens"]
+        account.completion_tokens += usage["completionTokens"]
+        account.cost += cost
+        account.calls += 1
+        unsaved = account.unsaved
+        unsaved[0] += usage["promptTokens"]
+        unsaved[1] += usage["completionTokens"]
+        unsaved[2] += cost
+        unsaved[3] += 1
+        account.dirty = True
+
+    def costs(self, user_id=None):
+        """Usage of the accounts in memory (booked here or brought in by load)."""
+        return [
+            {"user_id": uid, "model": model, "calls": a.calls, "prompt_tokens": a.prompt_tokens,
+             "completion_tokens": a.completion_tokens, "cost_usd": round(a.cost, 6)}
+            for (uid, model), a in self.accounts.items()
+            if user_id is None or uid == user_id
+        ]
+
+    # Persistence. Buckets run on the monotonic clock, so they are stored
+    # against wall time and shifted back onto the monotonic clock on load.
+
+    TABLE = """CREATE TABLE IF NOT EXISTS ai_rate_limits (
+        user_id TEXT NOT NULL,
+        model TEXT NOT NULL,
+        request_tokens REAL NOT NULL,
+        model_tokens REAL NOT NULL,
+        prompt_tokens INTEGER NOT NULL,
+        completion_tokens INTEGER NOT NULL,
+        cost_usd REAL NOT NULL,
+        calls INTEGER NOT NULL,
+        saved_at REAL NOT NULL,
+        PRIMARY KEY (user_id, model)
+    ) WITHOUT ROWID"""
+
+    UPSERT = """INSERT INTO ai_rate_limits VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, model) DO UPDATE SET
+            request_tokens = excluded.request_tokens,
+            model_tokens = excluded.model_tokens,
+            prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+            completion_tokens = completion_tokens + excluded.completion_tokens,
+            cost_usd = cost_usd + excluded.cost_usd,
+            calls = calls + excluded.calls,
+            saved_at = excluded.saved_at"""
+
+    def snapshot(self):
+        """Rows for the dirty accounts, which count as saved from here on;
+        idle accounts are evicted. Runs on the event loop."""
+        now, wall = self.clock(), time.time()
+        rows = []
+        for key, account in list(self.accounts.items()):
+            if account.idle(now):
+                del self.accounts[key]
+            elif account.dirty:
+                rows.append((*key, account.requests.tokens, account.tokens.tokens, *account.unsaved, wall))
+                account.unsaved = [0, 0, 0.0, 0]
+                account.dirty = False
+        return rows
+
+    def restore(self, rows):
+        """Put back a snapshot whose write failed."""
+        for user_id, model, _, _, prompt_tokens, completion_tokens, cost, calls, _ in rows:
+            account = self._account(user_id, model)
+            unsaved = account.unsaved
+            unsaved[0] += prompt_tokens
+            unsaved[1] += completion_tokens
+            unsaved[2] += cost
+            unsaved[3] += calls
+            account.dirty = True
+
+    def write(self, conn, rows):
+        """Store snapshot rows; safe to run on a database thread."""
+        if rows:
+            conn.execute(self.TABLE)
+            conn.executemany(self.UPSERT, rows)
+        return len(rows)
+
+    def save(self, conn):
+        """Snapshot and write in one go; returns how many accounts were saved."""
+        return self.write(conn, self.snapshot())
+
+    def read(self, conn):
+        conn.execute(self.TABLE)
+        return conn.execute("SELECT * FROM ai_rate_limits").fetchall()
+
+    def merge(self, rows):
+        """Bring stored accounts into memory. Runs on the event loop, so an
+        account already used since startup keeps that usage: counters add
+        up and each bucket keeps the lower of the two levels."""
+        now, wall = self.clock(), time.time()
+        count = 0
+        for user_id, model, requests, tokens, prompt_tokens, completion_tokens, cost, calls, saved_at in rows:
+            stamp = now - max(0.0, wall - saved_at)
+            live = (user_id, model) in self.accounts
+            account = self._account(user_id, model)
+            for bucket, level in ((account.requests, requests), (account.tokens, tokens)):
+                stored = TokenBucket(bucket.capacity, bucket.rate, level, stamp)
+                stored._refill(now)
+                bucket._refill(now)
+                bucket.tokens = min(bucket.tokens, stored.tokens)
+            account.prompt_tokens += prompt_tokens
+            account.completion_tokens += completion_tokens
+            account.cost += cost
+            account.calls += calls
+            if live:
+                account.dirty = True
+            elif account.idle(now):
+                # Fully refilled: a fresh account would be the same
+                del self.accounts[(user_id, model)]
+                continue
+            count += 1
+        return count
+
+    def load(self, conn):
+        return self.merge(self.read(conn))
+
+    async def flush(self, db):
+        rows = self.snapshot()
+        if not rows:
+            return 0
+        try:
+            return await db.run(self.write, rows)
+        except BaseException:
+            self.restore(rows)
+            raise
+
+    async def persist_every(self, db, interval=30.0):
+        """Background task: save dirty accounts every interval seconds."""
+        self.merge(await db.run(self.read))
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.flush(db)
+                except Exception as exc:
+                    print(f"⚠️ saving rate limits failed, retrying: {exc}", file=sys.stderr)
+        finally:
+            await self.flush(db)
@@ -0,0 +1,146 @@
+# Dispatch table and request validation compiled from backend_api
+#
+# Every "METHOD /path" key is compiled once at startup. Static paths land in a
+# dict keyed on (method, path); parameterized ones are bucketed by
+# (method, segment count, first segment), so a lookup is a hash probe plus a
+# compare against the one or two patterns left in the bucket.
+from .http import HTTPError
+
+TYPES = {
+    "string": (str,),
+    "array": (list,),
+    "object": (dict,),
+    "number": (int, float),
+    "boolean": (bool,),
+}
+
+
+def _check(value, typename):
+    if isinstance(value, bool) and typename != "boolean":
+        return False
+    return isinstance(value, TYPES.get(typename, (object,)))
+
+
+class Route:
+    __slots__ = ("key", "group", "method", "path", "segments", "spec", "body", "query",
+                 "content_type", "required", "websocket", "handler")
+
+    def __init__(self, key, group, spec):
+        method, path = key.split(" ", 1)
+        self.key = key
+        self.group = group
+        self.method = method.upper()
+        self.path = path
+        self.segments = tuple(path.strip("/").split("/"))
+        self.spec = spec
+        self.websocket = self.method == "WEBSOCKET"
+        self.query = dict(spec.get("query", {}))
+        body = spec.get("body")
+        # A string body declares a media type (multipart uploads) not a schema
+        self.content_type = body if isinstance(body, str) else None
+        self.body = dict(body) if isinstance(body, dict) else {}
+        # Creates need the full declared body; updates may send any subset
+        self.required = tuple(self.body) if self.method == "POST" else ()
+        self.handler = None
+
+    @property
+    def params(self):
+        return tuple(s[1:] for s in self.segments if s.startswith(":"))
+
+    def validate_body(self, request):
+        if self.content_type:
+            if request.content_type != self.content_type:
+                raise HTTPError(415, f"expected {self.content_type}")
+            return None
+        if not self.body:
+            return None
+        body = request.json()
+        if not isinstance(body, dict):
+            raise HTTPError(400, "request body must be a JSON object")
+        errors = {}
+        for name in self.required:
+            if name not in body:
+                errors[name] = "required"
+        for name, value in body.items():
+            typename = self.body.get(name)
+            if typename is None:
+                errors[name] = "unknown field"
+            elif not _check(value, typename):
+                errors[name] = f"expected {typename}"
+        if errors:
+            raise HTTPError(400, "invalid request body", errors)
+        return body
+
+    def parse_query(self, request):
+        query = {}
+        for name, typename in self.query.items():
+            values = request.query.get(name)
+            if not values:
+                continue
+            if typename == "array":
+                query[name] = [v for value in values for v in value.split(",") if v]
+            elif typename == "number":
+                try:
+                    query[name] = float(values[-1])
+                except ValueError:
+                    raise HTTPError(400, "invalid query", {name: "expected number"})
+            else:
+                query[name] = values[-1]
+        return query
+
+
+class Router:
+    def __init__(self, endpoints, prefix=""):
+        self.prefix = prefix.rstrip("/")
+        self.routes = {}
+        self.static = {}
+        self.dynamic = {}
+        self.methods_by_shape = {}
+        for group, specs in endpoints.items():
+            for key, spec in specs.items():
+                self.add(Route(key, group, spec))
+
+    def add(self, route):
+        self.routes[route.key] = route
+        shape = tuple(":" if s.startswith(":") else s for s in route.segments)
+        self.methods_by_shape.setdefault(shape, set()).add(route.method)
+        if not route.params:
+            self.static[(route.method, route.path)] = route
+        else:
+            bucket = (route.method, len(route.segments), route.segments[0])
+            self.dynamic.setdefault(bucket, []).append(route)
+
+    def bind(self, handlers, default):
+        for key, route in self.routes.items():
+            route.handler = handlers.get(key, default)
+
+    def match(self, method, path):
+        """Return (route, params) or raise 404/405."""
+        if self.prefix:
+            if not path.startswith(self.prefix):
+                raise HTTPError(404)
+            path = path[len(self.prefix):] or "/"
+        if len(path) > 1:
+            path = path.rstrip("/")
+
+        route = self.static.get((method, path))
+        if route is not None:
+            return route, {}
+
+        segments = path.strip("/").split("/")
+        for route in self.dynamic.get((method, len(segments), segments[0]), ()):
+            params = {}
+            for pattern, segment in zip(route.segments, segments):
+                if pattern[0] == ":":
+                    params[pattern[1:]] = segment
+                elif pattern != segment:
+                    break
+            else:
+                return route, params
+
+        # Slow path, only taken on a miss: tell 405 apart from 404
+        for shape, methods in self.methods_by_shape.items():
+            if len(shape) == len(segments) and all(p == ":" or p == s for p, s in zip(shape, segments)):
+                allow = sorted(methods)
+                raise HTTPError(405, details={"allow": allow}, headers={"allow": ", ".join(allow)})
+        raise HTTPError(404)
@@ -0,0 +1,277 @@
+# Compile database_schema into SQLite DDL
+#
+# The schema in specdata.py is written in informal strings ("string unique",
+# "foreign key -> users.id", "json array"). This turns it into real tables
+# and adds the indexes the documented queries need: one per foreign key, one
+# per filter in backend_api's GET query strings, and a junction table for
+# json-array columns that are filtered on (documents.tags) so tag lookups are
+# index seeks rather than a json_each() scan over every row.
+import argparse
+import re
+import sqlite3
+import sys
+
+from .spec import get_backend_api, get_schema
+
+SCHEMA_VERSION = 2
+
+# First path segment of a backend_api route -> table it reads and writes
+RESOURCE_TABLES = {
+    "auth": "users",
+    "documents": "documents",
+    "ai": "ai_conversations",
+    "projects": "projects",
+    "assets": "assets",
+    "collaboration": "collaboration_rooms",
+}
+
+# How a query parameter filters its table: (column expression, match), where
+# match is "eq" or "prefix". Parameters not listed are equality on the
+# column of the same name. "search" is a case-insensitive prefix match over
+# the row's display name and asset "type" matches a MIME family ("image").
+FILTER_COLUMNS = {
+    ("documents", "folder"): ("folder_path", "eq"),
+    ("documents", "search"): ("lower(title)", "prefix"),
+    ("assets", "type"): ("mime_type", "prefix"),
+    ("assets", "search"): ("lower(original_name)", "prefix"),
+}
+
+# Every listing is scoped to the signed-in user
+SCOPE_COLUMN = "user_id"
+
+_FK = re.compile(r"foreign key\s*->\s*(\w+)\.(\w+)")
+
+
+class Column:
+    __slots__ = ("table", "name", "spec", "sql_type", "primary_key", "unique",
+                 "optional", "json", "json_array", "references")
+
+    def __init__(self, table, name, spec):
+        self.table = table
+        self.name = name
+        self.spec = spec
+        words = re.sub(r"\(.*?\)", "", spec).split()
+        fk = _FK.search(spec)
+        self.primary_key = spec.startswith("primary key")
+        self.references = fk.groups() if fk else None
+        self.unique = "unique" in words
+        self.optional = "optional" in words
+        self.json = words[:1] == ["json"]
+        self.json_array = spec.startswith("json array")
+        if words[:1] == ["integer"]:
+            self.sql_type = "INTEGER"
+        else:
+            # ids are uuid hex strings; timestamps are ISO-8601 text
+            self.sql_type = "TEXT"
+
+    def ddl(self):
+        parts = [self.name, self.sql_type]
+        if self.primary_key:
+            parts.append("PRIMARY KEY")
+        elif self.references:
+            table, column = self.references
+            parts.append(f"REFERENCES {table}({column})")
+            parts.append("ON DELETE SET NULL" if self.optional else "ON DELETE CASCADE")
+            if not self.optional:
+                parts.append("NOT NULL")
+        elif self.unique:
+            parts.append("NOT NULL UNIQUE")
+        if self.json:
+            parts.append(f"DEFAULT '{'[]' if self.json_array else '{}'}'")
+            parts.append(f"CHECK (json_valid({self.name}))")
+        return " ".join(parts)
+
+
+def columns(schema=None):
+    schema = schema or get_schema()
+    return {table: [Column(table, name, spec) for name, spec in cols.items()]
+            for table, cols in schema.items()}
+
+
+def _index_name(table, cols):
+    names = [re.sub(r"\W+", "_", c).strip("_") for c in cols]
+    return f"idx_{table}_{'_'.join(names)}"
+
+
+def _singular(name):
+    return name[:-1] if name.endswith("s") else name
+
+
+def junction_name(table, column):
+    return f"{_singular(table)}_{column}"
+
+
+def filter_column(table, param):
+    return FILTER_COLUMNS.get((table, param), (param, "eq"))
+
+
+def query_filters(api=None):
+    """(endpoint key, table, {param: type}) for every GET with a query string."""
+    api = api or get_backend_api()
+    for group in api["endpoints"].values():
+        for key, spec in group.items():
+            method, path = key.split(" ", 1)
+            if method == "GET" and "query" in spec:
+                table = RESOURCE_TABLES[path.strip("/").split("/")[0]]
+                yield key, table, spec["query"]
+
+
+def plan(schema=None, api=None):
+    """Work out tables, junction tables and indexes without emitting SQL."""
+    tables = columns(schema)
+    indexes = {}
+    junctions = {}
+    for key, table, query in query_filters(api):
+        by_name = {c.name: c for c in tables[table]}
+        for param, typename in query.items():
+            column = filter_column(table, param)[0]
+            target = by_name.get(column)
+            if typename == "array" and target is not None and target.json_array:
+                junctions[(table, column)] = junction_name(table, column)
+                continue
+            cols = (SCOPE_COLUMN, column) if SCOPE_COLUMN in by_name else (column,)
+            indexes[_index_name(table, cols)] = (table, cols)
+    # A composite index leading with the foreign key already serves it
+    leading = {(table, cols[0]) for table, cols in indexes.values()}
+    for table, cols in tables.items():
+        for column in cols:
+            if column.references and (table, column.name) not in leading:
+                indexes[_index_name(table, (column.name,))] = (table, (column.name,))
+    return tables, junctions, indexes
+
+
+def compile_ddl(schema=None, api=None):
+    """Return the full DDL script for the schema."""
+    tables, junctions, indexes = plan(schema, api)
+    statements = []
+    for table, cols in tables.items():
+        body = ",\n    ".join(c.ddl() for c in cols)
+        statements.append(f"CREATE TABLE IF NOT EXISTS {table} (\n    {body}\n)")
+    for (table, column), junction in junctions.items():
+        item, fk = _singular(column), f"{_singular(table)}_id"
+        statements.append(
+            f"CREATE TABLE IF NOT EXISTS {junction} (\n"
+            f"    {SCOPE_COLUMN} TEXT NOT NULL,\n"
+            f"    {item} TEXT NOT NULL,\n"
+            f"    {fk} TEXT NOT NULL REFERENCES {table}(id) ON DELETE CASCADE,\n"
+            f"    PRIMARY KEY ({SCOPE_COLUMN}, {item}, {fk})\n"
+            f") WITHOUT ROWID")
+        statements.extend(_junction_triggers(table, column, junction))
+        indexes[_index_name(junction, (fk,))] = (junction, (fk,))
+    for name, (table, cols) in indexes.items():
+        statements.append(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(cols)})")
+    return ";\n\n".join(statements) + ";\n"
+
+
+def _junction_triggers(table, column, junction):
+    # Keep the junction table in step with the json array column
+    item, fk = _singular(column), f"{_singular(table)}_id"
+    fill = (f"INSERT OR IGNORE INTO {junction} ({SCOPE_COLUMN}, {item}, {fk}) "
+            f"SELECT NEW.{SCOPE_COLUMN}, value, NEW.id FROM json_each(NEW.{column});")
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {junction}_ai AFTER INSERT ON {table} BEGIN\n    {fill}\nEND",
+        f"CREATE TRIGGER IF NOT EXISTS {junction}_au AFTER UPDATE OF {column}, {SCOPE_COLUMN} ON {table} BEGIN\n"
+        f"    DELETE FROM {junction} WHERE {fk} = OLD.id;\n    {fill}\nEND",
+    ]
+
+
+def configure(conn):
+    """Per-connection pragmas every caller should apply."""
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+
+def migrate(conn, schema=None, api=None):
+    """Create or upgrade the schema in WAL mode; returns the journal mode."""
+    mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+    configure(conn)
+    if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        conn.executescript("BEGIN;\n" + compile_ddl(schema, api) + f"PRAGMA user_version = {SCHEMA_VERSION};\nCOMMIT;")
+    return mode
+
+
+def prefix_range(prefix):
+    """Half-open [lo, hi) bounds matching every string starting with prefix."""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def build_query(endpoint, user_id, query, api=None):
+    """SQL and parameters for a documented listing, e.g. GET /documents."""
+    for key, table, declared in query_filters(api):
+        if key == endpoint:
+            break
+    else:
+        raise KeyError(endpoint)
+    where = [f"{SCOPE_COLUMN} = ?"]
+    params = [user_id]
+    for param in declared:
+        value = query.get(param)
+        if value in (None, "", []):
+            continue
+        column, match = filter_column(table, param)
+        if declared[param] == "array":
+            junction = junction_name(table, column)
+            item, fk = _singular(column), f"{_singular(table)}_id"
+            marks = ", ".join("?" for _ in value)
+            where.append(
+                f"id IN (SELECT {fk} FROM {junction} WHERE {SCOPE_COLUMN} = ? AND {item} IN ({marks}) "
+                f"GROUP BY {fk} HAVING count(*) = {len(set(value))})")
+            params.extend([user_id, *value])
+        elif match == "prefix":
+            lo, hi = prefix_range(value.lower() if column.startswith("lower(") else value)
+            where.append(f"{column} >= ? AND {column} < ?")
+            params.extend([lo, hi])
+        else:
+            where.append(f"{column} = ?")
+            params.append(value)
+    return f"SELECT * FROM {table} WHERE {' AND '.join(where)}", params
+
+
+def documented_queries(api=None):
+    """One representative query per declared filter, for plan checks."""
+    samples = {"string": "a", "array": ["a"], "number": 1}
+    for key, table, declared in query_filters(api):
+        yield key, "(none)", build_query(key, "u", {}, api)
+        for param, typename in declared.items():
+            yield key, param, build_query(key, "u", {param: samples.get(typename, "a")}, api)
+
+
+def check_query_plans(conn, api=None):
+    """EXPLAIN QUERY PLAN each documented query; ok means no full table scan."""
+    results = []
+    for key, param, (sql, params) in documented_queries(api):
+        rows = [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+        ok = not any(r.startswith("SCAN ") and "USING" not in r for r in rows)
+        results.append({"endpoint": key, "filter": param, "sql": sql, "plan": rows, "ok": ok})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile database_schema to SQLite")
+    parser.add_argument("--db", help="migrate this database file (WAL mode)")
+    parser.add_argument("--print", action="store_true", help="print the DDL")
+    parser.add_argument("--check", action="store_true", help="verify documented queries use an index")
+    args = parser.parse_args(argv)
+
+    if args.print or not (args.db or args.check):
+        print(compile_ddl())
+    if not (args.db or args.check):
+        return 0
+
+    conn = sqlite3.connect(args.db or ":memory:", isolation_level=None)
+    mode = migrate(conn)
+    if args.db:
+        print(f"🗄️ {args.db} migrated to schema v{SCHEMA_VERSION} (journal_mode={mode})")
+    if not args.check:
+        return 0
+    failed = 0
+    for result in check_query_plans(conn):
+        failed += not result["ok"]
+        mark = "✅" if result["ok"] else "❌"
+        print(f"{mark} {result['endpoint']} [{result['filter']}]: {' | '.join(result['plan'])}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+# Full-text search over documents for GET /documents?search=
+#
+# An SQLite FTS5 index over title, content and tags with BM25 ranking,
+# prefix matching and highlighted snippets. Handlers feed it incrementally on
+# POST /documents, PUT /documents/:id and DELETE, so a query never touches
+# the rows it does not match. The index is derived data: the server keeps it
+# in memory and rebuilds it from the documents table on startup.
+#
+# Each document's folder and exact tags are kept beside the FTS table, so a
+# search narrowed by ?folder= and ?tags= applies those filters in the same
+# query, before the LIMIT, and never loses matches to it.
+import argparse
+import itertools
+import random
+import re
+import sqlite3
+import sys
+import time
+
+# BM25 column weights: a hit in the title counts for more than one in the body
+WEIGHTS = {"title": 10.0, "content": 1.0, "tags": 5.0, "user_id": 0.0}
+
+_TERM = re.compile(r"[\w']+\*?", re.UNICODE)
+
+
+def to_match(text):
+    """Turn free text into an FTS5 expression: every term must match, and
+    the last one (or any ending in *) matches as a prefix, so results keep
+    up with search-as-you-type."""
+    terms = _TERM.findall(text)
+    parts = []
+    for i, term in enumerate(terms):
+        prefix = term.endswith("*") or i == len(terms) - 1
+        word = term.rstrip("*").replace('"', '""')
+        if word:
+            parts.append(f'"{word}"' + ("*" if prefix else ""))
+    return " AND ".join(parts)
+
+
+class SearchIndex:
+    def __init__(self, path=":memory:"):
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                title, content, tags, user_id,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            );
+            CREATE TABLE IF NOT EXISTS documents_fts_ids (
+                rowid INTEGER PRIMARY KEY,
+                doc_id TEXT NOT NULL UNIQUE,
+                folder_path TEXT NOT NULL DEFAULT '/'
+            );
+            CREATE TABLE IF NOT EXISTS documents_fts_tags (
+                tag TEXT NOT NULL,
+                rowid INTEGER NOT NULL,
+                PRIMARY KEY (tag, rowid)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS documents_fts_tags_rowid ON documents_fts_tags (rowid);
+        """)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(documents_fts_ids)")}
+        if "folder_path" not in columns:
+            # An index file from before folders were kept; rows are rewritten on reindex
+            self.conn.execute("ALTER TABLE documents_fts_ids ADD COLUMN folder_path TEXT NOT NULL DEFAULT '/'")
+        self._rank = "bm25(documents_fts, {})".format(", ".join(str(w) for w in WEIGHTS.values()))
+
+    def _rowid(self, doc_id):
+        row = self.conn.execute("SELECT rowid FROM documents_fts_ids WHERE doc_id = ?", (doc_id,)).fetchone()
+        return row[0] if row else None
+
+    def _write(self, doc):
+        rowid = self._rowid(doc["id"])
+        folder = doc.get("folder_path") or "/"
+        if rowid is None:
+            rowid = self.conn.execute("INSERT INTO documents_fts_ids (doc_id, folder_path) VALUES (?, ?)",
+                                      (doc["id"], folder)).lastrowid
+        else:
+            self.conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (rowid,))
+            self.conn.execute("DELETE FROM documents_fts_tags WHERE rowid = ?", (rowid,))
+            self.conn.execute("UPDATE documents_fts_ids SET folder_path = ? WHERE rowid = ?", (folder, rowid))
+        self.conn.executemany("INSERT OR IGNORE INTO documents_fts_tags (tag, rowid) VALUES (?, ?)",
+                              ((tag, rowid) for tag in doc.get("tags") or ()))
+        self.conn.execute(
+            "INSERT INTO documents_fts (rowid, title, content, tags, user_id) VALUES (?, ?, ?, ?, ?)",
+            (rowid, doc.get("title") or "", doc.get("content") or "", " ".join(doc.get("tags") or ()), doc["user_id"]),
+        )
+
+    def index(self, doc):
+        """Add or replace one document."""
+        self.conn.execute("BEGIN")
+        try:
+            self._write(doc)
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def index_many(self, docs):
+        self.conn.execute("BEGIN")
+        count = 0
+        try:
+            for doc in docs:
+                self._write(doc)
+                count += 1
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return count
+
+    def remove(self, doc_id):
+        rowid = self._rowid(doc_id)
+        if rowid is not None:
+            self.conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (rowid,))
+            self.conn.execute("DELETE FROM documents_fts_tags WHERE rowid = ?", (rowid,))
+            self.conn.execute("DELETE FROM documents_fts_ids WHERE rowid = ?", (rowid,))
+
+    def search(self, user_id, text, limit=50, folder=None, tags=()):
+        """Best matches for one user as [{"id", "score", "title", "snippet"}],
+        only from folder and only documents carrying every one of tags."""
+        match = to_match(text)
+        if not match:
+            return []
+        user = '"' + str(user_id).replace('"', '""') + '"'
+        where = ["documents_fts MATCH ?"]
+        params = [f"user_id : {user} AND {{title content tags}} : ({match})"]
+        if folder is not None:
+            where.append("i.folder_path = ?")
+            params.append(folder)
+        tags = sorted(set(tags))
+        if tags:
+            where.append(f"""i.rowid IN (SELECT rowid FROM documents_fts_tags
+                                         WHERE tag IN ({", ".join("?" for _ in tags)})
+                                         GROUP BY rowid HAVING COUNT(*) = ?)""")
+            params.extend(tags)
+            params.append(len(tags))
+        rows = self.conn.execute(
+            f"""SELECT i.doc_id, {self._rank} AS score,
+                       highlight(documents_fts, 0, '<mark>', '</mark>'),
+                       snippet(documents_fts, 1, '<mark>', '</mark>', '…', 16)
+                FROM documents_fts JOIN documents_fts_ids i ON i.rowid = documents_fts.rowid
+                WHERE {" AND ".join(where)}
+                ORDER BY score LIMIT ?""",
+            (*params, limit),
+        )
+        return [{"id": doc_id, "score": -score, "title": title, "snippet": snippet}
+                for doc_id, score, title, snippet in rows]
+
+    def optimize(self):
+        """Merge FTS segments; worth running after a large bulk load."""
+        self.conn.execute("INSERT INTO documents_fts (documents_fts) VALUES ('optimize')")
+
+
+def _synthetic_docs(count, users=100, seed=1):
+    # Zipf-distributed pseudo-words, roughly the shape of English prose
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ne", "ru", "sa", "te", "vi", "zo", "qua", "pre", "str", "ion", "ex"]
+    vocabulary = sorted({"".join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(30_000)})
+    rng.shuffle(vocabulary)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    for i in range(count):
+        words = rng.choices(vocabulary, cum_weights=cum_weights, k=124)
+        yield {
+            "id": f"doc{i}",
+            "user_id": f"user{i % users}",
+            "title": " ".join(words[:4]),
+            "content": " ".join(words[4:]),
+            "tags": rng.sample(vocabulary[:200], 2),
+        }
+
+
+def benchmark(count, queries=200, path=":memory:"):
+    index = SearchIndex(path)
+    start = time.perf_counter()
+    batch = []
+    for doc in _synthetic_docs(count):
+        batch.append(doc)
+        if len(batch) == 10_000:
+            index.index_many(batch)
+            batch = []
+    index.index_many(batch)
+    index.optimize()
+    load = time.perf_counter() - start
+
+    rng = random.Random(2)
+    samples = [doc["title"].split()[:2] for doc in _synthetic_docs(queries, seed=3)]
+    timings = []
+    for i, words in enumerate(samples):
+        text = f"{words[0]} {words[1][:rng.randint(2, len(words[1]))]}"
+        start = time.perf_counter()
+        index.search(f"user{i % 100}", text, limit=20)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "documents": count,
+        "load_seconds": load,
+        "p50_ms": timings[len(timings) // 2],
+        "p99_ms": timings[int(len(timings) * 0.99) - 1],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Document search index")
+    parser.add_argument("--bench", type=int, metavar="N", help="index N synthetic documents and time queries")
+    parser.add_argument("--db", default=":memory:", help="index file for the benchmark")
+    args = parser.parse_args(argv)
+    if not args.bench:
+        parser.print_help()
+        return 0
+    result = benchmark(args.bench, path=args.db)
+    print(f"🔎 {result['documents']} documents indexed in {result['load_seconds']:.1f}s")
+    print(f"⏱️ query p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
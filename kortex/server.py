@@ -0,0 +1,225 @@
+# Application wiring and entry point: python -m kortex.server
+import argparse
+import asyncio
+import os
+import sys
+import time
+import traceback
+from urllib.parse import urlsplit
+
+from . import config, media, metrics
+from .ai import StubProvider, models
+from .auth import Authenticator, TokenError
+from .blobs import BlobStore
+from .autosave import MAX_PENDING, WINDOW, WriteBehind
+from .cache import ResponseCache
+from .context import ContextEngine
+from .focus import FocusAnalytics
+from .collab import RoomManager
+from .db import Database
+from .graph import GraphService
+from .handlers import HANDLERS, INSPECT_JOB, PUBLIC_GROUPS, document_saved, record_inspection
+from .http import HTTPError, Response, StreamingResponse, Upgrade, start_server
+from .jobs import JobQueue, Worker
+from .markdown import Previews
+from .ratelimit import RateLimiter
+from .routing import Router
+from .search import SearchIndex
+from .spec import get_backend_api
+from .store import MemoryStore, SQLStore
+from .versions import VersionStore
+
+
+async def not_implemented(request, data):
+    raise HTTPError(501, f"{request.method} {request.path} has no handler yet")
+
+
+class App:
+    def __init__(self, env=None, api=None, store=None, db=None, upload_dir="./data/uploads", search_path=":memory:",
+                 cache_path=None, versions_path=":memory:", jobs_path=":memory:", journal_path=None,
+                 revoked_path=":memory:"):
+        self.api = api or get_backend_api()
+        self.settings = config.settings(env)
+        self.router = Router(self.api["endpoints"], urlsplit(self.api["base_url"]).path)
+        self.router.bind(HANDLERS, not_implemented)
+        self.db = db
+        autosave = self.settings.get("autosave", {})
+        self.store = WriteBehind(store or (SQLStore(db) if db else MemoryStore()), journal_path,
+                                 float(autosave.get("window") or WINDOW), int(autosave.get("maxPending") or MAX_PENDING))
+        self.search = SearchIndex(search_path)
+        self.search.index_many(self.store.scan("documents"))
+        self.provider = StubProvider(models(self.settings))
+        self.limiter = RateLimiter(models(self.settings))
+        self.cache = ResponseCache(disk_path=cache_path)
+        self.versions = VersionStore(versions_path)
+        self.graph = GraphService(self.store)
+        self.context = ContextEngine(self.store, self.settings.get("retrieval"))
+        self.focus = FocusAnalytics(self.store)
+        self.previews = Previews()
+        self.rooms = RoomManager(self.store)
+        self.store.subscribe("documents", lambda doc, fields: document_saved(self, doc, fields))
+        self.upload_dir = upload_dir
+        self.blobs = BlobStore(upload_dir)
+        self.blobs.track(asset["metadata"]["sha256"] for asset in self.store.scan("assets"))
+        self.jobs = JobQueue(jobs_path)
+        self.metrics = metrics.REGISTRY
+        self._gauges()
+        self.auth = Authenticator(self.settings.get("auth"), revoked_path=revoked_path)
+
+    def issue_token(self, user):
+        return self.auth.issue(user["id"])["token"]
+
+    async def user_for_token(self, token):
+        try:
+            claims = self.auth.verify(token)
+        except TokenError:
+            return None
+        return await self.store.call("get", "users", claims["sub"])
+
+    async def authenticate(self, request):
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if not token and request.headers.get("upgrade", "").lower() == "websocket":
+            # Browsers cannot set headers on a WebSocket handshake
+            scheme, token = "bearer", (request.query.get("token") or [""])[-1]
+        user = await self.user_for_token(token) if scheme.lower() == "bearer" else None
+        if user is None:
+            raise HTTPError(401, "missing or invalid bearer token")
+        return user
+
+    async def dispatch(self, request):
+        start = time.perf_counter()
+        # Unknown paths share one label so scanners cannot blow up cardinality
+        endpoint = "unmatched"
+        try:
+            method = request.method
+            if request.headers.get("upgrade", "").lower() == "websocket":
+                method = "WEBSOCKET"
+            route, request.params = self.router.match(method, request.path)
+            endpoint = route.key
+            request.app = self
+            if route.group not in PUBLIC_GROUPS:
+                request.user = await self.authenticate(request)
+            data = route.validate_body(request) if method != "GET" else route.parse_query(request)
+            result = await route.handler(request, data)
+            if not isinstance(result, (Response, StreamingResponse, Upgrade)):
+                result = Response(result)
+        except HTTPError as exc:
+            result = Response(exc.payload(), exc.status, exc.headers)
+        except Exception:
+            print(f"❌ {request.method} {request.path} failed", file=sys.stderr)
+            traceback.print_exc()
+            result = Response(HTTPError(500).payload(), 500)
+        metrics.LATENCY.observe(time.perf_counter() - start, endpoint)
+        metrics.REQUESTS.inc(endpoint, getattr(result, "status", 101))
+        return result
+
+    def _gauges(self):
+        registry = self.metrics
+        if self.db is not None:
+            pool = self.db.pool
+            registry.gauge("kortex_db_pool", "Database pool state from ConnectionPool.stats()", ("state",),
+                           lambda: {(k,): v for k, v in pool.stats().items() if isinstance(v, (int, float))})
+        rooms = self.rooms
+        registry.gauge("kortex_rooms", "Open collaboration rooms and their connected members", ("kind",),
+                       lambda: {("rooms",): len(rooms.rooms),
+                                ("members",): sum(len(room.members) for room in rooms.rooms.values())})
+        cache = self.cache
+        registry.gauge("kortex_response_cache", "AI response cache: entries, hits, misses, evictions, expirations",
+                       ("kind",), lambda: {(k,): v for k, v in cache.stats().items()})
+        store = self.store
+        registry.gauge("kortex_write_behind", "Autosave buffer: pending rows, buffered updates, rows written, flushes",
+                       ("kind",), lambda: {(k,): v for k, v in store.stats().items()})
+        jobs = self.jobs
+        registry.gauge("kortex_jobs", "Background jobs by status", ("status",),
+                       lambda: {(status,): count for status, count in jobs.counts().items()})
+
+
+def _profiler(app, output=None):
+    options = app.settings.get("observability", {}).get("profiler", {})
+    if output is None and options.get("enabled") not in (None, False, "", "0", "false"):
+        output = options.get("output")
+    if not output:
+        return None
+    return metrics.SamplingProfiler(interval=float(options.get("interval") or metrics.PROFILE_INTERVAL),
+                                    output=output)
+
+
+async def serve(app, host, port, workers=None, profile=None):
+    server = await start_server(app.dispatch, host, port)
+    print(f"🚀 Kortex reference backend on http://{host}:{port}{app.router.prefix}")
+    worker = Worker(app.jobs, {INSPECT_JOB: media.inspect},
+                    lambda job, result: record_inspection(app, job["key"], result), workers)
+    background = [
+        asyncio.create_task(app.versions.gc_every()),
+        asyncio.create_task(app.blobs.purge_every()),
+        asyncio.create_task(app.cache.purge_every()),
+        asyncio.create_task(worker.run()),
+    ]
+    background.append(asyncio.create_task(app.store.run()))
+    if app.db is not None:
+        background.append(asyncio.create_task(app.limiter.persist_every(app.db)))
+    profiler = _profiler(app, profile)
+    if profiler is not None:
+        profiler.start()
+        background.append(asyncio.create_task(profiler.dump_every()))
+        print(f"🔥 sampling the event loop every {profiler.interval * 1000:g} ms into {profiler.output}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        if profiler is not None:
+            profiler.stop()
+        app.rooms.close()
+        app.store.close()
+        app.auth.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Python reference backend")
+    parser.add_argument("--env", default=None, help="server_config environment (default: KORTEX_ENV or development)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="defaults to server.port from server_config")
+    parser.add_argument("--memory", action="store_true", help="keep rows in memory instead of the configured database")
+    parser.add_argument("--response-cache", metavar="PATH", help="SQLite file backing the AI response cache")
+    parser.add_argument("--versions", metavar="PATH", help="SQLite file for document revisions (default: "
+                        "versions.db next to the configured database; in memory with --memory)")
+    parser.add_argument("--jobs", metavar="PATH", default="./data/jobs.db",
+                        help="SQLite file for the background job queue (default: ./data/jobs.db)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes for asset jobs (default: CPUs)")
+    parser.add_argument("--journal", metavar="PATH", help="autosave journal (default: autosave.journal from "
+                        "server_config; none with --memory)")
+    parser.add_argument("--profile", metavar="PATH", help="sample the event loop and write folded stacks to PATH")
+    args = parser.parse_args(argv)
+
+    db = None
+    versions = args.versions or ":memory:"
+    revoked = ":memory:"
+    if not args.memory:
+        db = Database(args.env)
+        db.migrate()
+        if not db.target.startswith("file:"):
+            # Revisions and revoked tokens belong with the rows they describe
+            directory = os.path.dirname(os.path.abspath(db.target))
+            versions = args.versions or os.path.join(directory, "versions.db")
+            revoked = os.path.join(directory, "revoked-tokens.db")
+    journal = args.journal
+    if journal is None and not args.memory:
+        journal = config.settings(args.env).get("autosave", {}).get("journal")
+    app = App(args.env, db=db, cache_path=args.response_cache, versions_path=versions,
+              jobs_path=args.jobs, journal_path=journal, revoked_path=revoked)
+    port = args.port or int(app.settings["server"]["port"])
+    try:
+        asyncio.run(serve(app, args.host, port, args.workers, args.profile))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if db is not None:
+            db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+# Cached access to the spec dicts and a cross-reference check over them
+#
+# Every spec dict is a literal in specdata.py at the repository root, a
+# module with no side effects that the generator scripts, build.py and
+# packager.py import too. Importing this module does not load it: the first
+# getter call does, and the dicts are cached from then on. Everything in
+# kortex, build.py and packager.py reads the spec through these getters.
+#
+# validate() walks the schema and the routes once and reports references
+# that point nowhere: foreign keys to missing tables or columns, routes
+# mapped to tables that do not exist, and query filters that name no column.
+import importlib
+import sys
+
+_loaded = {}
+
+
+def _source(name):
+    value = _loaded.get(name)
+    if value is None:
+        value = _loaded[name] = getattr(importlib.import_module("specdata"), name)
+    return value
+
+
+def get_backend_api():
+    return _source("backend_api")
+
+
+def get_schema():
+    return _source("database_schema")
+
+
+def get_server_config():
+    return _source("server_config")
+
+
+def get_timeline():
+    return _source("timeline")
+
+
+def get_backend_package():
+    return _source("backend_package")
+
+
+def get_package_json():
+    return _source("package_json")
+
+
+def get_package_structure():
+    return _source("package_structure")
+
+
+def get_zip_contents():
+    return _source("zip_contents")
+
+
+def get_delivery_summary():
+    return _source("delivery_summary")
+
+
+def validate(schema=None, api=None):
+    """Dangling references in the schema and routes, as readable strings."""
+    from .schema import _FK, RESOURCE_TABLES, filter_column
+
+    schema = schema or get_schema()
+    api = api or get_backend_api()
+    problems = []
+    for table, cols in schema.items():
+        for name, spec in cols.items():
+            fk = _FK.search(spec)
+            if fk is None:
+                continue
+            target, column = fk.groups()
+            if target not in schema:
+                problems.append(f"{table}.{name} references missing table {target}")
+            elif column not in schema[target]:
+                problems.append(f"{table}.{name} references missing column {target}.{column}")
+    for resource, table in RESOURCE_TABLES.items():
+        if table not in schema:
+            problems.append(f"/{resource} routes are mapped to missing table {table}")
+    # Groups like constellation, focus and observability are served by their
+    # own handlers rather than a resource table, so unmapped routes are fine
+    # unless they declare query filters, which only resource tables serve
+    for group, endpoints in api["endpoints"].items():
+        for key, spec in endpoints.items():
+            method, path = key.split(" ", 1)
+            table = RESOURCE_TABLES.get(path.strip("/").split("/")[0])
+            if method != "GET" or "query" not in spec:
+                continue
+            if table is None:
+                problems.append(f"{key} ({group}) declares query filters but maps to no table")
+                continue
+            for param, typename in spec["query"].items():
+                column = filter_column(table, param)[0]
+                bare = column[6:-1] if column.startswith("lower(") else column
+                if bare not in schema.get(table, {}):
+                    problems.append(f"{key} filter {param!r} names no column of {table}")
+    return problems
+
+
+def main(argv=None):
+    # Imported here so that importing the getters stays cheap
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check references across database_schema and backend_api")
+    parser.parse_args(argv)
+    problems = validate()
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        return 1
+    endpoints = sum(len(group) for group in get_backend_api()["endpoints"].values())
+    print(f"✅ {len(get_schema())} tables and {endpoints} endpoints reference each other consistently")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
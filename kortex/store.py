@@ -0,0 +1,333 @@
+# Row stores shaped by database_schema
+#
+# MemoryStore keeps everything in dicts for throwaway runs; SQLStore keeps it
+# in the pooled database. Both answer the documented listings through
+# query(), with the same filter semantics as kortex.schema.build_query.
+#
+# Every method is synchronous, for scripts and background work. Request
+# handlers use `await store.call(method, *args)` instead, which SQLStore runs
+# on the database threads so queries never block the event loop.
+import json
+import time
+import uuid
+from contextlib import contextmanager
+
+from . import schema
+from .spec import get_schema
+
+# Rows per page for scan() and per executemany() for bulk inserts
+BATCH_SIZE = 500
+
+
+def now():
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+def new_id():
+    return uuid.uuid4().hex
+
+
+class MemoryStore:
+    """One dict of rows per database_schema table, keyed by id."""
+
+    def __init__(self, schema=None):
+        self.schema = schema or get_schema()
+        self.tables = {name: {} for name in self.schema}
+        self.users_by_email = {}
+
+    def insert(self, table, row):
+        columns = self.schema[table]
+        row = dict(row)
+        row.setdefault("id", new_id())
+        stamp = now()
+        for column in ("created_at", "updated_at"):
+            if column in columns:
+                row.setdefault(column, stamp)
+        if table == "users":
+            if row["email"] in self.users_by_email:
+                raise KeyError(row["email"])
+            self.users_by_email[row["email"]] = row["id"]
+        self.tables[table][row["id"]] = row
+        return row
+
+    async def call(self, method, *args, **kwargs):
+        return getattr(self, method)(*args, **kwargs)
+
+    def get(self, table, row_id):
+        return self.tables[table].get(row_id)
+
+    def get_many(self, table, row_ids):
+        rows = self.tables[table]
+        return [rows[row_id] for row_id in row_ids if row_id in rows]
+
+    def update(self, table, row_id, fields):
+        row = self.tables[table].get(row_id)
+        if row is None:
+            return None
+        row.update(fields)
+        if "updated_at" in self.schema[table]:
+            row["updated_at"] = now()
+        return row
+
+    def delete(self, table, row_id):
+        row = self.tables[table].pop(row_id, None)
+        if row is not None and table == "users":
+            self.users_by_email.pop(row["email"], None)
+        return row
+
+    def select(self, table, **equals):
+        rows = self.tables[table].values()
+        if not equals:
+            return list(rows)
+        return [row for row in rows if all(row.get(k) == v for k, v in equals.items())]
+
+    def scan(self, table, batch_size=BATCH_SIZE, **equals):
+        """Yield matching rows one at a time, in id order."""
+        for row_id in sorted(self.tables[table]):
+            row = self.tables[table].get(row_id)
+            if row is not None and all(row.get(k) == v for k, v in equals.items()):
+                yield row
+
+    @contextmanager
+    def bulk(self):
+        """Write many rows all-or-nothing; see MemoryBulk."""
+        writer = MemoryBulk(self)
+        try:
+            yield writer
+        except BaseException:
+            for table, row_id, previous in reversed(writer.updated):
+                row = self.tables[table].get(row_id)
+                if row is not None:
+                    row.clear()
+                    row.update(previous)
+            for table, row_id in reversed(writer.inserted):
+                self.delete(table, row_id)
+            raise
+
+    def user_by_email(self, email):
+        row_id = self.users_by_email.get(email)
+        return self.tables["users"].get(row_id) if row_id else None
+
+    def query(self, endpoint, user_id, filters):
+        """Rows for a documented listing such as GET /documents."""
+        table, declared = _declared(endpoint)
+        rows = self.select(table, **{schema.SCOPE_COLUMN: user_id})
+        for param, typename in declared.items():
+            value = filters.get(param)
+            if value in (None, "", []):
+                continue
+            expr, match = schema.filter_column(table, param)
+            column = expr[len("lower("):-1] if expr.startswith("lower(") else expr
+            if typename == "array":
+                wanted = set(value)
+                rows = [r for r in rows if wanted.issubset(r.get(column) or ())]
+            elif match == "prefix" and expr != column:
+                rows = [r for r in rows if (r.get(column) or "").lower().startswith(value.lower())]
+            elif match == "prefix":
+                rows = [r for r in rows if (r.get(column) or "").startswith(value)]
+            else:
+                rows = [r for r in rows if r.get(column) == value]
+        return rows
+
+
+class MemoryBulk:
+    """Writes for MemoryStore.bulk(): inserted rows whose id exists are
+    skipped, and updated rows are restored if the block fails."""
+
+    def __init__(self, store):
+        self.store = store
+        self.inserted = []
+        self.updated = []
+
+    def insert_many(self, table, rows):
+        columns = self.store.schema[table]
+        count = 0
+        for row in rows:
+            if row["id"] in self.store.tables[table]:
+                continue
+            self.store.insert(table, {k: v for k, v in row.items() if k in columns})
+            self.inserted.append((table, row["id"]))
+            count += 1
+        return count
+
+    def update_many(self, table, updates):
+        """(row id, fields) pairs, written as given (updated_at included)."""
+        count = 0
+        for row_id, fields in updates:
+            row = self.store.tables[table].get(row_id)
+            if row is None:
+                continue
+            self.updated.append((table, row_id, dict(row)))
+            row.update(fields)
+            count += 1
+        return count
+
+
+def _declared(endpoint):
+    for key, table, declared in schema.query_filters():
+        if key == endpoint:
+            return table, declared
+    raise KeyError(endpoint)
+
+
+class SQLStore:
+    """The same interface as MemoryStore, backed by a kortex.db.Database."""
+
+    def __init__(self, db, schema_dict=None):
+        self.db = db
+        self.schema = schema_dict or get_schema()
+        self.columns = schema.columns(self.schema)
+        self._json = {t: {c.name for c in cols if c.json} for t, cols in self.columns.items()}
+
+    def _encode(self, table, row):
+        json_cols = self._json[table]
+        return {k: json.dumps(v) if k in json_cols else v for k, v in row.items()}
+
+    def _decode(self, table, cursor, record):
+        if record is None:
+            return None
+        json_cols = self._json[table]
+        row = {}
+        for (name, *_), value in zip(cursor.description, record):
+            row[name] = json.loads(value) if name in json_cols and value is not None else value
+        return row
+
+    def _fetch(self, table, sql, params, one=False):
+        with self.db.pool.connection() as conn:
+            cursor = conn.execute(sql, params)
+            if one:
+                return self._decode(table, cursor, cursor.fetchone())
+            return [self._decode(table, cursor, r) for r in cursor.fetchall()]
+
+    def insert(self, table, row):
+        columns = self.schema[table]
+        row = dict(row)
+        row.setdefault("id", new_id())
+        stamp = now()
+        for column in ("created_at", "updated_at"):
+            if column in columns:
+                row.setdefault(column, stamp)
+        encoded = self._encode(table, row)
+        names = ", ".join(encoded)
+        marks = ", ".join("?" for _ in encoded)
+        try:
+            self.db.execute(f"INSERT INTO {table} ({names}) VALUES ({marks})", tuple(encoded.values()))
+        except Exception as exc:
+            if "UNIQUE" in str(exc) and table == "users":
+                raise KeyError(row.get("email"))
+            raise
+        return row
+
+    async def call(self, method, *args, **kwargs):
+        return await self.db.offload(getattr(self, method), *args, **kwargs)
+
+    def get(self, table, row_id):
+        return self._fetch(table, f"SELECT * FROM {table} WHERE id = ?", (row_id,), one=True)
+
+    def get_many(self, table, row_ids):
+        """Rows for row_ids that exist, in the order given."""
+        row_ids = list(row_ids)
+        found = {}
+        for start in range(0, len(row_ids), BATCH_SIZE):
+            batch = row_ids[start:start + BATCH_SIZE]
+            marks = ", ".join("?" for _ in batch)
+            for row in self._fetch(table, f"SELECT * FROM {table} WHERE id IN ({marks})", tuple(batch)):
+                found[row["id"]] = row
+        return [found[row_id] for row_id in row_ids if row_id in found]
+
+    def update(self, table, row_id, fields):
+        fields = dict(fields)
+        if "updated_at" in self.schema[table]:
+            fields["updated_at"] = now()
+        encoded = self._encode(table, fields)
+        assignments = ", ".join(f"{name} = ?" for name in encoded)
+        if not self.db.execute(f"UPDATE {table} SET {assignments} WHERE id = ?", (*encoded.values(), row_id)):
+            return None
+        return self.get(table, row_id)
+
+    def delete(self, table, row_id):
+        row = self.get(table, row_id)
+        if row is not None:
+            self.db.execute(f"DELETE FROM {table} WHERE id = ?", (row_id,))
+        return row
+
+    def select(self, table, **equals):
+        where = " AND ".join(f"{name} = ?" for name in equals)
+        sql = f"SELECT * FROM {table}" + (f" WHERE {where}" if where else "")
+        return self._fetch(table, sql, tuple(equals.values()))
+
+    def scan(self, table, batch_size=BATCH_SIZE, **equals):
+        """Yield matching rows in id order, fetching batch_size at a time
+        (keyset pagination), so exporting a table never holds all of it."""
+        where = "".join(f"{name} = ? AND " for name in equals)
+        sql = f"SELECT * FROM {table} WHERE {where}id > ? ORDER BY id LIMIT ?"
+        last = ""
+        while True:
+            rows = self._fetch(table, sql, (*equals.values(), last, batch_size))
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            last = rows[-1]["id"]
+
+    @contextmanager
+    def bulk(self):
+        """One transaction on one pooled connection for many writes."""
+        with self.db.transaction() as conn:
+            yield SQLBulk(self, conn)
+
+    def user_by_email(self, email):
+        return self._fetch("users", "SELECT * FROM users WHERE email = ?", (email,), one=True)
+
+    def query(self, endpoint, user_id, filters):
+        table, _ = _declared(endpoint)
+        sql, params = schema.build_query(endpoint, user_id, filters)
+        return self._fetch(table, sql, params)
+
+
+class SQLBulk:
+    """Writes for SQLStore.bulk(): executemany in batches, skipping inserted
+    rows whose id already exists."""
+
+    def __init__(self, store, conn):
+        self.store = store
+        self.conn = conn
+
+    def insert_many(self, table, rows):
+        # Column names come from the schema, never from the rows themselves
+        columns = list(self.store.schema[table])
+        json_cols = self.store._json[table]
+        names = ", ".join(columns)
+        marks = ", ".join("?" for _ in columns)
+        sql = f"INSERT INTO {table} ({names}) VALUES ({marks}) ON CONFLICT (id) DO NOTHING"
+        stamp = now()
+        count = 0
+        batch = []
+        for row in rows:
+            values = []
+            for name in columns:
+                value = row.get(name)
+                if value is None and name in ("created_at", "updated_at"):
+                    value = stamp
+                values.append(json.dumps(value) if name in json_cols and value is not None else value)
+            batch.append(tuple(values))
+            if len(batch) >= BATCH_SIZE:
+                count += self.conn.executemany(sql, batch).rowcount
+                batch = []
+        if batch:
+            count += self.conn.executemany(sql, batch).rowcount
+        return count
+
+    def update_many(self, table, updates):
+        """(row id, fields) pairs; rows setting the same columns share one
+        executemany."""
+        groups = {}
+        for row_id, fields in updates:
+            encoded = self.store._encode(table, fields)
+            groups.setdefault(tuple(encoded), []).append((*encoded.values(), row_id))
+        count = 0
+        for names, rows in groups.items():
+            assignments = ", ".join(f"{name} = ?" for name in names)
+            sql = f"UPDATE {table} SET {assignments} WHERE id = ?"
+            for start in range(0, len(rows), BATCH_SIZE):
+                count += self.conn.executemany(sql, rows[start:start + BATCH_SIZE]).rowcount
+        return count
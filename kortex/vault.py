@@ -0,0 +1,337 @@
+# Knowledge vault export and import: JSON lines plus blobs in one tar stream
+#
+# An archive is written and read strictly front to back, so it can be piped
+# between machines (export | ssh | import) and never has to fit in memory:
+#
+#   manifest.json                format, version and where it came from
+#   blobs/<sha256>               each distinct asset file, once
+#   documents.jsonl, projects.jsonl, ai_conversations.jsonl, assets.jsonl
+#
+# Export pages through each table with store.scan() and spools one table
+# at a time to a temporary file (tar needs a member's size up front). Import
+# hands blob bytes to a pool of writer threads as they come off the stream,
+# so hashing and disk writes overlap with reading, then inserts the rows in
+# batches inside a single transaction: a failed import leaves no rows and
+# removes the blobs it added.
+import argparse
+import hashlib
+import io
+import json
+import os
+import queue
+import random
+import re
+import secrets
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .blobs import IO_WORKERS, READ_SIZE, BlobStore
+from .db import Database
+from .graph import URL_LINK
+from .store import SQLStore, now
+
+FORMAT = "kortex-vault"
+VERSION = 1
+
+# Row tables in archive order; documents come before the conversations
+# that refer to them
+TABLES = ("documents", "projects", "ai_conversations", "assets", "focus_sessions")
+
+# A table's JSON lines stay in memory up to this size, then spill to disk
+SPOOL_SIZE = 8 * 1024 * 1024
+
+# Chunks buffered per blob between the reader and its writer thread
+PIPE_CHUNKS = 8
+
+_DIGEST = re.compile(r"[0-9a-f]{64}")
+
+
+class ArchiveError(ValueError):
+    pass
+
+
+def _digest(asset):
+    digest = os.path.basename(asset.get("filename") or "")
+    return digest if _DIGEST.fullmatch(digest) else None
+
+
+def _add_file(tar, name, fileobj, size):
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = int(time.time())
+    tar.addfile(info, fileobj)
+
+
+def export_vault(store, blobs, user, out, compress=False):
+    """Write user's documents, projects, conversations, assets and asset
+    files to the binary stream out. Returns counts per table, plus blobs
+    written and blobs missing from disk."""
+    counts = {"blobs": 0, "missing_blobs": 0}
+    manifest = {"format": FORMAT, "version": VERSION, "exported_at": now(), "tables": list(TABLES),
+                "user": {"id": user["id"], "email": user["email"], "name": user.get("name")}}
+    with tarfile.open(fileobj=out, mode="w|gz" if compress else "w|") as tar:
+        data = json.dumps(manifest, indent=2).encode("utf-8")
+        _add_file(tar, "manifest.json", io.BytesIO(data), len(data))
+
+        seen = set()
+        for asset in store.scan("assets", user_id=user["id"]):
+            digest = _digest(asset)
+            if digest is None or digest in seen:
+                continue
+            seen.add(digest)
+            path = blobs.path(BlobStore.filename(digest))
+            try:
+                with open(path, "rb") as f:
+                    _add_file(tar, f"blobs/{digest}", f, os.fstat(f.fileno()).st_size)
+                counts["blobs"] += 1
+            except FileNotFoundError:
+                counts["missing_blobs"] += 1
+
+        for table in TABLES:
+            with tempfile.SpooledTemporaryFile(SPOOL_SIZE) as spool:
+                rows = 0
+                for row in store.scan(table, user_id=user["id"]):
+                    spool.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+                    spool.write(b"\n")
+                    rows += 1
+                size = spool.tell()
+                spool.seek(0)
+                _add_file(tar, f"{table}.jsonl", spool, size)
+            counts[table] = rows
+    return counts
+
+
+class _Pipe:
+    """Chunks of one blob, from the archive reader to a writer thread."""
+
+    def __init__(self):
+        self.queue = queue.Queue(PIPE_CHUNKS)
+        self.closed = False
+
+    def __iter__(self):
+        while True:
+            chunk = self.queue.get()
+            if chunk is None:
+                self.closed = True
+                return
+            yield chunk
+
+    def drain(self):
+        # A writer that failed keeps consuming so the reader never blocks
+        while not self.closed:
+            if self.queue.get() is None:
+                self.closed = True
+
+
+def _write_blob(blobs, pipe, digest):
+    try:
+        return blobs.ingest(pipe, digest)
+    except ValueError:
+        raise ArchiveError(f"blob {digest} does not match its hash")
+    finally:
+        pipe.drain()
+
+
+def _remapper(enabled):
+    # Fresh ids derived from the old ones with a per-import salt: every
+    # reference to an id maps the same way without keeping a lookup table
+    if not enabled:
+        return lambda row_id: row_id
+    salt = secrets.token_bytes(16)
+    return lambda row_id: hashlib.blake2b(row_id.encode("utf-8"), digest_size=16, key=salt).hexdigest()
+
+
+def _rows(fileobj, table, user_id, remap, counter):
+    for line in fileobj:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            raise ArchiveError(f"{table}.jsonl has a line that is not JSON")
+        if not isinstance(row, dict) or not isinstance(row.get("id"), str):
+            raise ArchiveError(f"{table}.jsonl has a row without an id")
+        row["user_id"] = user_id
+        row["id"] = remap(row["id"])
+        if table == "documents" and isinstance(row.get("content"), str):
+            row["content"] = URL_LINK.sub(lambda m: f"/documents/{remap(m.group(1))}", row["content"])
+        elif table == "ai_conversations" and row.get("document_id"):
+            row["document_id"] = remap(row["document_id"])
+        counter[table] = counter.get(table, 0) + 1
+        yield row
+
+
+def import_vault(store, blobs, user, source, remap=False, workers=IO_WORKERS):
+    """Read an archive from the binary stream source into user's vault.
+    Rows whose id already exists are skipped unless remap gives every row a
+    new id. Returns counts of rows read and inserted per table and blobs
+    written."""
+    remap = _remapper(remap)
+    read = {}
+    counts = {"blobs": 0, "existing_blobs": 0}
+    slots = threading.BoundedSemaphore(workers * 2)
+    futures = []
+    ok = False
+    try:
+        with tarfile.open(fileobj=source, mode="r|*") as tar, ThreadPoolExecutor(workers, "vault") as pool:
+            members = iter(tar)
+            member = next(members, None)
+            if member is None or member.name != "manifest.json":
+                raise ArchiveError("not a vault archive: manifest.json must come first")
+            manifest = json.load(tar.extractfile(member))
+            if manifest.get("format") != FORMAT or manifest.get("version") != VERSION:
+                raise ArchiveError(f"unsupported archive {manifest.get('format')} v{manifest.get('version')}")
+
+            member = next(members, None)
+            while member is not None and member.name.startswith("blobs/"):
+                digest = member.name[len("blobs/"):]
+                if not _DIGEST.fullmatch(digest) or not member.isfile():
+                    raise ArchiveError(f"unexpected archive member {member.name}")
+                slots.acquire()
+                pipe = _Pipe()
+                future = pool.submit(_write_blob, blobs, pipe, digest)
+                future.add_done_callback(lambda _: slots.release())
+                futures.append(future)
+                try:
+                    f = tar.extractfile(member)
+                    while True:
+                        chunk = f.read(READ_SIZE)
+                        if not chunk:
+                            break
+                        pipe.queue.put(chunk)
+                finally:
+                    pipe.queue.put(None)
+                member = next(members, None)
+            for future in futures:
+                counts["blobs" if future.result()[1] else "existing_blobs"] += 1
+
+            tables = list(TABLES)
+            with store.bulk() as bulk:
+                while member is not None:
+                    table = member.name[:-len(".jsonl")] if member.name.endswith(".jsonl") else None
+                    if table not in tables:
+                        raise ArchiveError(f"unexpected archive member {member.name}")
+                    # Later tables may refer to earlier ones, never the reverse
+                    del tables[:tables.index(table) + 1]
+                    counts[table] = bulk.insert_many(table, _rows(tar.extractfile(member), table, user["id"],
+                                                                  remap, read))
+                    member = next(members, None)
+            ok = True
+    finally:
+        # The pool has shut down, so every writer has finished by now
+        if not ok:
+            for future in futures:
+                if not future.exception() and future.result()[1]:
+                    blobs.discard(future.result()[0])
+    counts["read"] = read
+    return counts
+
+
+def _synthetic_vault(store, blobs, user, documents, assets, blob_size):
+    rng = random.Random(4)
+    words = ["orbit", "ember", "quill", "harbor", "lantern", "drift", "signal", "marrow"]
+    with store.bulk() as bulk:
+        bulk.insert_many("documents", ({
+            "id": f"{i:032x}", "user_id": user["id"], "title": f"Note {i}",
+            "content": " ".join(rng.choices(words, k=300)), "type": "markdown", "folder_path": "/",
+            "tags": rng.sample(words, 2), "metadata": {},
+        } for i in range(documents)))
+        rows = []
+        for i in range(assets):
+            digest, _ = blobs.ingest([rng.randbytes(blob_size)])
+            rows.append({"id": f"a{i:031x}", "user_id": user["id"], "filename": BlobStore.filename(digest),
+                         "original_name": f"file{i}.bin", "mime_type": "application/octet-stream",
+                         "size": blob_size, "url": f"/uploads/{BlobStore.filename(digest)}", "folder_path": "/",
+                         "metadata": {"sha256": digest}})
+        bulk.insert_many("assets", rows)
+
+
+def benchmark(documents, assets, blob_size):
+    with tempfile.TemporaryDirectory() as root:
+        stores = []
+        for name in ("source", "target"):
+            db = Database("development", connection=os.path.join(root, f"{name}.db"))
+            db.migrate()
+            store = SQLStore(db)
+            user = store.insert("users", {"email": f"{name}@example.com", "password": "x", "name": name,
+                                          "preferences": {}})
+            stores.append((db, store, BlobStore(os.path.join(root, name)), user))
+        (src_db, source, source_blobs, src_user), (dst_db, target, target_blobs, dst_user) = stores
+        _synthetic_vault(source, source_blobs, src_user, documents, assets, blob_size)
+        archive = os.path.join(root, "vault.tar")
+
+        start = time.perf_counter()
+        with open(archive, "wb") as out:
+            exported = export_vault(source, source_blobs, src_user, out)
+        export_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        with open(archive, "rb") as f:
+            imported = import_vault(target, target_blobs, dst_user, f)
+        import_seconds = time.perf_counter() - start
+        size = os.path.getsize(archive)
+        src_db.close()
+        dst_db.close()
+    return {"archive_bytes": size, "export_seconds": export_seconds, "import_seconds": import_seconds,
+            "exported": exported, "imported": imported}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or import a user's knowledge vault")
+    parser.add_argument("--export", metavar="ARCHIVE", help="write the vault to ARCHIVE ('-' for stdout)")
+    parser.add_argument("--import", dest="import_", metavar="ARCHIVE", help="read ARCHIVE ('-' for stdin)")
+    parser.add_argument("--user", metavar="EMAIL", help="whose vault to export, or who receives the import")
+    parser.add_argument("--env", default=None, help="server_config environment (default: KORTEX_ENV or development)")
+    parser.add_argument("--uploads", default="./data/uploads", help="upload directory holding the blobs")
+    parser.add_argument("--gzip", action="store_true", help="compress the exported archive")
+    parser.add_argument("--remap", action="store_true", help="give imported rows new ids instead of skipping "
+                                                             "ones that already exist")
+    parser.add_argument("--bench", type=int, metavar="N", help="export and import N synthetic documents")
+    parser.add_argument("--assets", type=int, default=200, help="assets in the benchmark vault")
+    parser.add_argument("--blob-size", type=int, default=256 * 1024, help="bytes per benchmark asset")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        result = benchmark(args.bench, args.assets, args.blob_size)
+        print(f"📦 {result['archive_bytes'] / 1e6:,.1f} MB archive: {result['exported']['documents']} documents, "
+              f"{result['exported']['blobs']} blobs")
+        print(f"⬆️ export {result['export_seconds']:.2f}s, ⬇️ import {result['import_seconds']:.2f}s "
+              f"({result['archive_bytes'] / 1e6 / result['import_seconds']:,.0f} MB/s)")
+        return 0
+    if not (args.export or args.import_) or not args.user:
+        parser.print_help()
+        return 0
+
+    db = Database(args.env)
+    try:
+        db.migrate()
+        store = SQLStore(db)
+        user = store.user_by_email(args.user)
+        if user is None:
+            print(f"❌ no user {args.user}", file=sys.stderr)
+            return 1
+        blobs = BlobStore(args.uploads)
+        if args.export:
+            out = sys.stdout.buffer if args.export == "-" else open(args.export, "wb")
+            with out:
+                counts = export_vault(store, blobs, user, out, args.gzip)
+            print(f"📦 exported {counts}", file=sys.stderr)
+        else:
+            source = sys.stdin.buffer if args.import_ == "-" else open(args.import_, "rb")
+            try:
+                with source:
+                    counts = import_vault(store, blobs, user, source, args.remap)
+            except ArchiveError as exc:
+                print(f"❌ {exc}", file=sys.stderr)
+                return 1
+            print(f"📥 imported {counts}", file=sys.stderr)
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
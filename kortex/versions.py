@@ -0,0 +1,300 @@
+# Document revision history stored as deltas
+#
+# Each revision is saved as a compact diff instead of another full copy of
+# the text. Revisions are grouped in segments of CHECKPOINT_EVERY that open
+# with a full checkpoint; inside a segment, revision offset i is diffed
+# against offset i & (i - 1) (skip-deltas), so rebuilding any revision
+# applies at most log2(CHECKPOINT_EVERY) deltas to its checkpoint, and each
+# delta still only has to describe a few revisions' worth of edits.
+#
+# A delta is a JSON list of [start, length] copies from the base text and
+# string inserts, zlib-compressed. Most autosaves touch one spot, so the
+# common prefix and suffix are trimmed before anything is diffed.
+import argparse
+import asyncio
+import difflib
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+import zlib
+from collections import OrderedDict
+
+from .store import now
+
+CHECKPOINT_EVERY = 64
+
+# Revisions kept per document by gc(); older segments are thinned to their
+# checkpoint
+KEEP_REVISIONS = 256
+
+# Below this many changed characters the middle is stored as one insert
+# rather than diffed line by line
+LINE_DIFF_THRESHOLD = 2048
+
+# Latest (revision, text) per document kept in memory, for cheap commits
+LATEST_CACHE_SIZE = 128
+
+
+def _common_prefix(a, b):
+    # Binary search with slice compares: O(n log n) but all of it in C
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a, b, limit):
+    lo, hi = 0, min(len(a), len(b)) - limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:] == b[len(b) - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def diff(old, new):
+    """Ops that rebuild new from old: [start, length] copies and str inserts."""
+    prefix = _common_prefix(old, new)
+    suffix = _common_suffix(old, new, prefix)
+    ops = []
+
+    def copy(start, length):
+        if not length:
+            return
+        if ops and isinstance(ops[-1], list) and ops[-1][0] + ops[-1][1] == start:
+            ops[-1][1] += length
+        else:
+            ops.append([start, length])
+
+    def insert(text):
+        if not text:
+            return
+        if ops and isinstance(ops[-1], str):
+            ops[-1] += text
+        else:
+            ops.append(text)
+
+    copy(0, prefix)
+    old_mid = old[prefix:len(old) - suffix]
+    new_mid = new[prefix:len(new) - suffix]
+    if len(old_mid) + len(new_mid) <= LINE_DIFF_THRESHOLD or not old_mid:
+        insert(new_mid)
+    else:
+        a = old_mid.splitlines(keepends=True)
+        b = new_mid.splitlines(keepends=True)
+        offsets = [prefix]
+        for line in a:
+            offsets.append(offsets[-1] + len(line))
+        for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+            if tag == "equal":
+                copy(offsets[i1], offsets[i2] - offsets[i1])
+            else:
+                insert("".join(b[j1:j2]))
+    copy(len(old) - suffix, suffix)
+    return ops
+
+
+def patch(old, ops):
+    return "".join(old[op[0]:op[0] + op[1]] if isinstance(op, list) else op for op in ops)
+
+
+def base_of(revision):
+    """The revision a delta is taken against, or None for a checkpoint."""
+    offset = (revision - 1) % CHECKPOINT_EVERY
+    if offset == 0:
+        return None
+    return revision - offset + (offset & (offset - 1))
+
+
+def chain(revision):
+    """Revisions to apply, checkpoint first, to rebuild revision."""
+    revisions = [revision]
+    while base_of(revisions[-1]) is not None:
+        revisions.append(base_of(revisions[-1]))
+    return revisions[::-1]
+
+
+class RevisionMissing(KeyError):
+    pass
+
+
+class VersionStore:
+    def __init__(self, path=":memory:"):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS document_versions (
+            document_id TEXT NOT NULL,
+            revision INTEGER NOT NULL,
+            checkpoint INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            length INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (document_id, revision)
+        ) WITHOUT ROWID""")
+        self.latest = OrderedDict()
+
+    def _latest(self, document_id):
+        cached = self.latest.get(document_id)
+        if cached is not None:
+            self.latest.move_to_end(document_id)
+            return cached
+        row = self.conn.execute("SELECT MAX(revision) FROM document_versions WHERE document_id = ?",
+                                (document_id,)).fetchone()
+        if row[0] is None:
+            return 0, None
+        return self._remember(document_id, row[0], self.text(document_id, row[0]))
+
+    def _remember(self, document_id, revision, text):
+        self.latest[document_id] = (revision, text)
+        self.latest.move_to_end(document_id)
+        while len(self.latest) > LATEST_CACHE_SIZE:
+            self.latest.popitem(last=False)
+        return revision, text
+
+    def commit(self, document_id, text):
+        """Record text as the next revision; returns its number, or the
+        current one if the text did not change."""
+        latest, previous = self._latest(document_id)
+        if previous == text:
+            return latest
+        revision = latest + 1
+        base = base_of(revision)
+        if base is None:
+            data = zlib.compress(text.encode("utf-8"))
+        else:
+            base_text = previous if base == latest else self.text(document_id, base)
+            ops = diff(base_text, text)
+            data = zlib.compress(json.dumps(ops, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+        self.conn.execute("INSERT INTO document_versions VALUES (?, ?, ?, ?, ?, ?)",
+                          (document_id, revision, base is None, data, len(text), now()))
+        self._remember(document_id, revision, text)
+        return revision
+
+    def text(self, document_id, revision):
+        cached = self.latest.get(document_id)
+        if cached is not None and cached[0] == revision:
+            return cached[1]
+        revisions = chain(revision)
+        marks = ", ".join("?" * len(revisions))
+        rows = dict(self.conn.execute(
+            f"SELECT revision, data FROM document_versions WHERE document_id = ? AND revision IN ({marks})",
+            (document_id, *revisions)).fetchall())
+        if len(rows) != len(revisions):
+            raise RevisionMissing(revision)
+        text = zlib.decompress(rows[revisions[0]]).decode("utf-8")
+        for rev in revisions[1:]:
+            text = patch(text, json.loads(zlib.decompress(rows[rev])))
+        return text
+
+    def history(self, document_id):
+        return [
+            {"revision": rev, "checkpoint": bool(checkpoint), "length": length, "stored": stored,
+             "created_at": created_at}
+            for rev, checkpoint, length, stored, created_at in self.conn.execute(
+                "SELECT revision, checkpoint, length, LENGTH(data), created_at FROM document_versions "
+                "WHERE document_id = ? ORDER BY revision DESC", (document_id,))
+        ]
+
+    def delete(self, document_id):
+        self.latest.pop(document_id, None)
+        self.conn.execute("DELETE FROM document_versions WHERE document_id = ?", (document_id,))
+
+    def gc(self, document_id=None, keep=KEEP_REVISIONS):
+        """Thin history older than the newest `keep` revisions down to one
+        checkpoint per segment. Deltas only ever point back into their own
+        segment, so dropping a whole segment's deltas never breaks a newer
+        revision. Returns how many revisions were removed."""
+        if document_id is None:
+            ids = [r[0] for r in self.conn.execute("SELECT DISTINCT document_id FROM document_versions")]
+        else:
+            ids = [document_id]
+        removed = 0
+        for doc_id in ids:
+            latest = self._latest(doc_id)[0]
+            oldest_kept = latest - keep + 1
+            if oldest_kept <= 1:
+                continue
+            # First revision of the segment holding the oldest kept one
+            cutoff = oldest_kept - (oldest_kept - 1) % CHECKPOINT_EVERY
+            removed += self.conn.execute(
+                "DELETE FROM document_versions WHERE document_id = ? AND revision < ? AND checkpoint = 0",
+                (doc_id, cutoff)).rowcount
+        return removed
+
+    async def gc_every(self, interval=3600.0, keep=KEEP_REVISIONS):
+        """Background task: thin old history every interval seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            self.gc(keep=keep)
+
+
+def benchmark(revisions, size=200_000, path=":memory:"):
+    """Autosave a synthetic manuscript revisions times with small edits."""
+    rng = random.Random(5)
+    words = ["the", "quiet", "ship", "drifted", "past", "a", "lantern", "of", "stars", "and", "she", "wrote"]
+    text = "".join(" ".join(rng.choice(words) for _ in range(12)) + ".\n" for _ in range(size // 60))
+    store = VersionStore(path)
+    full = 0
+    start = time.perf_counter()
+    for _ in range(revisions):
+        at = rng.randrange(len(text))
+        if rng.random() < 0.8:
+            text = text[:at] + " " + rng.choice(words) + text[at:]
+        else:
+            text = text[:at] + text[at + rng.randint(1, 40):]
+        store.commit("doc", text)
+        full += len(text.encode("utf-8"))
+    commit_seconds = time.perf_counter() - start
+    stored = store.conn.execute("SELECT SUM(LENGTH(data)) FROM document_versions").fetchone()[0]
+
+    store.latest.clear()
+    timings = []
+    for _ in range(200):
+        revision = rng.randint(1, revisions)
+        start = time.perf_counter()
+        store.text("doc", revision)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "revisions": revisions,
+        "characters": len(text),
+        "full_bytes": full,
+        "stored_bytes": stored,
+        "commit_ms": commit_seconds * 1000 / revisions,
+        "p50_ms": timings[len(timings) // 2],
+        "p99_ms": timings[int(len(timings) * 0.99) - 1],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Document revision store")
+    parser.add_argument("--bench", type=int, metavar="N", help="autosave a synthetic manuscript N times")
+    parser.add_argument("--size", type=int, default=200_000, help="manuscript size in characters")
+    parser.add_argument("--db", default=":memory:", help="revision file for the benchmark")
+    args = parser.parse_args(argv)
+    if not args.bench:
+        parser.print_help()
+        return 0
+    result = benchmark(args.bench, args.size, args.db)
+    print(f"📝 {result['revisions']} revisions of a {result['characters']:,}-character manuscript, "
+          f"{result['commit_ms']:.2f} ms per commit")
+    print(f"💾 {result['stored_bytes']:,} bytes stored vs {result['full_bytes']:,} as full copies "
+          f"({result['full_bytes'] / result['stored_bytes']:.0f}x smaller)")
+    print(f"⏱️ rebuild p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
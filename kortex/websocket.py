@@ -0,0 +1,196 @@
+# WebSocket (RFC 6455) framing for the collaboration socket
+#
+# The opening handshake, reading frames and writing them, with a small client
+# for load tests. Frames are encoded once up front and sockets only ever
+# write bytes, so a broadcast costs one serialization however many members
+# receive it.
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import struct
+
+from .http import HTTPError, Upgrade
+
+GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+MAX_MESSAGE_SIZE = 4 * 1024 * 1024
+
+# Unsent bytes a peer may fall behind by before it is dropped
+MAX_BUFFERED = 1024 * 1024
+
+
+class ProtocolError(ValueError):
+    """A peer broke the protocol; the socket closes with code."""
+
+    def __init__(self, code, reason):
+        super().__init__(reason)
+        self.code = code
+
+
+def accept_key(key):
+    return base64.b64encode(hashlib.sha1((key + GUID).encode("latin-1")).digest()).decode("ascii")
+
+
+def _mask(data, key):
+    # XOR as one big integer: far faster than a byte loop in Python
+    n = len(data)
+    if not n:
+        return data
+    pad = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(pad, "big")).to_bytes(n, "big")
+
+
+def encode_frame(payload, opcode=OP_TEXT, mask=False):
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    n = len(payload)
+    bit = 0x80 if mask else 0
+    if n < 126:
+        head = struct.pack("!BB", 0x80 | opcode, bit | n)
+    elif n < 1 << 16:
+        head = struct.pack("!BBH", 0x80 | opcode, bit | 126, n)
+    else:
+        head = struct.pack("!BBQ", 0x80 | opcode, bit | 127, n)
+    if mask:
+        key = os.urandom(4)
+        return head + key + _mask(payload, key)
+    return head + payload
+
+
+def message(obj, mask=False):
+    """One JSON text frame, ready to hand to any number of sockets."""
+    return encode_frame(json.dumps(obj, separators=(",", ":")), mask=mask)
+
+
+class WebSocket:
+    def __init__(self, reader, writer, client=False):
+        self.reader = reader
+        self.writer = writer
+        # Clients mask what they send; servers must not
+        self.client = client
+        self.closed = False
+
+    async def _frame(self):
+        first, second = await self.reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await self.reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await self.reader.readexactly(8))[0]
+        if length > MAX_MESSAGE_SIZE:
+            raise ProtocolError(1009, "frame too large")
+        # Client frames must be masked and server frames must not be
+        if bool(second & 0x80) == self.client:
+            raise ProtocolError(1002, "unexpected frame masking")
+        key = await self.reader.readexactly(4) if second & 0x80 else None
+        data = await self.reader.readexactly(length)
+        return first & 0x80, first & 0x0F, _mask(data, key) if key else data
+
+    async def receive(self):
+        """Next text (str) or binary (bytes) message, or None once closed."""
+        parts = []
+        size = 0
+        kind = OP_TEXT
+        while True:
+            try:
+                fin, opcode, data = await self._frame()
+            except ProtocolError as exc:
+                await self.close(exc.code, str(exc))
+                return None
+            except (asyncio.IncompleteReadError, ConnectionError):
+                self.closed = True
+                return None
+            if opcode == OP_PING:
+                self.send(encode_frame(data, OP_PONG, self.client))
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode == OP_CLOSE:
+                if not self.closed:
+                    self.send(encode_frame(data[:2], OP_CLOSE, self.client))
+                    self.closed = True
+                return None
+            if opcode != OP_CONTINUATION:
+                kind = opcode
+            parts.append(data)
+            size += len(data)
+            if size > MAX_MESSAGE_SIZE:
+                await self.close(1009)
+                return None
+            if fin:
+                payload = b"".join(parts)
+                if kind != OP_TEXT:
+                    return payload
+                try:
+                    return payload.decode("utf-8")
+                except UnicodeDecodeError:
+                    await self.close(1007, "invalid UTF-8")
+                    return None
+
+    def send(self, frame):
+        """Queue an encoded frame; False if the socket is closed or too far behind."""
+        if self.closed or self.writer.is_closing():
+            return False
+        if self.writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+            return False
+        self.writer.write(frame)
+        return True
+
+    def send_json(self, obj):
+        return self.send(message(obj, self.client))
+
+    def abort(self):
+        self.closed = True
+        self.writer.transport.abort()
+
+    async def close(self, code=1000, reason=""):
+        if not self.closed:
+            self.send(encode_frame(struct.pack("!H", code) + reason.encode("utf-8"), OP_CLOSE, self.client))
+            self.closed = True
+        try:
+            await self.writer.drain()
+        except ConnectionError:
+            pass
+
+
+def upgrade(request, session):
+    """Check the opening handshake; the 101 response runs session(ws)."""
+    key = request.headers.get("sec-websocket-key")
+    if request.method != "GET" or not key or "upgrade" not in request.headers.get("connection", "").lower():
+        raise HTTPError(400, "invalid websocket handshake")
+    if request.headers.get("sec-websocket-version") != "13":
+        raise HTTPError(426, "unsupported websocket version", headers={"sec-websocket-version": "13"})
+
+    async def run(reader, writer):
+        ws = WebSocket(reader, writer)
+        try:
+            await session(ws)
+        finally:
+            await ws.close()
+
+    return Upgrade(run, {"upgrade": "websocket", "sec-websocket-accept": accept_key(key)})
+
+
+async def connect(host, port, path, headers=None):
+    """Open a client WebSocket; used by benchmarks and tests of the server."""
+    reader, writer = await asyncio.open_connection(host, port)
+    key = base64.b64encode(os.urandom(16)).decode("ascii")
+    lines = [f"GET {path} HTTP/1.1", f"host: {host}:{port}", "upgrade: websocket", "connection: Upgrade",
+             f"sec-websocket-key: {key}", "sec-websocket-version: 13"]
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+    status = head.split(" ", 2)[1]
+    if status != "101" or accept_key(key) not in head:
+        writer.close()
+        raise ConnectionError(f"websocket handshake failed: {head.splitlines()[0]}")
+    return WebSocket(reader, writer, client=True)
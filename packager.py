@@ -0,0 +1,449 @@
+# Streaming packager for the delivery archives described by the spec
+#
+# Walks package_structure or zip_contents and writes each member straight into
+# the archive as it goes: files on disk are copied in fixed-size chunks, spec
+# artifacts are serialized from their source dicts in memory, and nothing is
+# staged in a temporary directory. Memory stays flat however large the tree.
+#
+# The archive is laid out here rather than by ZipFile: local headers, member
+# data, data descriptors, the central directory and, past the classic
+# limits, the ZIP64 end records. That is what lets the deflate work move to
+# a process pool with jobs > 1 while this process stays the single writer,
+# appending members and the central directory in walk order. Workers run the
+# same raw deflate as the serial path, so every job count yields the same
+# bytes. The writer never seeks, so the archive can also go to a pipe.
+import argparse
+import hashlib
+import io
+import os
+import struct
+import sys
+import time
+import zipfile
+import zlib
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import build
+from kortex.spec import get_package_structure, get_zip_contents
+
+CHUNK_SIZE = 1 << 20
+
+# Members larger than this are deflated by the writer as it streams them, so
+# a worker never has to hold a multi-GB compressed payload in memory
+MAX_POOLED_SIZE = 64 << 20
+
+# Sizes and offsets past this get ZIP64 fields (the same cut-off zipfile uses)
+ZIP64_LIMIT = (1 << 31) - 1
+ZIP_FILECOUNT_LIMIT = (1 << 16) - 1
+
+_LOCAL = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL = struct.Struct("<IHHHHHHIIIHHHHHII")
+_DESCRIPTOR = struct.Struct("<IIII")
+_DESCRIPTOR64 = struct.Struct("<IIQQ")
+_END = struct.Struct("<IHHHHIIH")
+_END64 = struct.Struct("<IQHHIIQQQQ")
+_LOCATOR64 = struct.Struct("<IIQI")
+_UNIX = 3
+
+# Earliest timestamp a ZIP entry can hold; used when SOURCE_DATE_EPOCH is unset
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+# Formats that are already compressed; deflating them only burns CPU
+STORED_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".ico", ".woff", ".woff2",
+    ".mp3", ".mp4", ".webm", ".pdf", ".zip", ".gz", ".bz2", ".xz", ".7z",
+}
+
+# Members whose source file lives under a different name in this repository
+ALIASES = {
+    "frontend/index.html": "index.html",
+    "frontend/style.css": "style.css",
+    "frontend/app.js": "app.js",
+    "backend/package.json": "backend-package.json",
+    "docs/DEPLOYMENT.md": "deployment-guide.md",
+    "docs/FEATURES.md": "features-overview.md",
+}
+
+_frontend = get_zip_contents()["kortex-writing-hub-complete.zip"]["frontend/"]
+
+# Archive name -> (tree to walk, walker, prefix inside the archive)
+archives = {
+    "kortex-writing-hub-complete.zip": (
+        get_zip_contents()["kortex-writing-hub-complete.zip"], "zip_contents", ""),
+    "writing-hub-complete.zip": (
+        get_package_structure()["writing-hub-complete"], "package_structure", "writing-hub-complete/"),
+    "writing-hub-kortex.zip": (
+        {k: v for k, v in _frontend.items() if not k.endswith("/")}, "zip_contents", ""),
+}
+
+# A member is either a file on disk (path), in-memory bytes (data), or a
+# directory entry (arcname ending in "/", neither path nor data)
+Member = namedtuple("Member", "arcname path data")
+
+
+def generated_members():
+    """Spec artifacts, serialized from the spec dicts rather than disk."""
+    return {
+        artifact: (lambda inputs=inputs: build.serialize(build.sources[inputs[0]]))
+        for artifact, inputs in build.graph.items()
+    }
+
+
+def _resolve(root, relname):
+    for candidate in (relname, ALIASES.get(relname)):
+        if candidate:
+            path = os.path.join(root, candidate)
+            if os.path.isfile(path):
+                return path
+    return None
+
+
+def _walk_disk(root, relname, prefix):
+    base = os.path.join(root, relname)
+    for dirpath, dirnames, filenames in os.walk(base):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            rel = os.path.relpath(path, root).replace(os.sep, "/")
+            yield Member(prefix + rel, path, None)
+
+
+def _file_member(root, relname, prefix, description, generators):
+    if relname in generators:
+        return Member(prefix + relname, None, generators[relname])
+    path = _resolve(root, relname)
+    if path:
+        return Member(prefix + relname, path, None)
+    # Planned but not yet written: ship a placeholder describing it
+    text = f"{relname}\n\n{description}\n" if description else ""
+    return Member(prefix + relname, None, text.encode("utf-8"))
+
+
+def _dir_members(root, relname, prefix):
+    if os.path.isdir(os.path.join(root, relname)):
+        yield from _walk_disk(root, relname, prefix)
+    else:
+        yield Member(prefix + relname, None, None)
+
+
+def walk_zip_contents(tree, root, prefix="", generators=None, _rel=""):
+    """Yield members for a zip_contents tree ({name: description | subtree})."""
+    generators = generated_members() if generators is None else generators
+    for key, value in tree.items():
+        relname = _rel + key
+        if isinstance(value, dict):
+            yield from walk_zip_contents(value, root, prefix, generators, relname)
+        elif key.endswith("/"):
+            yield from _dir_members(root, relname, prefix)
+        else:
+            yield _file_member(root, relname, prefix, value, generators)
+
+
+def walk_package_structure(tree, root, prefix="", generators=None, _rel=""):
+    """Yield members for a package_structure tree ({dir: subtree | [names]})."""
+    generators = generated_members() if generators is None else generators
+    if isinstance(tree, dict):
+        for key, value in tree.items():
+            yield from walk_package_structure(value, root, prefix, generators, f"{_rel}{key}/")
+        return
+    for name in tree:
+        relname = _rel + name
+        if name.endswith("/"):
+            yield from _dir_members(root, relname, prefix)
+        else:
+            yield _file_member(root, relname, prefix, None, generators)
+
+
+walkers = {
+    "zip_contents": walk_zip_contents,
+    "package_structure": walk_package_structure,
+}
+
+
+def default_date_time():
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if epoch is None:
+        return ZIP_EPOCH
+    return max(ZIP_EPOCH, time.gmtime(int(epoch))[:6])
+
+
+def should_compress(member, stored_extensions=STORED_EXTENSIONS):
+    return os.path.splitext(member.arcname)[1].lower() not in stored_extensions
+
+
+def member_info(member, date_time=ZIP_EPOCH, compress=should_compress):
+    """Build the ZipInfo for a member; date_time=None keeps file mtimes."""
+    if date_time is None:
+        date_time = time.localtime(os.path.getmtime(member.path))[:6] if member.path else ZIP_EPOCH
+    info = zipfile.ZipInfo(member.arcname, max(ZIP_EPOCH, tuple(date_time)))
+    if member.path is None and member.data is None:
+        info.external_attr = (0o40755 << 16) | 0x10
+        return info
+    info.external_attr = 0o644 << 16
+    info.compress_type = zipfile.ZIP_DEFLATED if compress(member) else zipfile.ZIP_STORED
+    if member.path:
+        # Known up front, so the writer can decide on ZIP64 before streaming
+        info.file_size = os.path.getsize(member.path)
+    return info
+
+
+def iter_member_chunks(member, chunk_size=CHUNK_SIZE):
+    if member.path:
+        with open(member.path, "rb") as src:
+            while True:
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    elif member.data is not None:
+        data = member.data() if callable(member.data) else member.data
+        if data:
+            yield data
+
+
+def _compressor(compress_type, level):
+    # Raw deflate stream (no zlib header), as ZIP stores it
+    return zlib.compressobj(level, zlib.DEFLATED, -15) if compress_type == zipfile.ZIP_DEFLATED else None
+
+
+def compress_member(path, data, compress_type, level):
+    """(crc, size, payload) for one member; runs in the pool workers."""
+    compressor = _compressor(compress_type, level)
+    crc = size = 0
+    parts = []
+    for chunk in iter_member_chunks(Member(None, path, data)):
+        crc = zlib.crc32(chunk, crc)
+        size += len(chunk)
+        parts.append(compressor.compress(chunk) if compressor else chunk)
+    if compressor:
+        parts.append(compressor.flush())
+    return crc, size, b"".join(parts)
+
+
+def _dos_date_time(date_time):
+    year, month, day, hour, minute, second = date_time
+    return ((year - 1980) << 9) | (month << 5) | day, (hour << 11) | (minute << 5) | (second // 2)
+
+
+class ZipWriter:
+    """Appends members and then the central directory to a binary stream,
+    counting offsets itself so the stream need not be seekable."""
+
+    def __init__(self, out):
+        self.out = out
+        self.offset = 0
+        self.entries = []
+
+    def _write(self, data):
+        self.out.write(data)
+        self.offset += len(data)
+
+    def _local(self, info, flags, crc, compress_size, file_size, zip64):
+        name = info.filename.encode("utf-8")
+        if not info.filename.isascii():
+            flags |= 0x800
+        extra = b""
+        if zip64:
+            extra = struct.pack("<HHQQ", 1, 16, file_size, compress_size)
+            compress_size = file_size = 0xFFFFFFFF
+        date, time_ = _dos_date_time(info.date_time)
+        entry = {"name": name, "flags": flags, "method": info.compress_type, "date": date, "time": time_,
+                 "crc": crc, "compress_size": 0, "file_size": 0, "external_attr": info.external_attr,
+                 "offset": self.offset, "version": 45 if zip64 else 20}
+        self.entries.append(entry)
+        self._write(_LOCAL.pack(0x04034B50, entry["version"], flags, info.compress_type, time_, date, crc,
+                                compress_size, file_size, len(name), len(extra)) + name + extra)
+        return entry
+
+    def add(self, info, crc=0, file_size=0, payload=b""):
+        """A member whose CRC and payload are already known."""
+        zip64 = file_size > ZIP64_LIMIT or len(payload) > ZIP64_LIMIT
+        entry = self._local(info, 0, crc, len(payload), file_size, zip64)
+        entry.update(compress_size=len(payload), file_size=file_size)
+        self._write(payload)
+
+    def stream(self, info, chunks, level):
+        """A member deflated while it is written; its CRC and sizes follow
+        in a data descriptor."""
+        zip64 = info.file_size * 1.05 > ZIP64_LIMIT
+        entry = self._local(info, 0x08, 0, 0, 0, zip64)
+        compressor = _compressor(info.compress_type, level)
+        crc = size = compress_size = 0
+        for chunk in chunks:
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            if compressor:
+                chunk = compressor.compress(chunk)
+            compress_size += len(chunk)
+            self._write(chunk)
+        if compressor:
+            tail = compressor.flush()
+            compress_size += len(tail)
+            self._write(tail)
+        if not zip64 and max(size, compress_size) > ZIP64_LIMIT:
+            raise zipfile.LargeZipFile(f"{info.filename} grew past the ZIP64 limit while it was written")
+        descriptor = _DESCRIPTOR64 if zip64 else _DESCRIPTOR
+        self._write(descriptor.pack(0x08074B50, crc, compress_size, size))
+        entry.update(crc=crc, compress_size=compress_size, file_size=size)
+
+    def close(self):
+        """Write the central directory and end records."""
+        start = self.offset
+        for entry in self.entries:
+            fields = []
+            sizes = []
+            for key in ("file_size", "compress_size", "offset"):
+                value = entry[key]
+                if value > ZIP64_LIMIT:
+                    fields.append(value)
+                    value = 0xFFFFFFFF
+                sizes.append(value)
+            file_size, compress_size, offset = sizes
+            extra = struct.pack(f"<HH{len(fields)}Q", 1, 8 * len(fields), *fields) if fields else b""
+            version = 45 if fields else entry["version"]
+            self._write(_CENTRAL.pack(
+                0x02014B50, (_UNIX << 8) | version, version, entry["flags"], entry["method"], entry["time"],
+                entry["date"], entry["crc"], compress_size, file_size, len(entry["name"]), len(extra), 0, 0, 0,
+                entry["external_attr"], offset) + entry["name"] + extra)
+        count = len(self.entries)
+        size = self.offset - start
+        if count > ZIP_FILECOUNT_LIMIT or size > ZIP64_LIMIT or start > ZIP64_LIMIT:
+            end64 = self.offset
+            self._write(_END64.pack(0x06064B50, 44, (_UNIX << 8) | 45, 45, 0, 0, count, count, size, start))
+            self._write(_LOCATOR64.pack(0x07064B50, 0, end64, 1))
+            count, size, start = min(count, 0xFFFF), min(size, 0xFFFFFFFF), min(start, 0xFFFFFFFF)
+        self._write(_END.pack(0x06054B50, 0, 0, count, count, size, start, 0))
+
+
+def package(members, out, date_time=ZIP_EPOCH, compress=should_compress, level=6, jobs=1):
+    """Stream members into out (a path or binary file object) in one pass,
+    deflating them in jobs worker processes when jobs > 1."""
+    if not hasattr(out, "write"):
+        with open(out, "wb") as f:
+            return package(members, f, date_time, compress, level, jobs)
+    writer = ZipWriter(out)
+    pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    # (info, member, future or None) in walk order; at most 2 * jobs payloads in flight
+    pending = deque()
+
+    def drain(limit):
+        while len(pending) > limit:
+            info, member, future = pending.popleft()
+            if future is not None:
+                writer.add(info, *future.result())
+            elif member.path is None and member.data is None:
+                writer.add(info)
+            else:
+                writer.stream(info, iter_member_chunks(member), level)
+
+    seen = set()
+    try:
+        for member in members:
+            if member.arcname in seen:
+                continue
+            seen.add(member.arcname)
+            info = member_info(member, date_time, compress)
+            is_dir = member.path is None and member.data is None
+            if is_dir or info.file_size > MAX_POOLED_SIZE:
+                pending.append((info, member, None))
+            elif pool is None:
+                drain(0)
+                writer.add(info, *compress_member(member.path, member.data, info.compress_type, level))
+                continue
+            else:
+                # Generated data is produced here; lambdas do not pickle
+                data = member.data() if callable(member.data) else member.data
+                pending.append((info, member, pool.submit(compress_member, member.path, data,
+                                                          info.compress_type, level)))
+            drain(2 * jobs)
+        drain(0)
+        writer.close()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return len(seen)
+
+
+def benchmark(name, root, max_jobs=None, level=6, repeat=3):
+    """Time the archive build from 1 to max_jobs workers and check identity."""
+    max_jobs = max_jobs or os.cpu_count() or 1
+    members = list(archive_members(name, root))
+    date_time = default_date_time()
+    results = []
+    reference = None
+    for jobs in range(1, max_jobs + 1):
+        best = None
+        for _ in range(repeat):
+            buf = io.BytesIO()
+            start = time.perf_counter()
+            package(members, buf, date_time=date_time, level=level, jobs=jobs)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        digest = hashlib.sha256(buf.getvalue()).hexdigest()
+        if reference is None:
+            reference = digest
+            with zipfile.ZipFile(buf) as zf:
+                if zf.testzip() is not None:
+                    raise zipfile.BadZipFile(f"{name}: serial build does not read back")
+        results.append({
+            "jobs": jobs,
+            "seconds": best,
+            "speedup": results[0]["seconds"] / best if results else 1.0,
+            "identical": digest == reference,
+        })
+    return results
+
+
+def archive_members(name, root):
+    tree, walker, prefix = archives[name]
+    return walkers[walker](tree, root, prefix)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build delivery archives")
+    parser.add_argument("archives", nargs="*", metavar="archive", help=f"any of: {', '.join(sorted(archives))} (default: kortex-writing-hub-complete.zip)")
+    parser.add_argument("-o", "--output", help="output path, or - for stdout (one archive only; defaults to the archive name)")
+    parser.add_argument("--root", default=os.path.dirname(os.path.abspath(__file__)), help="directory members are read from")
+    parser.add_argument("--level", type=int, default=6, help="deflate level for compressed members")
+    parser.add_argument("--store", action="append", default=[], metavar="EXT", help="also store members with this extension uncompressed")
+    parser.add_argument("--keep-mtime", action="store_true", help="use file mtimes instead of a fixed timestamp")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="compress members in this many worker processes")
+    parser.add_argument("--bench", action="store_true", help="benchmark 1..--jobs workers (default: all cores)")
+    args = parser.parse_args(argv)
+
+    names = list(dict.fromkeys(args.archives)) or ["kortex-writing-hub-complete.zip"]
+    unknown = [name for name in names if name not in archives]
+    if unknown:
+        parser.error(f"unknown archive: {', '.join(unknown)}")
+    if args.output and len(names) > 1:
+        parser.error("-o/--output needs a single archive")
+
+    if args.bench:
+        max_jobs = args.jobs if args.jobs > 1 else None
+        for name in names:
+            print(f"⏱️ {name} from {args.root}")
+            for row in benchmark(name, args.root, max_jobs, args.level):
+                check = "✅" if row["identical"] else "❌ differs from serial"
+                print(f"  jobs={row['jobs']:<3} {row['seconds'] * 1000:9.1f} ms  x{row['speedup']:.2f}  {check}")
+        return 0
+
+    stored = STORED_EXTENSIONS | {e.lower() if e.startswith(".") else "." + e.lower() for e in args.store}
+    for name in names:
+        output = args.output or os.path.join(args.root, name)
+        out = sys.stdout.buffer if output == "-" else output
+        count = package(
+            archive_members(name, args.root),
+            out,
+            date_time=None if args.keep_mtime else default_date_time(),
+            compress=lambda m: should_compress(m, stored),
+            level=args.level,
+            jobs=args.jobs,
+        )
+        if out is not sys.stdout.buffer:
+            print(f"📦 {output}: {count} members, {os.path.getsize(output)} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,262 +1,20 @@
-import os
+# Write the development timeline and package.json from specdata
 import json
-import zipfile
-from datetime import datetime, timedelta
 
-# Create the complete development package structure
-package_structure = {
-    "writing-hub-complete": {
-        "frontend": {
-            "src": {
-                "components": {
-                    "Editor": ["MonacoEditor.tsx", "MarkdownEditor.tsx", "EditorToolbar.tsx"],
-                    "FocusTimer": ["Timer.tsx", "TimerSettings.tsx", "CategorySelector.tsx"],
-                    "AI": ["ChatPanel.tsx", "AIChat.tsx", "PromptLibrary.tsx"],
-                    "Knowledge": ["KnowledgeVault.tsx", "FileTree.tsx", "TagManager.tsx"],
-                    "Projects": ["ProjectBoard.tsx", "KanbanView.tsx", "TimelineView.tsx"],
-                    "Constellation": ["ConstellationMap.tsx", "NodeGraph.tsx"],
-                    "Assets": ["AssetLibrary.tsx", "AssetPreview.tsx", "AssetUpload.tsx"],
-                    "Layout": ["Sidebar.tsx", "Header.tsx", "MainPanel.tsx", "ResizablePanels.tsx"]
-                },
-                "hooks": ["useTimer.ts", "useAI.ts", "useKeyboard.ts", "useDragDrop.ts"],
-                "services": ["aiService.ts", "storageService.ts", "exportService.ts"],
-                "stores": ["appStore.ts", "documentStore.ts", "timerStore.ts"],
-                "types": ["index.ts", "documents.ts", "ai.ts", "projects.ts"],
-                "utils": ["helpers.ts", "constants.ts", "themes.ts"],
-                "styles": ["globals.css", "components.css", "themes.css"]
-            },
-            "public": ["index.html", "manifest.json", "icons/", "assets/"],
-            "config": ["vite.config.ts", "tsconfig.json", "tailwind.config.js"]
-        },
-        "backend": {
-            "src": {
-                "controllers": ["authController.js", "documentsController.js", "aiController.js"],
-                "models": ["User.js", "Document.js", "Project.js", "Asset.js"],
-                "routes": ["auth.js", "documents.js", "ai.js", "projects.js"],
-                "middleware": ["auth.js", "cors.js", "validation.js"],
-                "services": ["aiService.js", "storageService.js", "collaborationService.js"],
-                "utils": ["database.js", "helpers.js", "constants.js"]
-            },
-            "config": ["database.json", "server.js", "package.json"]
-        },
-        "electron": {
-            "main": ["main.js", "preload.js", "menu.js"],
-            "config": ["forge.config.js", "package.json"]
-        },
-        "docs": ["README.md", "DEPLOYMENT.md", "API.md", "FEATURES.md"],
-        "scripts": ["setup.sh", "dev.sh", "build.sh", "deploy.sh"],
-        "docker": ["Dockerfile", "docker-compose.yml", ".dockerignore"]
-    }
-}
+from specdata import package_json, timeline
 
-# Create timeline with realistic development phases
-timeline = {
-    "phases": [
-        {
-            "name": "Foundation & Core",
-            "start_date": "2025-06-26",
-            "end_date": "2025-07-31",
-            "duration_weeks": 5,
-            "risk": "Medium",
-            "tasks": [
-                "Project setup and configuration",
-                "Basic React + TypeScript + Vite structure",
-                "Electron integration with Forge",
-                "Core layout and navigation",
-                "State management with Zustand",
-                "Basic styling system with Tailwind"
-            ],
-            "deliverables": ["Working app skeleton", "Development environment", "CI/CD pipeline"]
-        },
-        {
-            "name": "Writing Interface",
-            "start_date": "2025-08-03",
-            "end_date": "2025-08-27",
-            "duration_weeks": 3.5,
-            "risk": "Medium",
-            "tasks": [
-                "Monaco Editor integration",
-                "Markdown support and preview",
-                "Slash commands for templates",
-                "Multi-pane editing",
-                "Document management system",
-                "Auto-save and version control"
-            ],
-            "deliverables": ["Functional editor", "Document system", "Template library"]
-        },
-        {
-            "name": "Knowledge System",
-            "start_date": "2025-08-30",
-            "end_date": "2025-10-01",
-            "duration_weeks": 4.5,
-            "risk": "Medium-High",
-            "tasks": [
-                "File tree and folder structure",
-                "Drag-and-drop organization",
-                "Tagging system",
-                "Search functionality",
-                "Asset management",
-                "Import/export capabilities"
-            ],
-            "deliverables": ["Knowledge vault", "Asset library", "Search system"]
-        },
-        {
-            "name": "AI Layer",
-            "start_date": "2025-10-04",
-            "end_date": "2025-11-11",
-            "duration_weeks": 5.5,
-            "risk": "High",
-            "tasks": [
-                "Multi-model AI integration",
-                "Chat interface and context management",
-                "Prompt library and templates",
-                "Content generation workflows",
-                "Knowledge base integration",
-                "Cost management and rate limiting"
-            ],
-            "deliverables": ["AI assistant", "Prompt system", "Context engine"]
-        },
-        {
-            "name": "Advanced Features",
-            "start_date": "2025-11-14",
-            "end_date": "2025-12-09",
-            "duration_weeks": 3.5,
-            "risk": "Medium",
-            "tasks": [
-                "Focus timer with categories",
-                "Constellation knowledge map",
-                "Project management views",
-                "Real-time collaboration",
-                "Export and sharing",
-                "Advanced settings"
-            ],
-            "deliverables": ["Focus system", "Visualization tools", "Collaboration features"]
-        },
-        {
-            "name": "Polish & Performance",
-            "start_date": "2025-12-12",
-            "end_date": "2025-12-29",
-            "duration_weeks": 2.5,
-            "risk": "Low",
-            "tasks": [
-                "Performance optimization",
-                "Accessibility improvements",
-                "Visual polish and animations",
-                "Mobile responsiveness",
-                "Bug fixes and testing",
-                "Documentation completion"
-            ],
-            "deliverables": ["Optimized app", "Complete documentation", "Test suite"]
-        },
-        {
-            "name": "Packaging & Distribution",
-            "start_date": "2026-01-01",
-            "end_date": "2026-01-19",
-            "duration_weeks": 2.5,
-            "risk": "Medium",
-            "tasks": [
-                "Electron app packaging",
-                "Cross-platform builds",
-                "Auto-updater setup",
-                "Distribution preparation",
-                "Final testing",
-                "Release preparation"
-            ],
-            "deliverables": ["Packaged apps", "Distribution setup", "Release candidates"]
-        }
-    ],
-    "milestones": [
-        {"name": "MVP Demo", "date": "2025-08-15", "description": "Basic writing interface working"},
-        {"name": "Alpha Release", "date": "2025-10-15", "description": "Core features complete"},
-        {"name": "Beta Release", "date": "2025-12-01", "description": "All features implemented"},
-        {"name": "Production Release", "date": "2026-01-20", "description": "Stable, packaged application"}
-    ],
-    "total_duration_weeks": 28,
-    "estimated_completion": "2026-01-19"
-}
+if __name__ == "__main__":
+    # Save all the configuration files
+    print("📦 Creating comprehensive development package...")
 
-# Create package.json for the main project
-package_json = {
-    "name": "kortex-writing-hub",
-    "version": "1.0.0",
-    "description": "AI-Powered Writing Hub with Neon-Glass Design",
-    "main": "dist-electron/main.js",
-    "homepage": "./",
-    "scripts": {
-        "dev": "concurrently \"npm run dev:vite\" \"npm run dev:electron\"",
-        "dev:vite": "vite",
-        "dev:electron": "electron .",
-        "build": "tsc && vite build && npm run build:electron",
-        "build:electron": "electron-builder",
-        "preview": "vite preview",
-        "lint": "eslint . --ext ts,tsx --report-unused-disable-directives --max-warnings 0",
-        "format": "prettier --write .",
-        "test": "vitest",
-        "test:ui": "vitest --ui",
-        "package": "electron-forge package",
-        "make": "electron-forge make",
-        "publish": "electron-forge publish"
-    },
-    "dependencies": {
-        "@monaco-editor/react": "^4.6.0",
-        "@radix-ui/react-dialog": "^1.0.5",
-        "@radix-ui/react-dropdown-menu": "^2.0.6",
-        "@radix-ui/react-toast": "^1.1.5",
-        "framer-motion": "^10.16.16",
-        "lucide-react": "^0.298.0",
-        "monaco-editor": "^0.44.0",
-        "openai": "^4.20.1",
-        "react": "^18.2.0",
-        "react-dom": "^18.2.0",
-        "react-hotkeys-hook": "^4.4.1",
-        "socket.io-client": "^4.7.4",
-        "zustand": "^4.4.7"
-    },
-    "devDependencies": {
-        "@electron-forge/cli": "^7.2.0",
-        "@electron-forge/maker-deb": "^7.2.0",
-        "@electron-forge/maker-dmg": "^7.2.0",
-        "@electron-forge/maker-rpm": "^7.2.0",
-        "@electron-forge/maker-squirrel": "^7.2.0",
-        "@electron-forge/maker-zip": "^7.2.0",
-        "@electron-forge/plugin-vite": "^7.2.0",
-        "@types/react": "^18.2.43",
-        "@types/react-dom": "^18.2.17",
-        "@typescript-eslint/eslint-plugin": "^6.14.0",
-        "@typescript-eslint/parser": "^6.14.0",
-        "@vitejs/plugin-react": "^4.2.1",
-        "autoprefixer": "^10.4.16",
-        "concurrently": "^8.2.2",
-        "electron": "^28.1.0",
-        "eslint": "^8.55.0",
-        "eslint-plugin-react-hooks": "^4.6.0",
-        "eslint-plugin-react-refresh": "^0.4.5",
-        "postcss": "^8.4.32",
-        "prettier": "^3.1.1",
-        "tailwindcss": "^3.3.6",
-        "typescript": "^5.2.2",
-        "vite": "^5.0.8",
-        "vitest": "^1.0.4"
-    },
-    "author": "Writing Hub Team",
-    "license": "MIT",
-    "repository": {
-        "type": "git",
-        "url": "https://github.com/your-org/kortex-writing-hub.git"
-    }
-}
+    # Save timeline
+    with open("timeline.json", "w") as f:
+        json.dump(timeline, f, indent=2)
 
-# Save all the configuration files
-print("📦 Creating comprehensive development package...")
+    # Save package.json
+    with open("package.json", "w") as f:
+        json.dump(package_json, f, indent=2)
 
-# Save timeline
-with open("timeline.json", "w") as f:
-    json.dump(timeline, f, indent=2)
-
-# Save package.json
-with open("package.json", "w") as f:
-    json.dump(package_json, f, indent=2)
-
-print("✅ Development package structure and timeline created successfully!")
-print(f"📅 Project timeline: {timeline['total_duration_weeks']} weeks")
-print(f"🎯 Estimated completion: {timeline['estimated_completion']}")
\ No newline at end of file
+    print("✅ Development package structure and timeline created successfully!")
+    print(f"📅 Project timeline: {timeline['total_duration_weeks']} weeks")
+    print(f"🎯 Estimated completion: {timeline['estimated_completion']}")
\ No newline at end of file
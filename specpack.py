@@ -0,0 +1,391 @@
+# Compact binary form of the spec artifacts, readable without parsing it all
+#
+# Every JSON artifact build.py writes can also be packed into a .kspec file:
+# a length-prefixed, MessagePack-style encoding where each map and list
+# starts with an offset index. A map's index holds its keys and where each
+# value starts, so looking up endpoints -> documents -> "GET /documents"
+# reads three small key tables and decodes one value; nothing else in the
+# file is touched. Readers memory-map the file and hand out lazy views that
+# behave like read-only dicts and lists.
+#
+# Packing preserves key order and value types, so decoding a .kspec and
+# serializing it the way build.py does gives the JSON artifact byte for
+# byte; --check verifies exactly that. Files are packed from the JSON
+# artifacts on disk, not from the generator scripts, so a .kspec always
+# matches the artifact next to it; run build.py first to refresh both.
+#
+# Layout (little-endian): b"KSPC", u16 version, then one value. A value is a
+# one-byte tag followed by its payload:
+#   N T F              null, true, false
+#   I <i64>  D <f64>   integer, float
+#   S <u32 n> <bytes>  UTF-8 string
+#   L <u32 n> <u32 offset>*n <values>
+#   M <u32 n> (<u16 k> <key bytes> <u32 offset>)*n <values>
+# Offsets are relative to the first byte after the index.
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from collections.abc import Mapping, Sequence
+
+import build
+
+MAGIC = b"KSPC"
+VERSION = 1
+EXTENSION = ".kspec"
+
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+
+
+class SpecFormatError(ValueError):
+    pass
+
+
+def _encode(value):
+    if value is None:
+        return b"N"
+    if value is True:
+        return b"T"
+    if value is False:
+        return b"F"
+    if isinstance(value, int):
+        return b"I" + _I64.pack(value)
+    if isinstance(value, float):
+        return b"D" + _F64.pack(value)
+    if isinstance(value, str):
+        raw = value.encode("utf-8")
+        return b"S" + _U32.pack(len(raw)) + raw
+    if isinstance(value, (list, tuple)):
+        items = [_encode(item) for item in value]
+        index = bytearray(b"L" + _U32.pack(len(items)))
+        offset = 0
+        for item in items:
+            index += _U32.pack(offset)
+            offset += len(item)
+        return bytes(index) + b"".join(items)
+    if isinstance(value, dict):
+        items = [_encode(item) for item in value.values()]
+        index = bytearray(b"M" + _U32.pack(len(items)))
+        offset = 0
+        for key, item in zip(value, items):
+            if not isinstance(key, str):
+                raise TypeError(f"map keys must be strings, not {type(key).__name__}")
+            raw = key.encode("utf-8")
+            index += _U16.pack(len(raw)) + raw + _U32.pack(offset)
+            offset += len(item)
+        return bytes(index) + b"".join(items)
+    raise TypeError(f"cannot pack {type(value).__name__}")
+
+
+def pack(obj):
+    return MAGIC + _U16.pack(VERSION) + _encode(obj)
+
+
+def _decode(buf, pos):
+    """The value at pos, fully decoded."""
+    tag = buf[pos:pos + 1]
+    if tag in (b"M", b"L"):
+        view = (MapView if tag == b"M" else ListView)(buf, pos)
+        return view.to_python()
+    return _scalar(buf, pos, tag)
+
+
+def _scalar(buf, pos, tag):
+    if tag == b"S":
+        (length,) = _U32.unpack_from(buf, pos + 1)
+        if pos + 5 + length > len(buf):
+            raise SpecFormatError(f"string at offset {pos} runs past the end")
+        return bytes(buf[pos + 5:pos + 5 + length]).decode("utf-8")
+    if tag == b"I":
+        return _I64.unpack_from(buf, pos + 1)[0]
+    if tag == b"D":
+        return _F64.unpack_from(buf, pos + 1)[0]
+    if tag == b"N":
+        return None
+    if tag == b"T":
+        return True
+    if tag == b"F":
+        return False
+    raise SpecFormatError(f"unknown tag {tag!r} at offset {pos}")
+
+
+def _value(buf, pos):
+    """The value at pos: a lazy view for containers, else the scalar."""
+    tag = buf[pos:pos + 1]
+    if tag == b"M":
+        return MapView(buf, pos)
+    if tag == b"L":
+        return ListView(buf, pos)
+    return _scalar(buf, pos, tag)
+
+
+class MapView(Mapping):
+    """Read-only dict over a packed map; values decode on access."""
+
+    def __init__(self, buf, pos):
+        self._buf = buf
+        (count,) = _U32.unpack_from(buf, pos + 1)
+        offsets = {}
+        cursor = pos + 5
+        for _ in range(count):
+            (length,) = _U16.unpack_from(buf, cursor)
+            if cursor + 2 + length > len(buf):
+                raise SpecFormatError(f"map key at offset {cursor} runs past the end")
+            key = bytes(buf[cursor + 2:cursor + 2 + length]).decode("utf-8")
+            (offsets[key],) = _U32.unpack_from(buf, cursor + 2 + length)
+            cursor += 6 + length
+        self._base = cursor
+        self._offsets = offsets
+
+    def __getitem__(self, key):
+        return _value(self._buf, self._base + self._offsets[key])
+
+    def __iter__(self):
+        return iter(self._offsets)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def to_python(self):
+        return {key: _decode(self._buf, self._base + offset) for key, offset in self._offsets.items()}
+
+
+class ListView(Sequence):
+    """Read-only list over a packed list; items decode on access."""
+
+    def __init__(self, buf, pos):
+        self._buf = buf
+        (self._count,) = _U32.unpack_from(buf, pos + 1)
+        self._index = pos + 5
+        self._base = self._index + 4 * self._count
+
+    def _offset(self, i):
+        return self._base + _U32.unpack_from(self._buf, self._index + 4 * i)[0]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("list index out of range")
+        return _value(self._buf, self._offset(i))
+
+    def __len__(self):
+        return self._count
+
+    def to_python(self):
+        return [_decode(self._buf, self._offset(i)) for i in range(self._count)]
+
+
+# What decoding a short or damaged buffer raises
+_CORRUPT = (struct.error, ValueError, IndexError, KeyError)
+
+
+class Spec:
+    """A memory-mapped .kspec file. root is a MapView (or ListView)."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < 6:
+                raise SpecFormatError(f"{path} is empty or truncated")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:4] != MAGIC:
+            self.close()
+            raise SpecFormatError(f"{path} is not a kspec file")
+        (version,) = _U16.unpack_from(self._map, 4)
+        if version != VERSION:
+            self.close()
+            raise SpecFormatError(f"{path} is kspec version {version}, expected {VERSION}")
+        try:
+            self.root = _value(self._map, 6)
+        except _CORRUPT as exc:
+            self.close()
+            raise SpecFormatError(f"{path} is truncated or corrupt: {exc}") from None
+
+    def get(self, *path):
+        """The value at path (keys and list indexes), e.g.
+        get("endpoints", "documents", "GET /documents")."""
+        node = self.root
+        for step in path:
+            node = node[step]
+        return node
+
+    def load(self):
+        """The whole file as plain dicts and lists."""
+        try:
+            return _decode(self._map, 6)
+        except _CORRUPT as exc:
+            raise SpecFormatError(f"{self.path} is truncated or corrupt: {exc}") from None
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_spec(path):
+    return Spec(path)
+
+
+def unpack(data):
+    if data[:4] != MAGIC:
+        raise SpecFormatError("not a kspec payload")
+    if len(data) < 6 or _U16.unpack_from(data, 4)[0] != VERSION:
+        raise SpecFormatError(f"kspec payload is not version {VERSION}")
+    try:
+        return _decode(memoryview(data), 6)
+    except _CORRUPT as exc:
+        raise SpecFormatError(f"truncated or corrupt kspec payload: {exc}") from None
+
+
+def binary_name(artifact):
+    return os.path.splitext(artifact)[0] + EXTENSION
+
+
+def _artifact(out_dir, artifact):
+    """The JSON artifact as build.py wrote it, decoded."""
+    path = os.path.join(out_dir, artifact)
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+        obj = json.loads(raw)
+    except (OSError, ValueError) as exc:
+        raise SpecFormatError(f"cannot read {path}: {exc}") from None
+    if build.serialize(obj) != raw:
+        raise SpecFormatError(f"{path} was not written by build.py; rebuild it first")
+    return obj
+
+
+def write(out_dir=".", only=None):
+    """Pack every build.py artifact in out_dir (or those in only);
+    {artifact: size}."""
+    sizes = {}
+    for artifact in build.graph:
+        if only and artifact not in only:
+            continue
+        data = pack(_artifact(out_dir, artifact))
+        path = os.path.join(out_dir, binary_name(artifact))
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        sizes[artifact] = len(data)
+    return sizes
+
+
+def check(out_dir=".", only=None):
+    """{artifact: problem or None}: each .kspec must decode to exactly the
+    bytes of its JSON artifact as build.py serializes it."""
+    results = {}
+    for artifact in build.graph:
+        if only and artifact not in only:
+            continue
+        try:
+            with open(os.path.join(out_dir, artifact), "rb") as f:
+                expected = f.read()
+            with Spec(os.path.join(out_dir, binary_name(artifact))) as spec:
+                decoded = spec.load()
+        except (OSError, SpecFormatError) as exc:
+            results[artifact] = str(exc)
+            continue
+        results[artifact] = None if build.serialize(decoded) == expected else "decodes to different JSON"
+    return results
+
+
+def _synthetic_api(endpoints):
+    groups = {}
+    for n in range(endpoints):
+        group = groups.setdefault(f"group{n % 50}", {})
+        group[f"GET /resource{n}/:id"] = {"description": f"Fetch resource {n}",
+                                          "query": {"folder": "string", "tags": "array"},
+                                          "response": {"item": "object", "total": "number"}}
+    return {"base_url": "http://localhost:3001/api", "endpoints": groups}
+
+
+def benchmark(endpoints, rounds=50):
+    """Load time for one endpoint: json.load of the whole file vs. opening
+    the .kspec and decoding just that endpoint."""
+    import tempfile
+
+    api = _synthetic_api(endpoints)
+    root = tempfile.mkdtemp(prefix="kortex-specpack-")
+    json_path = os.path.join(root, "api.json")
+    spec_path = os.path.join(root, "api" + EXTENSION)
+    with open(json_path, "wb") as f:
+        f.write(build.serialize(api))
+    with open(spec_path, "wb") as f:
+        f.write(pack(api))
+    group, key = f"group{(endpoints - 1) % 50}", f"GET /resource{endpoints - 1}/:id"
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        with open(json_path, "rb") as f:
+            wanted = json.load(f)["endpoints"][group][key]
+    json_ms = (time.perf_counter() - start) / rounds * 1000
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        with Spec(spec_path) as spec:
+            lazy = spec.get("endpoints", group, key).to_python()
+    lazy_ms = (time.perf_counter() - start) / rounds * 1000
+
+    start = time.perf_counter()
+    for _ in range(max(1, rounds // 10)):
+        with Spec(spec_path) as spec:
+            full = spec.load()
+    full_ms = (time.perf_counter() - start) / max(1, rounds // 10) * 1000
+    assert lazy == wanted and full == api
+    return {"endpoints": endpoints, "json_bytes": os.path.getsize(json_path),
+            "kspec_bytes": os.path.getsize(spec_path), "json_ms": json_ms, "lazy_ms": lazy_ms, "full_ms": full_ms}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack spec artifacts into lazily readable .kspec files")
+    parser.add_argument("artifacts", nargs="*", help="limit to these artifacts (e.g. backend-api.json)")
+    parser.add_argument("--out-dir", default=os.path.dirname(os.path.abspath(__file__)))
+    parser.add_argument("--check", action="store_true", help="verify each .kspec round-trips to its JSON artifact")
+    parser.add_argument("--bench", type=int, metavar="ENDPOINTS", help="time loading one endpoint of a "
+                        "synthetic API with ENDPOINTS endpoints")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        result = benchmark(args.bench)
+        print(f"📦 {result['endpoints']:,} endpoints: {result['json_bytes']:,} bytes JSON, "
+              f"{result['kspec_bytes']:,} bytes kspec")
+        print(f"⏱️ one endpoint: json.load {result['json_ms']:.2f} ms, kspec lazy {result['lazy_ms']:.3f} ms "
+              f"(full kspec decode {result['full_ms']:.2f} ms)")
+        return 0
+
+    unknown = set(args.artifacts) - set(build.graph)
+    if unknown:
+        parser.error(f"unknown artifacts: {', '.join(sorted(unknown))}")
+    only = set(args.artifacts)
+    if args.check:
+        results = check(args.out_dir, only)
+        for artifact, problem in results.items():
+            print(f"{'✅' if problem is None else '❌'} {binary_name(artifact)}: {problem or 'matches ' + artifact}")
+        return 1 if any(results.values()) else 0
+    try:
+        sizes = write(args.out_dir, only)
+    except SpecFormatError as exc:
+        print(f"❌ {exc}", file=sys.stderr)
+        return 1
+    for artifact, size in sizes.items():
+        print(f"✅ {binary_name(artifact)}: {size:,} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+# Shared fixtures: an App with in-memory stores, driven without a socket
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kortex.http import Request  # noqa: E402
+from kortex.server import App  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = App(upload_dir=str(tmp_path / "uploads"))
+    yield app
+    app.auth.close()
+
+
+@pytest.fixture
+def call(app):
+    """call(method, path, body=None, token=None, headers=None, raw=None) -> (status, payload)"""
+    def call(method, path, body=None, token=None, headers=None, raw=None):
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        if token:
+            headers["authorization"] = "Bearer " + token
+        data = raw if raw is not None else (json.dumps(body).encode() if body is not None else b"")
+        if data and "content-type" not in headers:
+            headers["content-type"] = "application/json"
+        path, _, query = path.partition("?")
+        params = {}
+        for pair in filter(None, query.split("&")):
+            key, _, value = pair.partition("=")
+            params.setdefault(key, []).append(value)
+        response = asyncio.run(app.dispatch(Request(method, "/api" + path, params, headers, data)))
+        return response.status, json.loads(response.body) if response.body else None
+    return call
+
+
+@pytest.fixture
+def token(call):
+    status, payload = call("POST", "/auth/register", {"email": "ada@example.com", "password": "pw", "name": "Ada"})
+    assert status == 201
+    return payload["token"]
@@ -0,0 +1,40 @@
+# Streamed /ai/chat: a client that disconnects is still charged for the prompt it sent
+import asyncio
+import json
+
+from kortex.ai import build_prompt, count_tokens
+from kortex.http import Request
+
+
+def chat(app, token, body):
+    headers = {"authorization": "Bearer " + token, "content-type": "application/json",
+               "accept": "text/event-stream"}
+    return app.dispatch(Request("POST", "/api/ai/chat", {}, headers, json.dumps(body).encode()))
+
+
+def test_cancelled_stream_charges_the_full_prompt(app, call, token):
+    note = "The lantern drifted past the harbor while the signal faded into the ember glow. " * 20
+    assert call("POST", "/documents", {"title": "Harbor", "content": note, "type": "markdown", "tags": []},
+                token)[0] == 201
+    body = {"message": "lantern harbor signal", "context": ["a pasted outline " * 10], "model": "gpt-4"}
+
+    async def run():
+        finished = await chat(app, token, body)
+        events = [chunk async for chunk in finished.chunks]
+        usage = json.loads(events[-2].decode().split("data: ", 1)[1])
+
+        cancelled = await chat(app, token, body)
+        await cancelled.chunks.__anext__()
+        await cancelled.chunks.aclose()
+        return usage
+    usage = asyncio.run(run())
+    # The retrieved chunk and the caller's context are both in the prompt
+    assert usage["promptTokens"] > count_tokens(build_prompt(body["message"], body["context"]))
+
+    conversations = app.store.select("ai_conversations")
+    assert len(conversations) == 2
+    recorded = {row["tokens_used"] for row in conversations}
+    cancelled = min(recorded)
+    # Only the completion is cut short
+    assert usage["totalTokens"] - cancelled < usage["completionTokens"]
+    assert cancelled > usage["promptTokens"]
@@ -0,0 +1,78 @@
+# Token issue, refresh rotation and revocation, including across restarts
+import pytest
+
+from kortex.auth import Authenticator, TokenError, check_password, hash_password
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_tokens_verify_by_kind_and_expire(clock):
+    auth = Authenticator({"jwtSecret": "s", "jwtExpiration": "1h"}, clock=clock)
+    pair = auth.issue("u1")
+    assert auth.verify(pair["token"])["sub"] == "u1"
+    assert auth.verify(pair["token"])["sub"] == "u1"
+    assert auth.cache.stats()["hits"] == 1
+    with pytest.raises(TokenError):
+        auth.verify(pair["refreshToken"])
+    with pytest.raises(TokenError):
+        Authenticator({"jwtSecret": "other"}, clock=clock).verify(pair["token"])
+    clock.now += 3600
+    with pytest.raises(TokenError):
+        auth.verify(pair["token"])
+    auth.close()
+
+
+def test_rotation_revokes_the_old_refresh_token(clock):
+    auth = Authenticator({"jwtSecret": "s"}, clock=clock)
+    old = auth.issue("u1")["refreshToken"]
+    new = auth.rotate(old)
+    assert auth.verify(new["token"])["sub"] == "u1"
+    with pytest.raises(TokenError, match="revoked"):
+        auth.rotate(old)
+    assert auth.verify(auth.rotate(new["refreshToken"])["token"])["sub"] == "u1"
+    auth.close()
+
+
+def test_revocations_survive_a_restart(tmp_path, clock):
+    path = str(tmp_path / "revoked.db")
+    auth = Authenticator({"jwtSecret": "s", "refreshTokenExpiration": "1d"}, clock=clock, revoked_path=path)
+    old = auth.issue("u1")["refreshToken"]
+    auth.rotate(old)
+    auth.close()
+
+    auth = Authenticator({"jwtSecret": "s"}, clock=clock, revoked_path=path)
+    with pytest.raises(TokenError, match="revoked"):
+        auth.verify(old, "refresh")
+    auth.close()
+
+    # Rows for tokens that have expired anyway are dropped at startup
+    clock.now += 86400
+    auth = Authenticator({"jwtSecret": "s"}, clock=clock, revoked_path=path)
+    assert auth.revoked == {}
+    auth.close()
+
+
+def test_passwords():
+    hashed = hash_password("correct horse")
+    assert check_password("correct horse", hashed)
+    assert not check_password("wrong", hashed)
+
+
+def test_refresh_endpoint(call):
+    status, pair = call("POST", "/auth/register", {"email": "ada@example.com", "password": "pw", "name": "Ada"})
+    status, rotated = call("POST", "/auth/refresh", {"refreshToken": pair["refreshToken"]})
+    assert status == 200 and set(rotated) >= {"token", "refreshToken"}
+    assert call("GET", "/documents", token=rotated["token"])[0] == 200
+    assert call("POST", "/auth/refresh", {"refreshToken": pair["refreshToken"]})[0] == 401
+    assert call("POST", "/auth/refresh", {"refreshToken": "garbage"})[0] == 401
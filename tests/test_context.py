@@ -0,0 +1,91 @@
+# AI context retrieval: stable chunks, cached embeddings, packing to budget
+import asyncio
+
+from kortex.ai import count_tokens
+from kortex.context import Chunk, ContextEngine, pack, split_chunks
+from kortex.store import MemoryStore
+
+PARAGRAPHS = [
+    "# Orbit",
+    "The lantern drifted past the harbor while the signal faded into the ember glow. " * 4,
+    "Quill and compass were packed for the meadow crossing at first light. " * 5,
+    "Thunder rolled over the saffron ridge and the falcon circled the copper willow. " * 6,
+]
+
+
+def document(store, n, paragraphs, user_id="u1"):
+    return store.insert("documents", {"id": f"{n:032x}", "user_id": user_id, "title": f"Note {n}",
+                                      "content": "\n\n".join(paragraphs), "type": "markdown", "folder_path": "/",
+                                      "tags": [], "metadata": {}})
+
+
+def test_editing_a_paragraph_changes_only_its_chunk():
+    before = split_chunks("\n\n".join(PARAGRAPHS))
+    edited = list(PARAGRAPHS)
+    edited[2] += " Revised."
+    after = split_chunks("\n\n".join(edited))
+    assert len(before) == len(after) == 3
+    assert before[0].startswith("# Orbit\n\nThe lantern")
+    assert [a == b for a, b in zip(before, after)] == [True, False, True]
+
+
+def test_long_blocks_are_windowed():
+    chunks = split_chunks("word " * 2000, max_tokens=100)
+    assert len(chunks) > 1 and all(len(chunk) <= 400 for chunk in chunks)
+
+
+def test_reindexing_an_edit_embeds_only_the_changed_chunk():
+    async def run():
+        store = MemoryStore()
+        doc = document(store, 1, PARAGRAPHS)
+        engine = ContextEngine(store)
+        index = await engine.for_user("u1")
+        assert len(index) == 3 and engine.embeddings.misses == 3
+        edited = list(PARAGRAPHS)
+        edited[3] = "Prism and atlas now lead the final paragraph."
+        engine.document_changed(dict(doc, content="\n\n".join(edited)))
+        assert (engine.embeddings.hits, engine.embeddings.misses) == (2, 4)
+        items, _ = await engine.retrieve("u1", "prism atlas", 1000)
+        return items
+    assert "Prism and atlas" in asyncio.run(run())[0]["content"]
+
+
+def test_packing_stays_within_budget():
+    chunks = [Chunk("d", "t", "word " * n) for n in (50, 400, 30, 20)]
+    hits = [(0.9, chunks[0]), (0.8, chunks[1]), (0.5, chunks[2]), (0.01, chunks[3])]
+    chosen, used = pack(hits, 200)
+    # The oversized hit is skipped, the next one still fits, weak hits never count
+    assert [chunk for _, chunk in chosen] == [chunks[0], chunks[2]]
+    assert used == chunks[0].tokens + chunks[2].tokens <= 200
+
+    async def run():
+        store = MemoryStore()
+        for n in range(20):
+            document(store, n, PARAGRAPHS)
+        engine = ContextEngine(store)
+        budget = engine.budget("lantern harbor", [], 600)
+        items, used = await engine.retrieve("u1", "lantern harbor", budget)
+        return budget, items, used
+    budget, items, used = asyncio.run(run())
+    assert items and used == sum(count_tokens(item["content"]) for item in items) <= budget
+
+
+def test_indexes_are_bounded_and_edits_during_a_build_are_kept():
+    async def run():
+        store = MemoryStore()
+        for user in ("u1", "u2", "u3"):
+            document(store, int(user[1:]), PARAGRAPHS, user)
+        engine = ContextEngine(store, max_users=2)
+        first = asyncio.ensure_future(engine.for_user("u1"))
+        second = asyncio.ensure_future(engine.for_user("u1"))
+        await asyncio.sleep(0)
+        # Saved while the index is being built from the rows read before
+        engine.document_changed(dict(store.get("documents", f"{1:032x}"), content="Only prism now."))
+        engine.document_changed(document(store, 9, ["Atlas hollow ferment."], "u1"))
+        index = await first
+        assert await second is index
+        assert sorted(chunk.text for chunk in index.chunks) == ["Atlas hollow ferment.", "Only prism now."]
+        await engine.for_user("u2")
+        await engine.for_user("u3")
+        return list(engine.indexes)
+    assert asyncio.run(run()) == ["u2", "u3"]
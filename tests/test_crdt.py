@@ -0,0 +1,85 @@
+# RGA sequence: convergence under reordering and rejection of bad operations
+import itertools
+import random
+
+import pytest
+
+from kortex.crdt import InvalidOperation, Sequence, checked
+
+
+def test_concurrent_edits_converge_in_any_order():
+    base = Sequence("hello").state()
+    alice, bob, carol = (Sequence.from_state(base, site) for site in (1, 2, 3))
+    ops = [
+        alice.insert(5, " world"),
+        alice.delete(0),
+        bob.insert(5, "!"),
+        bob.insert(0, ">> "),
+        carol.delete(1, 3),
+        carol.insert(2, "y"),
+    ]
+    texts = set()
+    for order in itertools.permutations(ops):
+        replica = Sequence.from_state(base, 9)
+        for op in order:
+            replica.apply(op)
+        texts.add(replica.text())
+    assert len(texts) == 1
+
+
+def test_random_sessions_converge():
+    rng = random.Random(7)
+    base = Sequence("the quick brown fox").state()
+    replicas = [Sequence.from_state(base, site) for site in (1, 2, 3)]
+    ops = []
+    for _ in range(200):
+        replica = rng.choice(replicas)
+        if len(replica) and rng.random() < 0.4:
+            ops.append(replica.delete(rng.randrange(len(replica)), rng.randint(1, 3)))
+        else:
+            ops.append(replica.insert(rng.randint(0, len(replica)), rng.choice(["a", "bc", " "])))
+    for replica in replicas:
+        # Each replica already holds its own edits, so it sees the others'
+        # after them; applying an operation twice is a no-op
+        for op in ops:
+            replica.apply(op)
+            replica.apply(op)
+    assert len({replica.text() for replica in replicas}) == 1
+    fresh = Sequence.from_state(replicas[0].state(), 4)
+    assert fresh.text() == replicas[0].text()
+
+
+@pytest.mark.parametrize("op", [
+    None,
+    {},
+    {"insert": "", "id": [1, 1]},
+    {"insert": 5, "id": [1, 1]},
+    {"insert": "x", "id": [0, 1]},
+    {"insert": "x", "id": [1.0, 1]},
+    {"insert": "x", "id": [True, 1]},
+    {"insert": "x", "id": [1, 1], "after": [1]},
+    {"delete": "all"},
+    {"delete": [[1, 0]]},
+    {"delete": [[1, 0, 0]]},
+    {"delete": [[1, -1, 1]]},
+])
+def test_checked_rejects_malformed_operations(op):
+    with pytest.raises(InvalidOperation):
+        checked(op, 2)
+
+
+def test_checked_stamps_the_senders_site():
+    op = checked({"insert": "x", "id": [7, 0], "after": None, "extra": 1}, 2)
+    assert op == {"insert": "x", "id": [7, 2], "after": None}
+
+
+def test_apply_rejects_overlaps_and_oversized_deletes():
+    seq = Sequence("abc")
+    seq.apply({"insert": "x", "id": [2, 1], "after": None})
+    with pytest.raises(InvalidOperation):
+        seq.apply({"insert": "yz", "id": [1, 1], "after": None})
+    with pytest.raises(InvalidOperation):
+        seq.apply({"delete": [[1, 0, 10 ** 9]]})
+    with pytest.raises(KeyError):
+        seq.apply({"insert": "x", "id": [1, 5], "after": [99, 5]})
+    assert seq.text() == "xabc"
@@ -0,0 +1,86 @@
+# Focus rollups: every session counted once, however loads and saves interleave
+import asyncio
+
+import pytest
+
+from kortex.focus import FocusAnalytics, UserSessions, format_time, parse_time
+from kortex.store import MemoryStore
+
+START = parse_time("2025-03-03T23:30:00")
+
+
+def row(n, category="Writing", started=START + 86400, duration=1800):
+    return {"id": f"s{n}", "user_id": "u1", "category": category, "started_at": format_time(started),
+            "duration": duration}
+
+
+class GatedStore(MemoryStore):
+    """Answers select from a snapshot taken before (or after) a gate opens."""
+
+    def __init__(self, snapshot_first):
+        super().__init__()
+        self.snapshot_first = snapshot_first
+        self.gate = asyncio.Event()
+
+    async def call(self, method, *args, **kwargs):
+        if method != "select":
+            return await super().call(method, *args, **kwargs)
+        if self.snapshot_first:
+            rows = self.select(*args, **kwargs)
+            await self.gate.wait()
+            return rows
+        await self.gate.wait()
+        return self.select(*args, **kwargs)
+
+
+def test_sessions_split_across_buckets():
+    sessions = UserSessions()
+    sessions.add("s1", "Writing", START, 3600)
+    sessions.add("s1", "Writing", START, 3600)
+    day = sessions.stats("day", START // 86400, START // 86400 + 1)
+    assert [b["seconds"] for b in day["buckets"]] == [1800, 1800]
+    assert [b["sessions"] for b in day["buckets"]] == [1, 0]
+    assert day["totals"] == {"seconds": 3600, "sessions": 1, "categories": {"Writing": 3600}}
+
+
+@pytest.mark.parametrize("snapshot_first", [True, False])
+def test_session_logged_during_a_load_counts_once(snapshot_first):
+    async def run():
+        store = GatedStore(snapshot_first)
+        store.insert("focus_sessions", row(1))
+        analytics = FocusAnalytics(store)
+        first = asyncio.ensure_future(analytics.stats("u1", "month", START, START + 86400 * 3))
+        second = asyncio.ensure_future(analytics.for_user("u1"))
+        await asyncio.sleep(0)
+        # The POST handler: insert, then tell the analytics
+        analytics.session_added(store.insert("focus_sessions", row(2, "Training")))
+        store.gate.set()
+        stats = await first
+        assert await second is analytics.users["u1"]
+        return stats
+    stats = asyncio.run(run())
+    assert stats["totals"] == {"seconds": 3600, "sessions": 2, "categories": {"Writing": 1800, "Training": 1800}}
+
+
+def test_evicted_users_reload_from_the_store():
+    async def run():
+        store = MemoryStore()
+        analytics = FocusAnalytics(store, max_users=1)
+        for user in ("u1", "u2"):
+            store.insert("focus_sessions", dict(row(1), id=user + "-s1", user_id=user))
+            await analytics.for_user(user)
+        assert list(analytics.users) == ["u2"]
+        analytics.session_added(store.insert("focus_sessions", row(2)))
+        return await analytics.stats("u1", "week", START, START + 86400 * 3)
+    assert asyncio.run(run())["totals"]["sessions"] == 2
+
+
+def test_focus_endpoints(call, token):
+    body = {"category": "Writing", "startedAt": "2025-03-04T09:00:00Z", "duration": 1500.4}
+    assert call("POST", "/focus/sessions", body, token)[0] == 201
+    status, stats = call("GET", "/focus/stats?period=month&from=2025-01-01&to=2025-12-31", token=token)
+    assert status == 200 and stats["totals"]["sessions"] == 1 and stats["totals"]["seconds"] == 1500
+    assert call("POST", "/focus/sessions", dict(body, duration=600), token)[0] == 201
+    status, log = call("GET", "/focus/sessions", token=token)
+    assert [s["duration"] for s in log["sessions"]] in ([1500, 600], [600, 1500])
+    assert call("POST", "/focus/sessions", dict(body, duration=0.4), token)[0] == 400
@@ -0,0 +1,72 @@
+# Knowledge graph: edges depend on the documents, not the order they arrive in
+import itertools
+
+from kortex.graph import Graph, build, doc_node
+
+
+def doc(n, title="", content="", tags=()):
+    return {"id": f"{n:032x}", "title": title, "content": content, "tags": list(tags)}
+
+
+def url(n):
+    return f"/documents/{n:032x}"
+
+
+def edges(graph):
+    return {tuple(sorted(edge)) for edge in graph.edges()}
+
+
+DOCS = [
+    doc(1, "Orbit", f"see {url(2)} and [[Ember]]", ["space"]),
+    doc(2, "Ember", f"back to {url(1)} and on to {url(3)}"),
+    doc(3, "Quill", "[[orbit]] [[Missing]]", ["space", "tools"]),
+    doc(4, "Ember", "a second Ember"),
+]
+
+
+def test_edges_do_not_depend_on_scan_order():
+    expected = edges(build(DOCS))
+    assert (doc_node(DOCS[0]["id"]), doc_node(DOCS[1]["id"])) in expected
+    assert (doc_node(DOCS[1]["id"]), doc_node(DOCS[2]["id"])) in expected
+    for order in itertools.permutations(DOCS):
+        assert edges(build(order)) == expected
+
+
+def test_url_link_to_a_later_document():
+    graph = build([doc(1, "A", f"see {url(2)}")])
+    assert edges(graph) == set()
+    graph.upsert(doc(2, "B"))
+    assert edges(graph) == {(doc_node(f"{1:032x}"), doc_node(f"{2:032x}"))}
+
+    # Removing the target drops the edge; bringing it back restores it
+    graph.remove(f"{2:032x}")
+    assert edges(graph) == set()
+    graph.upsert(doc(2, "B"))
+    assert len(edges(graph)) == 1
+
+    # Editing the link away removes it for good
+    graph.upsert(doc(1, "A", "no links"))
+    graph.remove(f"{2:032x}")
+    graph.upsert(doc(2, "B"))
+    assert edges(graph) == set()
+
+
+def test_title_moves_to_the_next_claimant():
+    graph = build([doc(3, "Quill", "[[ember]]"), doc(4, "Ember"), doc(2, "Ember")])
+    quill, ember2, ember4 = (doc_node(f"{n:032x}") for n in (3, 2, 4))
+    assert set(graph.adjacency[quill]) == {ember2}
+    graph.upsert(doc(2, "Renamed"))
+    assert set(graph.adjacency[quill]) == {ember4}
+    graph.remove(f"{4:032x}")
+    assert not graph.adjacency[quill]
+
+
+def test_shared_tags_and_cleanup():
+    graph = Graph()
+    graph.upsert(doc(1, "A", tags=["Space"]))
+    graph.upsert(doc(2, "B", tags=["space"]))
+    assert graph.nodes["tag:space"]["kind"] == "tag"
+    assert len(graph.adjacency["tag:space"]) == 2
+    graph.remove(f"{1:032x}")
+    graph.remove(f"{2:032x}")
+    assert "tag:space" not in graph.nodes
@@ -0,0 +1,70 @@
+# HTTP layer and dispatch: error statuses instead of dropped connections
+import asyncio
+
+import pytest
+
+from kortex.http import HTTPError, read_request
+
+
+def parse(raw):
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        return await read_request(reader)
+    return asyncio.run(run())
+
+
+def test_reads_a_request():
+    request = parse(b"POST /api/x?a=1 HTTP/1.1\r\nContent-Length: 2\r\n\r\n{}")
+    assert (request.method, request.path, request.query, request.body) == ("POST", "/api/x", {"a": ["1"]}, b"{}")
+    assert parse(b"") is None
+
+
+@pytest.mark.parametrize("raw, status", [
+    (b"GET / HTTP/1.1\r\nContent-Length: -1\r\n\r\n", 400),
+    (b"GET / HTTP/1.1\r\nContent-Length: 1e3\r\n\r\n", 400),
+    (b"GET / HTTP/1.1\r\nContent-Length: \xd9\xa3\r\n\r\n", 400),
+    (b"GET / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n", 501),
+    (b"GET /\r\n\r\n", 400),
+    (b"GET / HTTP/2\r\n\r\n", 505),
+    (b"GET / HTTP/1.1\r\nHost", 400),
+])
+def test_rejects_malformed_requests(raw, status):
+    with pytest.raises(HTTPError) as exc:
+        parse(raw)
+    assert exc.value.status == status
+
+
+def test_unknown_route_and_missing_token(call, token):
+    assert call("GET", "/nope", token=token)[0] == 404
+    assert call("GET", "/documents")[0] == 401
+    assert call("GET", "/documents", token="not.a.token")[0] == 401
+
+
+def test_invalid_bodies(call, token):
+    status, payload = call("POST", "/documents", raw=b"{", token=token)
+    assert (status, payload["error"]) == (400, "request body is not valid JSON")
+    status, payload = call("POST", "/documents", {"title": 1}, token)
+    assert status == 400 and "details" in payload
+
+
+@pytest.mark.parametrize("size", [float("inf"), float("nan"), -1, 1.5, 10 ** 20])
+def test_upload_size_must_be_a_bounded_whole_number(call, token, size):
+    status, payload = call("POST", "/assets/uploads",
+                           {"filename": "a.bin", "size": size, "mimeType": "application/octet-stream"}, token)
+    assert status == 400
+
+
+def test_duplicate_registration_is_a_conflict(call, token):
+    status, _ = call("POST", "/auth/register", {"email": "ada@example.com", "password": "pw", "name": "Ada"})
+    assert status == 409
+
+
+def test_handler_errors_become_500(app, call, token, monkeypatch, capsys):
+    async def broken(method, *args, **kwargs):
+        raise RuntimeError("disk on fire")
+    monkeypatch.setattr(app.store, "call", broken)
+    status, payload = call("GET", "/documents", token=token)
+    assert (status, payload) == (500, {"error": "Internal Server Error"})
+    assert "disk on fire" in capsys.readouterr().err
@@ -0,0 +1,90 @@
+# Delivery archives: the same bytes for every job count, readable by zipfile
+import io
+import zipfile
+
+import pytest
+
+import packager
+from packager import Member, package
+
+
+@pytest.fixture
+def members(tmp_path):
+    (tmp_path / "notes.md").write_text("# Notes\n" + "orbit ember quill\n" * 2000)
+    (tmp_path / "logo.png").write_bytes(bytes(range(256)) * 64)
+    (tmp_path / "big.txt").write_bytes(b"lantern drift signal " * 5000)
+    return [
+        Member("docs/", None, None),
+        Member("docs/notes.md", str(tmp_path / "notes.md"), None),
+        Member("logo.png", str(tmp_path / "logo.png"), None),
+        Member("big.txt", str(tmp_path / "big.txt"), None),
+        Member("spec.json", None, lambda: b'{"generated": true}'),
+        Member("café.txt", None, "déjà vu".encode("utf-8")),
+        Member("empty.txt", None, b""),
+        Member("docs/notes.md", None, b"duplicate arcnames are skipped"),
+    ]
+
+
+def build(members, jobs, out=None):
+    out = out or io.BytesIO()
+    assert package(members, out, jobs=jobs) == 7
+    return out.getvalue()
+
+
+def check(data, members):
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == ["docs/", "docs/notes.md", "logo.png", "big.txt", "spec.json", "café.txt",
+                                 "empty.txt"]
+        assert zf.getinfo("logo.png").compress_type == zipfile.ZIP_STORED
+        assert zf.getinfo("big.txt").compress_type == zipfile.ZIP_DEFLATED
+        assert zf.read("spec.json") == b'{"generated": true}'
+        assert zf.read("café.txt") == "déjà vu".encode("utf-8")
+        with open(members[3].path, "rb") as f:
+            assert zf.read("big.txt") == f.read()
+
+
+@pytest.mark.parametrize("jobs", [2, 3])
+def test_parallel_build_matches_serial(members, jobs):
+    serial = build(members, 1)
+    check(serial, members)
+    assert build(members, jobs) == serial
+
+
+def test_large_members_are_streamed_with_descriptors(members, monkeypatch):
+    monkeypatch.setattr(packager, "MAX_POOLED_SIZE", 10_000)
+    serial = build(members, 1)
+    check(serial, members)
+    with zipfile.ZipFile(io.BytesIO(serial)) as zf:
+        assert zf.getinfo("big.txt").flag_bits & 0x08
+        assert not zf.getinfo("spec.json").flag_bits & 0x08
+    assert build(members, 2) == serial
+
+
+def test_zip64_records(members, monkeypatch):
+    monkeypatch.setattr(packager, "ZIP64_LIMIT", 1000)
+    monkeypatch.setattr(packager, "ZIP_FILECOUNT_LIMIT", 3)
+    monkeypatch.setattr(packager, "MAX_POOLED_SIZE", 10_000)
+    data = build(members, 1)
+    check(data, members)
+    assert b"PK\x06\x06" in data and b"PK\x06\x07" in data
+
+
+class Pipe(io.RawIOBase):
+    """A write-only stream that cannot seek, like stdout."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+
+def test_writes_to_unseekable_streams(members):
+    pipe = Pipe()
+    package(members, pipe)
+    assert b"".join(pipe.chunks) == build(members, 1)
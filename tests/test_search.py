@@ -0,0 +1,51 @@
+# Full-text search: folder and tag filters apply before the result limit
+from kortex.handlers import SEARCH_LIMIT
+from kortex.search import SearchIndex
+
+
+def doc(n, title, content, folder="/", tags=(), user_id="u1"):
+    return {"id": f"d{n}", "user_id": user_id, "title": title, "content": content, "folder_path": folder,
+            "tags": list(tags)}
+
+
+def test_filters_apply_before_the_limit():
+    index = SearchIndex()
+    # Strong matches everywhere, weak ones in the folder and tag asked for
+    index.index_many(doc(n, "orbit orbit", "orbit " * 5) for n in range(50))
+    index.index_many(doc(100 + n, "notes", "an orbit aside", folder="/archive", tags=["space", "draft"])
+                     for n in range(3))
+    index.index_many([doc(200, "notes", "orbit", tags=["space"]), doc(201, "orbit", "x", user_id="u2")])
+
+    assert len(index.search("u1", "orbit", limit=10)) == 10
+    assert {hit["id"] for hit in index.search("u1", "orbit", limit=10, folder="/archive")} == {"d100", "d101", "d102"}
+    assert {hit["id"] for hit in index.search("u1", "orbit", limit=10, tags=["space"])} == {"d100", "d101", "d102",
+                                                                                           "d200"}
+    assert len(index.search("u1", "orbit", limit=10, tags=["space", "draft"])) == 3
+    assert index.search("u1", "orbit", limit=10, tags=["space", "missing"]) == []
+    assert index.search("u1", "orbit", limit=10, folder="/archive", tags=["Space"]) == []
+
+
+def test_reindexing_replaces_folder_and_tags():
+    index = SearchIndex()
+    index.index(doc(1, "orbit", "", folder="/a", tags=["x"]))
+    index.index(doc(1, "orbit", "", folder="/b", tags=["y"]))
+    assert index.search("u1", "orbit", folder="/a") == []
+    assert index.search("u1", "orbit", tags=["x"]) == []
+    assert [hit["id"] for hit in index.search("u1", "orbit", folder="/b", tags=["y"])] == ["d1"]
+    index.remove("d1")
+    assert index.search("u1", "orbit") == []
+
+
+def test_tagged_search_past_the_limit(call, token):
+    for n in range(SEARCH_LIMIT + 20):
+        tags = ["rare"] if n % 40 == 0 else ["common"]
+        body = {"title": "Orbit log" if n % 40 else "Field notes", "content": "orbit " * (3 if n % 40 else 1),
+                "type": "markdown", "tags": tags}
+        assert call("POST", "/documents", body, token)[0] == 201
+    status, result = call("GET", "/documents?search=orbit", token=token)
+    assert result["total"] == SEARCH_LIMIT
+    status, result = call("GET", "/documents?search=orbit&tags=rare", token=token)
+    assert status == 200 and result["total"] == 3
+    assert all(d["tags"] == ["rare"] for d in result["documents"])
+    status, result = call("GET", "/documents?search=orbit&folder=/elsewhere", token=token)
+    assert result["total"] == 0
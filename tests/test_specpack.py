@@ -0,0 +1,63 @@
+# .kspec files: lossless round trip, lazy views and corrupt-file errors
+import pytest
+
+import build
+import specpack
+from specpack import MapView, Spec, SpecFormatError, pack, unpack
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    for artifact, inputs in build.graph.items():
+        (tmp_path / artifact).write_bytes(build.serialize(build.sources[inputs[0]]))
+    return tmp_path
+
+
+def test_values_round_trip():
+    value = {"b": [1, -2 ** 40, 2.5, None, True, False], "a": {"ü": "snow ☃", "": []}}
+    decoded = unpack(pack(value))
+    assert decoded == value
+    assert list(decoded) == ["b", "a"]
+    assert type(decoded["b"][2]) is float
+
+
+def test_artifacts_pack_and_check(artifacts):
+    sizes = specpack.write(str(artifacts))
+    assert set(sizes) == set(build.graph)
+    assert all(problem is None for problem in specpack.check(str(artifacts)).values())
+    for artifact in build.graph:
+        with Spec(str(artifacts / specpack.binary_name(artifact))) as spec:
+            assert build.serialize(spec.load()) == (artifacts / artifact).read_bytes()
+
+
+def test_lookups_are_lazy_views(artifacts):
+    specpack.write(str(artifacts))
+    api = build.sources[build.graph["backend-api.json"][0]]
+    with Spec(str(artifacts / "backend-api.kspec")) as spec:
+        assert isinstance(spec.root, MapView)
+        group, endpoints = next(iter(api["endpoints"].items()))
+        key = next(iter(endpoints))
+        assert spec.get("endpoints", group, key) == endpoints[key]
+
+
+@pytest.mark.parametrize("data", [b"", b"KSP", b"JUNK\x01\x00N", b"KSPC\x09\x00N", b"KSPC\x01\x00S\xff\xff\xff\xffab",
+                                  b"KSPC\x01\x00M\x05\x00\x00\x00", b"KSPC\x01\x00?"])
+def test_corrupt_files_raise_spec_format_error(tmp_path, data):
+    path = tmp_path / "bad.kspec"
+    path.write_bytes(data)
+    with pytest.raises(SpecFormatError):
+        with Spec(str(path)) as spec:
+            spec.load()
+    if data.startswith(b"KSPC"):
+        with pytest.raises(SpecFormatError):
+            unpack(data)
+
+
+def test_check_reports_problems(artifacts):
+    specpack.write(str(artifacts))
+    (artifacts / "backend-api.kspec").write_bytes(b"KSPC\x01\x00N")
+    (artifacts / "server-config.kspec").unlink()
+    results = specpack.check(str(artifacts))
+    assert results["backend-api.json"] == "decodes to different JSON"
+    assert results["server-config.json"]
+    assert specpack.main(["--check", "--out-dir", str(artifacts)]) == 1
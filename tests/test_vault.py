@@ -0,0 +1,101 @@
+# Vault export/import: a round trip keeps rows and blob bytes
+import io
+import os
+import tarfile
+
+import pytest
+
+from kortex.blobs import BlobStore
+from kortex.db import Database
+from kortex.store import SQLStore
+from kortex.vault import ArchiveError, export_vault, import_vault
+
+
+@pytest.fixture
+def vaults(tmp_path):
+    opened = []
+
+    def vault(name):
+        db = Database("development", connection=str(tmp_path / f"{name}.db"))
+        db.migrate()
+        store = SQLStore(db)
+        user = store.insert("users", {"email": f"{name}@example.com", "password": "x", "name": name,
+                                      "preferences": {}})
+        opened.append(db)
+        return store, BlobStore(str(tmp_path / name)), user
+    yield vault
+    for db in opened:
+        db.close()
+
+
+def _populate(store, blobs, user):
+    doc = store.insert("documents", {"user_id": user["id"], "title": "Orbit", "content": "see the notes",
+                                     "type": "markdown", "folder_path": "/", "tags": ["space"], "metadata": {}})
+    for name, data in (("a.txt", b"alpha" * 1000), ("b.txt", b"beta"), ("copy.txt", b"beta")):
+        digest, _ = blobs.ingest([data])
+        store.insert("assets", {"user_id": user["id"], "filename": BlobStore.filename(digest), "original_name": name,
+                                "mime_type": "text/plain", "size": len(data),
+                                "url": f"/uploads/{BlobStore.filename(digest)}", "folder_path": "/",
+                                "metadata": {"sha256": digest}})
+    return doc
+
+
+def _export(store, blobs, user, compress=False):
+    out = io.BytesIO()
+    counts = export_vault(store, blobs, user, out, compress)
+    out.seek(0)
+    return out, counts
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_round_trip(vaults, compress):
+    source, source_blobs, alice = vaults("source")
+    target, target_blobs, bob = vaults("target")
+    doc = _populate(source, source_blobs, alice)
+    archive, exported = _export(source, source_blobs, alice, compress)
+    assert (exported["documents"], exported["assets"], exported["blobs"]) == (1, 3, 2)
+
+    imported = import_vault(target, target_blobs, bob, archive)
+    assert (imported["documents"], imported["assets"], imported["blobs"]) == (1, 3, 2)
+    copy = target.get("documents", doc["id"])
+    assert (copy["user_id"], copy["title"], copy["content"], copy["tags"]) == (bob["id"], "Orbit", "see the notes",
+                                                                               ["space"])
+    for asset in source.select("assets", user_id=alice["id"]):
+        with open(source_blobs.path(asset["filename"]), "rb") as a, open(target_blobs.path(asset["filename"]),
+                                                                         "rb") as b:
+            assert a.read() == b.read()
+
+    # Importing again skips rows that exist, unless they are remapped
+    archive.seek(0)
+    assert import_vault(target, target_blobs, bob, archive)["documents"] == 0
+    archive.seek(0)
+    assert import_vault(target, target_blobs, bob, archive, remap=True)["documents"] == 1
+    assert len(target.select("documents", user_id=bob["id"])) == 2
+
+
+def test_rejects_foreign_archives(vaults):
+    target, target_blobs, bob = vaults("target")
+    out = io.BytesIO()
+    with tarfile.open(fileobj=out, mode="w") as tar:
+        tar.addfile(tarfile.TarInfo("notes.txt"), io.BytesIO())
+    out.seek(0)
+    with pytest.raises(ArchiveError):
+        import_vault(target, target_blobs, bob, out)
+
+
+def test_failed_import_leaves_nothing_behind(vaults):
+    source, source_blobs, alice = vaults("source")
+    target, target_blobs, bob = vaults("target")
+    _populate(source, source_blobs, alice)
+    archive, _ = _export(source, source_blobs, alice)
+    # Append a member import does not know after the tables
+    out = io.BytesIO()
+    with tarfile.open(fileobj=io.BytesIO(archive.getvalue())) as src, tarfile.open(fileobj=out, mode="w") as tar:
+        for member in src:
+            tar.addfile(member, src.extractfile(member))
+        tar.addfile(tarfile.TarInfo("extra.jsonl"), io.BytesIO())
+    out.seek(0)
+    with pytest.raises(ArchiveError):
+        import_vault(target, target_blobs, bob, out)
+    assert target.select("documents", user_id=bob["id"]) == []
+    assert not any(files for _, _, files in os.walk(os.path.join(target_blobs.root, "blobs")))